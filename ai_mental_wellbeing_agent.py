@@ -1,78 +1,142 @@
 from __future__ import annotations
 import streamlit as st
+import functools
 import os
-from ui_theme import inject_theme, render_hero, success_confetti, section_title, render_divider
+import time
+import uuid
+from ui_theme import render_hero, success_confetti, section_title, render_divider
 try:
-    from ui_theme_alt import inject_theme_alt, render_hero_alt, section_title_alt, render_divider_alt
+    from ui_theme_alt import render_hero_alt, section_title_alt, render_divider_alt
     ALT_THEME_AVAILABLE = True
 except Exception:
     ALT_THEME_AVAILABLE = False
-
-# Compatibility imports for AG2/AutoGen swarm APIs
-try:
-    # Preferred AG2/AutoGen agentchat namespace (newer versions)
-    from autogen.agentchat import (
-        SwarmAgent,
-        SwarmResult,
-        initiate_swarm_chat,
-        OpenAIWrapper,
-        AFTER_WORK,
-        UPDATE_SYSTEM_MESSAGE,
-    )
-except ImportError:
-    try:
-        # Fallback to legacy autogen namespace (older versions)
-        from autogen import (
-            SwarmAgent,
-            SwarmResult,
-            initiate_swarm_chat,
-            OpenAIWrapper,
-            AFTER_WORK,
-            UPDATE_SYSTEM_MESSAGE,
-        )
-    except ImportError as e:
-        SwarmAgent = None
-        # Provide a minimal placeholder so type annotations don't fail
-        class _FallbackSwarmResult:
-            def __init__(self, agent: str, context_variables: dict):
-                self.agent = agent
-                self.context_variables = context_variables
-
-        SwarmResult = _FallbackSwarmResult  # type: ignore
-        try:
-            from openai import OpenAI
-        except Exception:
-            OpenAI = None
+from theme_assets import build_theme, load_image
+
+from plan_engine import (
+    LLM_CALLS_PER_PLAN,
+    STRUCTURED_OUTPUT,
+    PlanMetrics,
+    async_available,
+    build_task,
+    empty_output,
+    generate_plan,
+    light_route,
+    plan_run_mode,
+    regenerate_section,
+)
+from plan_cache import PlanCache, cache_key
+from llm_clients import ClientRegistry, key_fingerprint
+from token_budget import DEFAULT_PROMPT_BUDGET, TokenBudget
+from session_timer import SessionTimer
+from checkin_stats import CheckinStats
+from care_path import DURATIONS_WEEKS, build_path, path_markdown
+from crisis_lexicon import detect_crisis
+from screening import INSTRUMENTS, score_state
+from risk_model import LIGHT_MODEL, assess_text, severity
+from model_routing import ModelRoute
+from llm_scheduler import RequestScheduler
+from plan_jobs import PlanJobRunner
+from wellbeing_store import WellbeingStore
+from geo_index import Gazetteer
+from provider_directory import DEFAULT_PROVIDERS_PATH, ProviderDirectory, normalize
 
 
 os.environ["AUTOGEN_USE_DOCKER"] = "0"
+_script_started = time.perf_counter()
 
 if 'output' not in st.session_state:
-    st.session_state.output = {
-        'assessment': '',
-        'action': '',
-        'followup': ''
-    }
+    st.session_state.output = empty_output()
+
+@st.cache_resource
+def get_store() -> WellbeingStore:
+    return WellbeingStore()
+
+store = get_store()
+# Anonymous per-browser id kept in the URL so a reload finds the same history
+user_id = st.query_params.get("uid")
+if not user_id:
+    user_id = uuid.uuid4().hex[:12]
+    st.query_params["uid"] = user_id
+if st.session_state.get("_store_user") != user_id:
+    st.session_state['checkins'] = store.checkins(user_id)
+    st.session_state['habits'] = store.entries("habit", user_id)
+    st.session_state['habit_streak'] = len(st.session_state['habits'])
+    st.session_state['playlists'] = [
+        {"name": p["name"], "steps": p["steps"]} for p in store.entries("playlist", user_id)
+    ]
+    st.session_state['journal_entries'] = store.entries("journal", user_id, limit=20)
+    st.session_state["_store_user"] = user_id
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def sidebar_image(filename: str, caption: str | None = None):
+    # Resized WebP bytes, encoded once per process instead of re-reading the original every rerun
+    asset = load_image(os.path.join(APP_DIR, filename))
+    if asset is not None:
+        st.sidebar.image(asset.data, caption=caption, use_container_width=True)
+    elif caption:
+        st.sidebar.caption(caption)
 
 # Sidebar logo at the very top (above API Key section)
-try:
-    st.sidebar.image("logo.png", use_container_width=True)
-except Exception:
-    import os
-    here = os.path.dirname(__file__)
-    logo_path = os.path.join(here, "logo.png")
-    if os.path.exists(logo_path):
-        st.sidebar.image(logo_path, use_container_width=True)
+sidebar_image("logo.png")
 
 st.sidebar.title("OpenAI API Key")
 api_key = st.sidebar.text_input("Enter your OpenAI API Key", type="password")
 
 # Optional: choose model when using OpenAI fallback or to pass into AG2 config
+MODEL_OPTIONS = ["gpt-4.1-nano", "gpt-4o-mini", "gpt-5-nano"]
 model_choice = st.sidebar.selectbox(
     "Model",
-    ["gpt-4.1-nano", "gpt-4o-mini", "gpt-5-nano"],
+    MODEL_OPTIONS,
     index=0,
 )
+# Per-stage overrides; SEHATSATHI_<STAGE>_MODEL preselects one
+with st.sidebar.expander("Model routing"):
+    stage_models = {}
+    for stage, label in (
+        ("summary", "Summary tool calls"),
+        ("section", "Section write-ups"),
+        ("fallback", "Single-call fallback"),
+    ):
+        env_model = os.environ.get(f"SEHATSATHI_{stage.upper()}_MODEL")
+        options = ["Same as Model"] + MODEL_OPTIONS + ([env_model] if env_model and env_model not in MODEL_OPTIONS else [])
+        choice = st.selectbox(label, options, index=options.index(env_model) if env_model else 0, key=f"route_{stage}")
+        stage_models[stage] = model_choice if choice == "Same as Model" else choice
+model_route = ModelRoute(**stage_models)
+stream_plan = st.sidebar.checkbox(
+    "Stream plan as it is written",
+    value=True,
+    key="stream_plan",
+    help="Fill the plan sections live instead of waiting for the full response.",
+)
+structured_plan = st.sidebar.checkbox(
+    "Structured plan output (JSON)",
+    value=STRUCTURED_OUTPUT,
+    key="structured_plan",
+    help="The single-call plan comes back as validated JSON sections; a missing section is re-requested on its own.",
+)
+plan_mode = st.sidebar.selectbox(
+    "Plan orchestration",
+    ["Sequential"] + (["Parallel (async)"] if async_available() else []),
+    index=0,
+    key="plan_mode",
+    help="Parallel writes the three sections concurrently once the short summaries are ready.",
+)
+prompt_budget = st.sidebar.number_input(
+    "Prompt token budget per turn",
+    min_value=500,
+    max_value=16000,
+    value=DEFAULT_PROMPT_BUDGET,
+    step=250,
+    key="prompt_budget",
+    help="Older history and long context summaries are trimmed to stay under this.",
+)
+light_routing = st.sidebar.checkbox(
+    f"Use {LIGHT_MODEL} for low-risk requests",
+    value=False,
+    key="light_routing",
+    help="When the local risk check finds no notable signal, the plan is written by the lighter model.",
+)
 
 # Sidebar theme switcher
 st.sidebar.markdown("### Theme")
@@ -107,9 +171,9 @@ if st.session_state.get("auto_suggest"):
     if not st.session_state.get("_auto_applied", False):
         # Screeners
         for i in range(9):
-            st.session_state[f"phq_{i}"] = "1 - Several days" if i < 7 else ("2 - More than half the days" if i == 7 else "0 - Not at all")
+            st.session_state[f"phq_{i}"] = 1 if i < 7 else (2 if i == 7 else 0)
         for i in range(7):
-            st.session_state[f"gad_{i}"] = "1 - Several days" if i < 5 else "2 - More than half the days"
+            st.session_state[f"gad_{i}"] = 1 if i < 5 else 2
         # Coping toolkit demo notes
         st.session_state['grounding_demo'] = {
             'sees': 'Window, mug, book, plant, pen',
@@ -133,44 +197,77 @@ if st.session_state.get("auto_suggest"):
             }]
         # Check-in demo
         if 'checkins' not in st.session_state or not st.session_state['checkins']:
-            st.session_state['checkins'] = [{"mood": 5, "sleep": 6, "stress": 7}]
+            st.session_state['checkins'] = [{"mood": 5, "sleep": 6, "stress": 7, "ts": time.time()}]
         st.session_state["_auto_applied"] = True
         st.rerun()
 else:
     st.session_state["_auto_applied"] = False
 
+@st.cache_resource
+def get_plan_cache() -> PlanCache:
+    return PlanCache()
+
+@st.cache_resource
+def get_client_registry() -> ClientRegistry:
+    return ClientRegistry()
+
+@st.cache_resource
+def get_scheduler() -> RequestScheduler:
+    return RequestScheduler()
+
+@st.cache_resource
+def get_plan_jobs() -> PlanJobRunner:
+    return PlanJobRunner(get_scheduler())
+
+# How often a running plan job is polled for progress
+PLAN_POLL_SECONDS = 0.5
+
+plan_cache = get_plan_cache()
+client_registry = get_client_registry()
+scheduler = get_scheduler()
+plan_jobs = get_plan_jobs()
+with st.sidebar.expander("Plan cache"):
+    cache_stats_slot = st.empty()
+    if st.button("Clear plan cache", key="btn_clear_plan_cache"):
+        plan_cache.clear()
+
+with st.sidebar.expander("Your data"):
+    st.caption(
+        "Check-ins, journal entries, habits, playlists, grounding notes and support plans are stored on this "
+        "app's server under the `uid` in your address bar. Anyone with this page's link can read them back."
+    )
+    if st.button("Delete my saved data", key="btn_delete_my_data"):
+        store.delete_user(user_id)
+        # Live jobs are dropped too, so a plan finishing later is neither saved nor cached
+        for deleted_job in plan_jobs.delete_user(user_id):
+            if deleted_job.task:
+                plan_cache.delete(deleted_job.task, deleted_job.model)
+        # A fresh id, so the old link no longer points at anything
+        st.query_params.pop("job", None)
+        st.query_params["uid"] = uuid.uuid4().hex[:12]
+        for state_key in ("checkins", "habits", "playlists", "journal_entries", "plan_job", "_store_user"):
+            st.session_state.pop(state_key, None)
+        # The rerun reads from the store: wait for the queued delete to commit
+        store.flush()
+        st.rerun()
+
 # Sidebar developer footer (placed near bottom of sidebar)
 st.sidebar.markdown("---")
 st.sidebar.markdown("#### Developer")
-try:
-    st.sidebar.image("developer.jpg", caption="Abhishek Kumar", use_container_width=True)
-except Exception:
-    try:
-        import os
-        here = os.path.dirname(__file__)
-        dev_path = os.path.join(here, "developer.jpg")
-        if os.path.exists(dev_path):
-            st.sidebar.image(dev_path, caption="Abhishek Kumar", use_container_width=True)
-    except Exception:
-        st.sidebar.caption("Abhishek Kumar")
-
-if selected_theme == "Neon Pulse" and ALT_THEME_AVAILABLE:
-    inject_theme_alt()
+sidebar_image("developer.jpg", caption="Abhishek Kumar")
+
+# Theme CSS and accent overrides as one minified block, built once per theme + accent combination
+theme_bundle = build_theme(selected_theme, primary_accent, secondary_accent)
+st.markdown(theme_bundle.html, unsafe_allow_html=True)
+if theme_bundle.theme == "Neon Pulse":
     render_hero_alt()
     section_title_fn = section_title_alt
     divider_fn = render_divider_alt
 else:
-    inject_theme()
     render_hero()
     section_title_fn = section_title
     divider_fn = render_divider
 
-# Apply accent overrides to CSS variables
-if selected_theme == "Neon Pulse" and ALT_THEME_AVAILABLE:
-    st.markdown(f"<style>:root{{--cyan:{primary_accent};--magenta:{secondary_accent};}}</style>", unsafe_allow_html=True)
-else:
-    st.markdown(f"<style>:root{{--primary:{primary_accent};--primary-2:{secondary_accent};--accent:{primary_accent};--accent-2:{secondary_accent};}}</style>", unsafe_allow_html=True)
-
 # Agent Team Showcase (interactive)
 st.markdown("""
 <div class="agent-grid">
@@ -207,6 +304,28 @@ with ag_col3:
                 st.session_state["highlight_care_path"] = True
                 st.rerun()
 
+def section_fragment(name: str, run_every=None):
+    """Run a section as an ``st.fragment`` so its widgets only rerun that section.
+
+    The duration of the section's latest run is kept in
+    ``st.session_state['_section_timings']`` for the rerun benchmark.
+    ``run_every`` (seconds) reruns the fragment on a timer, for polling.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                st.session_state.setdefault('_section_timings', {})[name] = time.perf_counter() - started
+        return st.fragment(timed, run_every=run_every)
+    return decorate
+
+def screening_scores() -> dict:
+    """Scores for every screener from the current answers; memoised per answer vector, so sections share one scoring."""
+    return score_state(st.session_state, INSTRUMENTS)
+
 section_title_fn("Personal Information", "👤")
 col1, col2 = st.columns(2)
 
@@ -249,337 +368,377 @@ current_symptoms = st.multiselect(
 
 # (Old) demo/auto-suggest section removed; handled at top before widgets
 
+RISK_FLAG_TEXT = {
+    "crisis": "Crisis-risk wording in your description",
+    "self_harm": "Crisis-risk wording: possible self-harm",
+    "depression": "Possible low-mood signals in your words",
+    "anxiety": "Possible anxiety signals in your words",
+    "sleep": "Possible sleep difficulties mentioned",
+    "stress": "Possible stress/overload mentioned",
+}
+
+@section_fragment("triage")
+def render_triage(mental_state, recent_changes, stress_level, sleep_pattern):
+    scores = screening_scores()
+
+    sleep_hours = int(str(sleep_pattern)) if str(sleep_pattern).isdigit() else 7
+    flags = []
+    if scores["phq"].flagged:
+        flags.append("High depression indicators (PHQ-9 ≥15)")
+    if scores["gad"].flagged:
+        flags.append("High anxiety indicators (GAD-7 ≥15)")
+    if stress_level >= 8:
+        flags.append("High current stress (≥8)")
+    if sleep_hours <= 5:
+        flags.append("Insufficient sleep (≤5h)")
+    crisis = detect_crisis(mental_state) or detect_crisis(recent_changes)
+    if crisis:
+        flags.append("Crisis language detected — prioritize immediate help")
+    # Local classifier over the free text; instant, no API call
+    risk = assess_text(mental_state, recent_changes)
+    for label in risk.flagged:
+        flags.append(f"{RISK_FLAG_TEXT[label]} (local score {risk.scores[label]:.2f})")
+
+    sense = st.select_slider("Sensitivity", options=["Conservative", "Standard", "Proactive"], value="Standard")
+    if sense == "Conservative":
+        flags = [f for f in flags if ("High" in f or "Crisis" in f)]
+    elif sense == "Proactive":
+        # keep all flags, including sleep
+        flags = flags
+
+    if flags:
+        sev = severity(crisis, risk, scores["phq"].flagged or scores["gad"].flagged or stress_level >= 8)
+        if sev == "high":
+            st.error("High-risk: " + "; ".join(flags))
+        elif sev == "moderate":
+            st.warning("Moderate-risk: " + "; ".join(flags))
+        else:
+            st.info("Info: " + "; ".join(flags))
+
+        # Inline grounding quick start
+        with st.container():
+            gcol1, gcol2, gcol3, gcol4 = st.columns(4)
+            with gcol1:
+                if st.button("Start Grounding"):
+                    st.session_state['triage_action'] = "grounding"
+            with gcol2:
+                if st.button("View Resources"):
+                    st.session_state['triage_action'] = "resources"
+            with gcol3:
+                if st.button("Crisis Support"):
+                    st.session_state['triage_action'] = "crisis"
+            with gcol4:
+                msg = "Hello, I'm seeking support for stress/anxiety. Do you have low-cost/insurance and remote options?"
+                st.download_button("Copy Outreach Message", msg, file_name="outreach.txt", mime="text/plain")
+
+        act = st.session_state.get('triage_action')
+        if act == "grounding":
+            st.info("Try 5-4-3-2-1 grounding and 4x box breathing.")
+            # Minimal inline grounding guide
+            st.markdown("- See 5, Feel 4, Hear 3, Smell 2, Taste 1")
+        elif act == "resources":
+            st.info("Scroll to 'Find Support Resources' and search with broader filters or remote options.")
+        elif act == "crisis":
+            st.error("If you are in crisis: Call 988 (US) or local emergency services (112/999). Seek immediate professional help.")
+        st.caption("Privacy: your entries are saved on this app's server, and anyone with this page's link can read them. "
+                   "Delete them under 'Your data' in the sidebar.")
+    if mental_state or recent_changes:
+        st.caption(f"Local risk check ({risk.seconds * 1000:.1f} ms): "
+                   + " · ".join(f"{label.replace('_', ' ')} {score:.2f}" for label, score in risk.top(3)))
+
 divider_fn()
 section_title_fn("Triage Assistant", "🛡️")
-
-def detect_crisis(text: str) -> bool:
-    if not text:
-        return False
-    keywords = [
-        "suicide", "hurt myself", "end it", "kill myself",
-        "self-harm", "can't go on", "hopeless",
-    ]
-    t = text.lower()
-    return any(k in t for k in keywords)
-
-# Try to reuse PHQ/GAD totals from widgets
-try:
-    triage_phq = sum(int(st.session_state.get(f"phq_{i}", "0 - Not at all").split(" ")[0]) for i in range(9))
-    triage_gad = sum(int(st.session_state.get(f"gad_{i}", "0 - Not at all").split(" ")[0]) for i in range(7))
-except Exception:
-    triage_phq, triage_gad = 0, 0
-
-sleep_hours = int(str(sleep_pattern)) if str(sleep_pattern).isdigit() else 7
-flags = []
-if triage_phq >= 15:
-    flags.append("High depression indicators (PHQ-9 ≥15)")
-if triage_gad >= 15:
-    flags.append("High anxiety indicators (GAD-7 ≥15)")
-if stress_level >= 8:
-    flags.append("High current stress (≥8)")
-if sleep_hours <= 5:
-    flags.append("Insufficient sleep (≤5h)")
-if detect_crisis(mental_state) or detect_crisis(recent_changes):
-    flags.append("Crisis language detected — prioritize immediate help")
-
-def severity_badge():
-    level = "info"
-    if any("Crisis" in f for f in flags):
-        level = "high"
-    elif triage_phq >= 15 or triage_gad >= 15 or stress_level >= 8:
-        level = "moderate"
-    return level
-
-sense = st.select_slider("Sensitivity", options=["Conservative", "Standard", "Proactive"], value="Standard")
-if sense == "Conservative":
-    flags = [f for f in flags if ("High" in f or "Crisis" in f)]
-elif sense == "Proactive":
-    # keep all flags, including sleep
-    flags = flags
-
-if flags:
-    sev = severity_badge()
-    if sev == "high":
-        st.error("High-risk: " + "; ".join(flags))
-    elif sev == "moderate":
-        st.warning("Moderate-risk: " + "; ".join(flags))
-    else:
-        st.info("Info: " + "; ".join(flags))
-
-    # Inline grounding quick start
-    with st.container():
-        gcol1, gcol2, gcol3, gcol4 = st.columns(4)
-        with gcol1:
-            if st.button("Start Grounding"):
-                st.session_state['triage_action'] = "grounding"
-        with gcol2:
-            if st.button("View Resources"):
-                st.session_state['triage_action'] = "resources"
-        with gcol3:
-            if st.button("Crisis Support"):
-                st.session_state['triage_action'] = "crisis"
-        with gcol4:
-            msg = "Hello, I'm seeking support for stress/anxiety. Do you have low-cost/insurance and remote options?"
-            st.download_button("Copy Outreach Message", msg, file_name="outreach.txt", mime="text/plain")
-
-    act = st.session_state.get('triage_action')
-    if act == "grounding":
-        st.info("Try 5-4-3-2-1 grounding and 4x box breathing.")
-        # Minimal inline grounding guide
-        st.markdown("- See 5, Feel 4, Hear 3, Smell 2, Taste 1")
-    elif act == "resources":
-        st.info("Scroll to 'Find Support Resources' and search with broader filters or remote options.")
-    elif act == "crisis":
-        st.error("If you are in crisis: Call 988 (US) or local emergency services (112/999). Seek immediate professional help.")
-    st.caption("Privacy: No data leaves your device unless you choose to send.")
+render_triage(mental_state, recent_changes, stress_level, sleep_pattern)
+
+@section_fragment("screening")
+def render_screening():
+    for instrument in INSTRUMENTS.values():
+        with st.expander(instrument.title, expanded=st.session_state.get(f"expand_{instrument.key}", False)):
+            for i, q in enumerate(instrument.items):
+                # Widgets hold integer answer codes; the label is display-only
+                st.selectbox(q, range(len(instrument.labels(i))), index=instrument.default, key=f"{instrument.key}_{i}",
+                             format_func=functools.partial(instrument.option_label, i),
+                             placeholder="Choose an answer")
+            result = screening_scores()[instrument.key]
+            if result.complete:
+                st.write(f"{instrument.name} Total Score: {result.total}")
+                st.info(f"Severity: {result.band}")
+            else:
+                st.caption(f"Answered {result.answered}/{result.items} — answer every item to see the score.")
+
+    # Triage is a separate fragment; refresh the app when its screening flags flip
+    scores = screening_scores()
+    screen_flags = (scores["phq"].flagged, scores["gad"].flagged)
+    if st.session_state.get("_triage_screen_flags", screen_flags) != screen_flags:
+        st.session_state["_triage_screen_flags"] = screen_flags
+        st.rerun()
+    st.session_state["_triage_screen_flags"] = screen_flags
 
 divider_fn()
 section_title_fn("Screening (Optional)", "🧪")
-with st.expander("PHQ-9 Depression Screener", expanded=st.session_state.get("expand_phq", False)):
-    phq_questions = [
-        "Little interest or pleasure in doing things",
-        "Feeling down, depressed, or hopeless",
-        "Trouble falling or staying asleep, or sleeping too much",
-        "Feeling tired or having little energy",
-        "Poor appetite or overeating",
-        "Feeling bad about yourself — or that you are a failure or have let yourself or your family down",
-        "Trouble concentrating on things, such as reading or watching television",
-        "Moving or speaking so slowly that other people could have noticed. Or the opposite — being so fidgety or restless that you have been moving around a lot more than usual",
-        "Thoughts that you would be better off dead, or of hurting yourself in some way",
-    ]
-    phq_scale = ["0 - Not at all", "1 - Several days", "2 - More than half the days", "3 - Nearly every day"]
-    phq_scores = []
-    for i, q in enumerate(phq_questions):
-        sel = st.selectbox(q, phq_scale, key=f"phq_{i}")
-        phq_scores.append(int(sel.split(" ")[0]))
-    phq_total = sum(phq_scores)
-    st.write(f"PHQ-9 Total Score: {phq_total}")
-    phq_level = (
-        "Minimal (0–4)" if phq_total <= 4 else
-        "Mild (5–9)" if phq_total <= 9 else
-        "Moderate (10–14)" if phq_total <= 14 else
-        "Moderately severe (15–19)" if phq_total <= 19 else
-        "Severe (20–27)"
-    )
-    st.info(f"Severity: {phq_level}")
-
-with st.expander("GAD-7 Anxiety Screener", expanded=st.session_state.get("expand_gad", False)):
-    gad_questions = [
-        "Feeling nervous, anxious, or on edge",
-        "Not being able to stop or control worrying",
-        "Worrying too much about different things",
-        "Trouble relaxing",
-        "Being so restless that it is hard to sit still",
-        "Becoming easily annoyed or irritable",
-        "Feeling afraid, as if something awful might happen",
-    ]
-    gad_scale = ["0 - Not at all", "1 - Several days", "2 - More than half the days", "3 - Nearly every day"]
-    gad_scores = []
-    for i, q in enumerate(gad_questions):
-        sel = st.selectbox(q, gad_scale, key=f"gad_{i}")
-        gad_scores.append(int(sel.split(" ")[0]))
-    gad_total = sum(gad_scores)
-    st.write(f"GAD-7 Total Score: {gad_total}")
-    gad_level = (
-        "Minimal (0–4)" if gad_total <= 4 else
-        "Mild (5–9)" if gad_total <= 9 else
-        "Moderate (10–14)" if gad_total <= 14 else
-        "Severe (15–21)"
-    )
-    st.info(f"Severity: {gad_level}")
+render_screening()
+
+def step_phases(step: str) -> list:
+    if step.startswith("Box Breathing"):
+        return [(step, phase, 4) for phase in ["Inhale", "Hold", "Exhale", "Hold"]]
+    if step.startswith("Grounding"):
+        return [(step, "Name 5 see, 4 feel, 3 hear, 2 smell, 1 taste.", 5)]
+    if step.startswith("Journaling"):
+        return [(step, "Write two sentences about what you feel and one helpful action.", 10)]
+    if step.startswith("Micro-walk"):
+        return [(step, "Walk around for 3 minutes or stretch gently.", 10)]
+    return []
+
+def timer_panel(state_key: str, done_message: str):
+    timer = st.session_state.get(state_key)
+    status = timer.status() if timer is not None else None
+    if status is None or status.done:
+        if status is not None:
+            st.progress(1.0)
+            st.markdown(done_message)
+        if st.session_state.get(f"{state_key}_ticking"):
+            # One full rerun so the panel is re-registered without auto-refresh
+            st.session_state[f"{state_key}_ticking"] = False
+            st.rerun()
+        return
+    st.progress(min(1.0, status.progress))
+    st.markdown(f"**{status.label}** — {status.remaining:.0f}s" + (" (paused)" if status.paused else ""))
+    st.caption(f"{status.group} · phase {status.index + 1} of {status.count}")
+    ctl1, ctl2, ctl3 = st.columns(3)
+    # Callbacks update the timer before the panel re-renders, so controls act immediately
+    with ctl1:
+        if status.paused:
+            st.button("Resume", key=f"{state_key}_resume", on_click=timer.resume)
+        else:
+            st.button("Pause", key=f"{state_key}_pause", on_click=timer.pause)
+    with ctl2:
+        st.button("Skip", key=f"{state_key}_skip", on_click=timer.skip)
+    with ctl3:
+        st.button("Stop", key=f"{state_key}_stop", on_click=st.session_state.pop, args=(state_key, None))
+
+def show_timer(state_key: str, done_message: str):
+    """Show the timer under ``state_key`` in a fragment that refreshes itself every second while it runs.
+
+    The countdown is computed from the clock on each refresh, so the script
+    thread never sleeps and Pause/Skip/Stop take effect on the next tick.
+    """
+    timer = st.session_state.get(state_key)
+    ticking = timer is not None and not timer.status().done
+    st.session_state[f"{state_key}_ticking"] = ticking
+    st.fragment(timer_panel, run_every=1.0 if ticking else None, key=state_key)(state_key, done_message)
+
+@section_fragment("coping")
+def render_coping_toolkit():
+    if st.session_state.get("highlight_coping"):
+        st.info("Jumped here from Agent actions — try Box Breathing or Grounding.")
+        st.session_state["highlight_coping"] = False
+    coping_tab1, coping_tab2, coping_tab3 = st.tabs(["Box Breathing", "Grounding 5-4-3-2-1", "Journaling Prompts"])
+    with coping_tab1:
+        st.write("Follow a 4-4-4-4 pattern: inhale, hold, exhale, hold.")
+        dur = st.slider("Cycle seconds", 3, 6, 4)
+        cycles = st.slider("Cycles", 1, 10, 4)
+        if st.button("Start Breathing Timer"):
+            timer = SessionTimer([
+                (f"Cycle {c + 1} of {cycles}", phase, dur)
+                for c in range(cycles)
+                for phase in ["Inhale", "Hold", "Exhale", "Hold"]
+            ])
+            timer.start()
+            st.session_state['breathing_timer'] = timer
+        show_timer('breathing_timer', "Session complete. Notice how you feel.")
+    with coping_tab2:
+        st.write("Name 5 things you can see, 4 you can feel, 3 you can hear, 2 you can smell, 1 you can taste.")
+        demo = st.session_state.get('grounding_demo') or {}
+        sees = st.text_area("5 things you see", demo.get('sees', ''), key="grounding_sees")
+        feels = st.text_area("4 things you feel", demo.get('feels', ''), key="grounding_feels")
+        hears = st.text_area("3 things you hear", demo.get('hears', ''), key="grounding_hears")
+        smells = st.text_area("2 things you smell", demo.get('smells', ''), key="grounding_smells")
+        tastes = st.text_area("1 thing you taste", demo.get('tastes', ''), key="grounding_tastes")
+        if st.button("Save Grounding Notes"):
+            store.append("grounding", user_id, {"sees": sees, "feels": feels, "hears": hears, "smells": smells, "tastes": tastes})
+            st.success("Saved. Revisit what helped the most.")
+    with coping_tab3:
+        st.write("Pick a prompt to journal for 5 minutes.")
+        prompt = st.selectbox("Prompt", [
+            "What felt heavy today, and what eased it?",
+            "If a friend felt like you, what would you tell them?",
+            "List three small wins from the past week.",
+            "What support sounds helpful right now?",
+        ])
+        entry = st.text_area("Your journal entry")
+        if st.button("Save Journal Entry") and entry.strip():
+            record = {"prompt": prompt, "entry": entry, "ts": time.time()}
+            store.append("journal", user_id, record)
+            st.session_state.setdefault('journal_entries', []).append(record)
+            st.success("Entry saved on this app's server; anyone with this page's link can read it (see 'Your data' in the sidebar).")
+        if st.session_state.get('journal_entries'):
+            with st.expander(f"Past entries ({len(st.session_state['journal_entries'])} recent)"):
+                for past in reversed(st.session_state['journal_entries'][-5:]):
+                    st.markdown(f"**{time.strftime('%d %b %Y', time.localtime(past['ts']))}** — _{past['prompt']}_")
+                    st.write(past['entry'])
 
 divider_fn()
 section_title_fn("Coping Toolkit", "🧰")
-if st.session_state.get("highlight_coping"):
-    st.info("Jumped here from Agent actions — try Box Breathing or Grounding.")
-    st.session_state["highlight_coping"] = False
-coping_tab1, coping_tab2, coping_tab3 = st.tabs(["Box Breathing", "Grounding 5-4-3-2-1", "Journaling Prompts"])
-with coping_tab1:
-    st.write("Follow a 4-4-4-4 pattern: inhale, hold, exhale, hold.")
-    dur = st.slider("Cycle seconds", 3, 6, 4)
-    cycles = st.slider("Cycles", 1, 10, 4)
-    if st.button("Start Breathing Timer"):
-        import time
-        ph = st.empty()
-        for c in range(cycles):
-            for phase in ["Inhale", "Hold", "Exhale", "Hold"]:
-                ph.markdown(f"**{phase}** for {dur}s")
-                time.sleep(dur)
-        ph.markdown("Session complete. Notice how you feel.")
-with coping_tab2:
-    st.write("Name 5 things you can see, 4 you can feel, 3 you can hear, 2 you can smell, 1 you can taste.")
-    demo = st.session_state.get('grounding_demo') or {}
-    sees = st.text_area("5 things you see", demo.get('sees', ''), key="grounding_sees")
-    feels = st.text_area("4 things you feel", demo.get('feels', ''), key="grounding_feels")
-    hears = st.text_area("3 things you hear", demo.get('hears', ''), key="grounding_hears")
-    smells = st.text_area("2 things you smell", demo.get('smells', ''), key="grounding_smells")
-    tastes = st.text_area("1 thing you taste", demo.get('tastes', ''), key="grounding_tastes")
-    if st.button("Save Grounding Notes"):
-        st.success("Saved. Revisit what helped the most.")
-with coping_tab3:
-    st.write("Pick a prompt to journal for 5 minutes.")
-    prompt = st.selectbox("Prompt", [
-        "What felt heavy today, and what eased it?",
-        "If a friend felt like you, what would you tell them?",
-        "List three small wins from the past week.",
-        "What support sounds helpful right now?",
-    ])
-    entry = st.text_area("Your journal entry")
-    if st.button("Save Journal Entry"):
-        st.success("Entry saved locally for this session.")
+render_coping_toolkit()
+
+@section_fragment("playlists")
+def render_playlists():
+    if 'playlists' not in st.session_state:
+        st.session_state['playlists'] = []
+    if 'favorite_playlists' not in st.session_state:
+        st.session_state['favorite_playlists'] = set()
+    playlist_steps = st.multiselect(
+        "Build a short session",
+        ["Box Breathing (4 cycles)", "Grounding (5-4-3-2-1)", "Journaling (2 min)", "Micro-walk (3 min)"],
+    )
+    pl_name = st.text_input("Playlist name", "My Session")
+    if st.button("Save Playlist") and playlist_steps:
+        st.session_state['playlists'].append({"name": pl_name, "steps": playlist_steps})
+        store.append("playlist", user_id, {"name": pl_name, "steps": playlist_steps})
+        st.success("Playlist saved.")
+
+    # Favorite toggle
+    fav_pl = st.selectbox("Favorite a playlist", [p["name"] for p in st.session_state['playlists']] if st.session_state['playlists'] else ["None"], index=0)
+    if st.button("Toggle Favorite") and st.session_state['playlists']:
+        if fav_pl in st.session_state['favorite_playlists']:
+            st.session_state['favorite_playlists'].remove(fav_pl)
+        else:
+            st.session_state['favorite_playlists'].add(fav_pl)
+        st.info(f"Favorites: {', '.join(st.session_state['favorite_playlists']) if st.session_state['favorite_playlists'] else 'None'}")
+
+    selected_pl = st.selectbox("Run playlist", [p["name"] for p in st.session_state['playlists']] if st.session_state['playlists'] else ["None"], index=0)
+    if st.button("Start Session") and st.session_state['playlists']:
+        pl = next((p for p in st.session_state['playlists'] if p["name"] == selected_pl), None)
+        if pl:
+            timer = SessionTimer([phase for s in pl["steps"] for phase in step_phases(s)])
+            timer.start()
+            st.session_state['playlist_timer'] = timer
+            st.session_state['playlist_active'] = pl
+    pl = st.session_state.get('playlist_active')
+    if pl and 'playlist_timer' not in st.session_state:
+        st.session_state.pop('playlist_active', None)
+    elif pl:
+        st.markdown(f"### {pl['name']}")
+        show_timer('playlist_timer', "All steps complete.")
+        if st.session_state['playlist_timer'].status().done:
+            relief_scores = []
+            for s in pl["steps"]:
+                relief = st.slider(f"Relief after {s} (0–10)", 0, 10, 5, key=f"relief_{s}")
+                relief_scores.append(relief)
+            avg_relief = sum(relief_scores) / len(relief_scores) if relief_scores else 0
+            st.success(f"Session done. Average relief: {avg_relief:.1f}/10")
+            # Relief analytics
+            try:
+                import pandas as pd
+                import numpy as np
+                df_relief = pd.DataFrame({"step": pl["steps"], "relief": relief_scores})
+                st.bar_chart(df_relief.set_index("step"))
+                best_idx = int(np.argmax(relief_scores)) if relief_scores else None
+                if best_idx is not None:
+                    st.info(f"Top-performing step: {pl['steps'][best_idx]}")
+                # Suggest alternate if low relief
+                if any(r <= 4 for r in relief_scores):
+                    st.warning("Low relief detected. Try swapping in Box Breathing or a short micro-walk next time.")
+            except Exception:
+                pass
 
 divider_fn()
 section_title_fn("Session Playlists", "🎵")
-if 'playlists' not in st.session_state:
-    st.session_state['playlists'] = []
-if 'favorite_playlists' not in st.session_state:
-    st.session_state['favorite_playlists'] = set()
-playlist_steps = st.multiselect(
-    "Build a short session",
-    ["Box Breathing (4 cycles)", "Grounding (5-4-3-2-1)", "Journaling (2 min)", "Micro-walk (3 min)"],
-)
-pl_name = st.text_input("Playlist name", "My Session")
-if st.button("Save Playlist") and playlist_steps:
-    st.session_state['playlists'].append({"name": pl_name, "steps": playlist_steps})
-    st.success("Playlist saved.")
-
-# Favorite toggle
-fav_pl = st.selectbox("Favorite a playlist", [p["name"] for p in st.session_state['playlists']] if st.session_state['playlists'] else ["None"], index=0)
-if st.button("Toggle Favorite") and st.session_state['playlists']:
-    if fav_pl in st.session_state['favorite_playlists']:
-        st.session_state['favorite_playlists'].remove(fav_pl)
-    else:
-        st.session_state['favorite_playlists'].add(fav_pl)
-    st.info(f"Favorites: {', '.join(st.session_state['favorite_playlists']) if st.session_state['favorite_playlists'] else 'None'}")
-
-def run_step(step: str):
-    import time
-    ph = st.empty()
-    if step.startswith("Box Breathing"):
-        total = 16
-        for phase in ["Inhale", "Hold", "Exhale", "Hold"]:
-            ph.markdown(f"**{phase}** — 4s")
-            # countdown with pause/skip controls
-            pause_key = f"pause_{phase}"
-            skip_key = f"skip_{phase}"
-            st.session_state.setdefault(pause_key, False)
-            st.session_state.setdefault(skip_key, False)
-            for i in range(4, 0, -1):
-                ph.markdown(f"{phase}: {i}s")
-                if st.button("Pause", key=pause_key):
-                    time.sleep(1)
-                if st.button("Skip", key=skip_key):
-                    break
-                time.sleep(1)
-    elif step.startswith("Grounding"):
-        ph.markdown("Name 5 see, 4 feel, 3 hear, 2 smell, 1 taste.")
-        # short countdown
-        for i in range(5, 0, -1):
-            ph.markdown(f"Grounding: {i}s")
-            time.sleep(1)
-    elif step.startswith("Journaling"):
-        ph.markdown("Write two sentences about what you feel and one helpful action.")
-        for i in range(10, 0, -1):
-            ph.markdown(f"Journaling: {i}s")
-            time.sleep(1)
-    elif step.startswith("Micro-walk"):
-        ph.markdown("Walk around for 3 minutes or stretch gently.")
-        for i in range(10, 0, -1):
-            ph.markdown(f"Movement: {i}s")
-            time.sleep(1)
-    ph.markdown("Step complete.")
-
-selected_pl = st.selectbox("Run playlist", [p["name"] for p in st.session_state['playlists']] if st.session_state['playlists'] else ["None"], index=0)
-if st.button("Start Session") and st.session_state['playlists']:
-    pl = next((p for p in st.session_state['playlists'] if p["name"] == selected_pl), None)
-    if pl:
-        relief_scores = []
-        for s in pl["steps"]:
-            st.markdown(f"### {s}")
-            run_step(s)
-            relief = st.slider("Relief after this step (0–10)", 0, 10, 5, key=f"relief_{s}")
-            relief_scores.append(relief)
-        avg_relief = sum(relief_scores) / len(relief_scores) if relief_scores else 0
-        st.success(f"Session done. Average relief: {avg_relief:.1f}/10")
-        # Relief analytics
-        try:
-            import pandas as pd
-            import numpy as np
-            df_relief = pd.DataFrame({"step": pl["steps"], "relief": relief_scores})
-            st.bar_chart(df_relief.set_index("step"))
-            best_idx = int(np.argmax(relief_scores)) if relief_scores else None
-            if best_idx is not None:
-                st.info(f"Top-performing step: {pl['steps'][best_idx]}")
-            # Suggest alternate if low relief
-            if any(r <= 4 for r in relief_scores):
-                st.warning("Low relief detected. Try swapping in Box Breathing or a short micro-walk next time.")
-        except Exception:
-            pass
+render_playlists()
+
+RESOURCE_PAGE_SIZE = 10
+
+@st.cache_resource
+def get_provider_directory(path: str) -> ProviderDirectory:
+    return ProviderDirectory.load(path, gazetteer=Gazetteer.load())
+
+@section_fragment("resources")
+def render_resources():
+    city = st.text_input("City/ZIP", value=st.session_state.get('city', ''), key="city")
+    afford = st.selectbox("Affordability", ["Any", "Low-cost", "Insurance"], index=0, key="afford")
+    language = st.selectbox("Language", ["Any", "English", "Hindi", "Urdu"], index=0, key="language")
+    remote = st.selectbox("Remote/Online", ["Any", "Yes", "No"], index=0, key="remote")
+    radius = st.select_slider("Within (km)", options=[5, 10, 25, 50, 100, 250, "Any"], value=50, key="radius_km")
+    if st.button("Search Resources"):
+        st.session_state['resource_query'] = {"city": city, "afford": afford, "language": language, "remote": remote,
+                                              "radius_km": None if radius == "Any" else radius}
+        st.session_state['resource_page'] = 0
+    query = st.session_state.get('resource_query')
+    if query:
+        directory = get_provider_directory(DEFAULT_PROVIDERS_PATH)
+        result = directory.search(**query, page=st.session_state.get('resource_page', 0), page_size=RESOURCE_PAGE_SIZE)
+        if result.rows:
+            if result.origin:
+                st.caption(f"Nearest providers to {result.origin[0]}")
+            elif query["city"] and result.matched_places and normalize(query["city"]) not in result.matched_places:
+                st.caption("Showing matches for: " + ", ".join(result.matched_places))
+            for r in result.rows:
+                distance = f" • {r['distance_km']:.1f} km" if r.get('distance_km') is not None else ""
+                st.markdown(f"- **{r['name']}** ({r['type']}) — {r['city']}{distance} • {r['afford']} • {r['lang'].replace(';', '/')} • Remote: {r['remote']}")
+            if result.pages > 1:
+                prev_col, info_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    st.button("◀ Prev", key="resource_prev", disabled=result.page == 0,
+                              on_click=st.session_state.__setitem__, args=('resource_page', result.page - 1))
+                with info_col:
+                    st.caption(f"Page {result.page + 1} of {result.pages} • {result.total} providers")
+                with next_col:
+                    st.button("Next ▶", key="resource_next", disabled=result.page + 1 >= result.pages,
+                              on_click=st.session_state.__setitem__, args=('resource_page', result.page + 1))
+            st.caption("Tip: When reaching out, you can use this first message:")
+            st.code("Hello, I'm looking for support for stress/anxiety. Do you offer sessions that fit low-cost/insurance and remote options?", language="text")
+        else:
+            st.warning("No matches. Try broadening filters or remote options.")
 
 divider_fn()
 section_title_fn("Find Support Resources", "🧭")
-city = st.text_input("City/ZIP", value=st.session_state.get('city', ''), key="city")
-afford = st.selectbox("Affordability", ["Any", "Low-cost", "Insurance"], index=0, key="afford")
-language = st.selectbox("Language", ["Any", "English", "Hindi", "Urdu"], index=0, key="language")
-remote = st.selectbox("Remote/Online", ["Any", "Yes", "No"], index=0, key="remote")
-if st.button("Search Resources"):
-    # Mock directory; in production, integrate an API/dataset
-    resources = [
-        {"name": "Calm Minds Clinic", "type": "Therapist", "city": "Delhi", "afford": "Low-cost", "lang": "Hindi", "remote": "Yes"},
-        {"name": "Hope Support Group", "type": "Group", "city": "Mumbai", "afford": "Any", "lang": "English", "remote": "Yes"},
-        {"name": "Better Days Telehealth", "type": "Telehealth", "city": "Any", "afford": "Insurance", "lang": "English", "remote": "Yes"},
-    ]
-    def match(r):
-        ok = True
-        if city and city.lower() not in (r["city"].lower(), "any"):
-            ok = False
-        if afford != "Any" and r["afford"] != afford:
-            ok = False
-        if language != "Any" and r["lang"] != language:
-            ok = False
-        if remote != "Any" and r["remote"] != remote:
-            ok = False
-        return ok
-    hits = [r for r in resources if match(r)]
-    if hits:
-        for r in hits:
-            st.markdown(f"- **{r['name']}** ({r['type']}) — {r['city']} • {r['afford']} • {r['lang']} • Remote: {r['remote']}")
-        st.caption("Tip: When reaching out, you can use this first message:")
-        st.code("Hello, I'm looking for support for stress/anxiety. Do you offer sessions that fit low-cost/insurance and remote options?", language="text")
-    else:
-        st.warning("No matches. Try broadening filters or remote options.")
-
-divider_fn()
-section_title_fn("Weekly Check-in", "📈")
-check_col1, check_col2, check_col3 = st.columns(3)
-with check_col1:
-    mood = st.slider("Mood (1–10)", 1, 10, 5)
-with check_col2:
-    sleep = st.slider("Sleep hours", 0, 12, 7)
-with check_col3:
-    stress = st.slider("Stress (1–10)", 1, 10, 5)
-if 'checkins' not in st.session_state:
-    st.session_state['checkins'] = []
-if st.button("Add Check-in"):
-    st.session_state['checkins'].append({"mood": mood, "sleep": sleep, "stress": stress})
-    st.success("Check-in added.")
-if st.session_state['checkins']:
-    import pandas as pd
-    df = pd.DataFrame(st.session_state['checkins'])
-    st.line_chart(df)
-    st.caption("Trend of mood, sleep, and stress over your check-ins.")
-    st.info("Reminder: You can revisit weekly and add a new check-in.")
-
-    # --- New: Insights & Smart Nudges ---
-    st.subheader("Insights & Smart Nudges")
-    try:
-        corr = df.corr(numeric_only=True)
-        # Extract simple pair correlations
-        cm = {
-            "mood~sleep": float(corr.loc["mood", "sleep"]) if "mood" in corr.index and "sleep" in corr.columns else None,
-            "mood~stress": float(corr.loc["mood", "stress"]) if "mood" in corr.index and "stress" in corr.columns else None,
-            "sleep~stress": float(corr.loc["sleep", "stress"]) if "sleep" in corr.index and "stress" in corr.columns else None,
-        }
+render_resources()
+
+def checkin_stats():
+    """Session CheckinStats, folding in only check-ins added since the last call."""
+    rows = st.session_state.get('checkins', [])
+    stats = st.session_state.get('_checkin_stats')
+    if stats is None or stats.count > len(rows):
+        stats = st.session_state['_checkin_stats'] = CheckinStats()
+    for row in rows[stats.count:]:
+        stats.add(row)
+    return stats
+
+@section_fragment("checkin")
+def render_checkin():
+    check_col1, check_col2, check_col3 = st.columns(3)
+    with check_col1:
+        mood = st.slider("Mood (1–10)", 1, 10, 5)
+    with check_col2:
+        sleep = st.slider("Sleep hours", 0, 12, 7)
+    with check_col3:
+        stress = st.slider("Stress (1–10)", 1, 10, 5)
+    if 'checkins' not in st.session_state:
+        st.session_state['checkins'] = []
+    if st.button("Add Check-in"):
+        checkin = {"mood": mood, "sleep": sleep, "stress": stress, "ts": time.time()}
+        st.session_state['checkins'].append(checkin)
+        store.append_checkin(user_id, checkin)
+        st.success("Check-in added.")
+    if st.session_state['checkins']:
+        import pandas as pd
+        range_days = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "All": None}
+        shown_range = st.selectbox("Chart range", list(range_days), index=3, key="checkin_range")
+        rows = st.session_state['checkins']
+        if range_days[shown_range] is not None:
+            since = time.time() - range_days[shown_range] * 86400
+            rows = [r for r in rows if r.get("ts", since) >= since]
+        df = pd.DataFrame(rows or st.session_state['checkins'][-1:], columns=["mood", "sleep", "stress", "ts"])
+        df.index = pd.to_datetime(df.pop("ts"), unit="s")
+        st.line_chart(df)
+        st.caption("Trend of mood, sleep, and stress over your check-ins.")
+        st.info("Reminder: You can revisit weekly and add a new check-in.")
+
+        # --- New: Insights & Smart Nudges ---
+        st.subheader("Insights & Smart Nudges")
+        stats = checkin_stats()
+        window = stats.window(range_days[shown_range])
+        cm = window.correlations()
         msgs = []
         if cm["mood~sleep"] is not None and cm["mood~sleep"] > 0.3:
             msgs.append("Better sleep correlates with improved mood.")
@@ -589,407 +748,331 @@ if st.session_state['checkins']:
             msgs.append("More sleep correlates with less stress.")
         if msgs:
             st.success("Insights: " + " ".join(msgs))
+        elif window.n < 2:
+            st.caption("Insights unavailable. Add more check-ins to enable analytics.")
         else:
             st.caption("Not enough data for strong insights yet. Keep logging!")
-    except Exception:
-        st.caption("Insights unavailable. Add more check-ins to enable analytics.")
-
-    nudges_enabled = st.checkbox("Enable gentle nudges (local-only)", value=st.session_state.get("nudges_enabled", False), key="nudges_enabled")
-    if nudges_enabled:
-        # Simple, local suggestion based on latest check-in
-        last = df.iloc[-1]
-        suggestions = []
-        if last.get("sleep", 7) <= 5:
-            suggestions.append("Try an earlier wind-down with device-off + dim lights.")
-        if last.get("stress", 5) >= 7:
-            suggestions.append("Do a grounding session and send one supportive text.")
-        if last.get("mood", 5) <= 4:
-            suggestions.append("Plan a 10-min walk and note one positive moment.")
-        if suggestions:
-            st.warning("Today’s nudge: " + " ".join(suggestions))
-        else:
-            st.info("No strong nudge needed today. Keep steady!")
+        trends = []
+        for metric, label in (("mood", "Mood"), ("sleep", "Sleep"), ("stress", "Stress")):
+            delta = stats.trend(metric)
+            if abs(delta) >= 0.5:
+                trends.append(f"{label} {'rising' if delta > 0 else 'falling'} ({delta:+.1f})")
+        if trends:
+            st.caption("Recent trend: " + ", ".join(trends) + ".")
+
+        nudges_enabled = st.checkbox("Enable gentle nudges (local-only)", value=st.session_state.get("nudges_enabled", False), key="nudges_enabled")
+        if nudges_enabled:
+            # Simple, local suggestion based on latest check-in
+            last = stats.last
+            suggestions = []
+            if last["sleep"] <= 5:
+                suggestions.append("Try an earlier wind-down with device-off + dim lights.")
+            if last["stress"] >= 7:
+                suggestions.append("Do a grounding session and send one supportive text.")
+            if last["mood"] <= 4:
+                suggestions.append("Plan a 10-min walk and note one positive moment.")
+            if suggestions:
+                st.warning("Today’s nudge: " + " ".join(suggestions))
+            else:
+                st.info("No strong nudge needed today. Keep steady!")
+
+divider_fn()
+section_title_fn("Weekly Check-in", "📈")
+render_checkin()
+
+@section_fragment("safety_card")
+def render_safety_card():
+    warn = st.text_area("Warning signs you notice")
+    supports = st.text_area("People to contact (names + numbers)")
+    steps = st.text_area("If I notice warning signs, I will…")
+    if st.button("Create Safety Card"):
+        card = f"""
+    Safety Card\n\nWarning signs:\n{warn}\n\nSupports to contact:\n{supports}\n\nPlan:\n{steps}\n\nEmergency: 988 (US), 112/999 (local), or nearest emergency services.
+    """
+        st.session_state['safety_card'] = card
+        st.success("Safety card ready. You can copy/save it.")
+    if st.session_state.get('safety_card'):
+        st.text_area("Your Safety Card", st.session_state['safety_card'], height=200)
+        st.download_button(
+            label="Download Safety Card",
+            data=st.session_state['safety_card'],
+            file_name="safety_card.txt",
+            mime="text/plain",
+        )
 
 divider_fn()
 section_title_fn("Crisis Readiness Card", "🆘")
-warn = st.text_area("Warning signs you notice")
-supports = st.text_area("People to contact (names + numbers)")
-steps = st.text_area("If I notice warning signs, I will…")
-if st.button("Create Safety Card"):
-    card = f"""
-Safety Card\n\nWarning signs:\n{warn}\n\nSupports to contact:\n{supports}\n\nPlan:\n{steps}\n\nEmergency: 988 (US), 112/999 (local), or nearest emergency services.
-"""
-    st.session_state['safety_card'] = card
-    st.success("Safety card ready. You can copy/save it.")
-if st.session_state.get('safety_card'):
-    st.text_area("Your Safety Card", st.session_state['safety_card'], height=200)
-    st.download_button(
-        label="Download Safety Card",
-        data=st.session_state['safety_card'],
-        file_name="safety_card.txt",
-        mime="text/plain",
-    )
+render_safety_card()
+
+@section_fragment("care_path")
+def render_care_path():
+    if st.session_state.get("highlight_care_path"):
+        st.info("Start by choosing a duration and focus — your care path will adapt.")
+        st.session_state["highlight_care_path"] = False
+    path_len = st.selectbox("Path duration", [f"{w} weeks" for w in DURATIONS_WEEKS], index=1, key="path_len")
+    focus = st.selectbox("Primary focus", [
+        "Sleep regulation",
+        "Anxiety management",
+        "Burnout recovery",
+        "Depression support",
+        "General wellbeing",
+    ], key="focus")
+
+    duration_weeks = int(path_len.split(" ")[0])
+    scores = screening_scores()
+
+    if st.button("Generate Care Path"):
+        # Memoised on (duration, focus, PHQ, GAD); holds template segments, not day strings
+        st.session_state['care_path'] = build_path(duration_weeks, focus, scores["phq"].total, scores["gad"].total)
+        st.success("Care path generated.")
+    path = st.session_state.get('care_path')
+    if path:
+        st.markdown(f"**Focus:** {path.focus}")
+        st.info(path.note)
+        weeks = path.days // 7
+        # Only the visible window of days is expanded and rendered, so long programs stay cheap
+        start_week = st.select_slider("From week", list(range(1, weeks + 1)), value=1, key="path_week") if weeks > 4 else 1
+        show_n = st.slider("Show N days", 7, min(28, path.days), 14, key="path_show_n")
+        st.markdown("\n".join(f"- {step}" for step in path.steps((start_week - 1) * 7 + 1, show_n)))
+        st.download_button("Download Care Path", path_markdown(path), file_name="care_path.md", mime="text/markdown")
 
 divider_fn()
 section_title_fn("Personalized Care Pathways", "🛤️")
-if st.session_state.get("highlight_care_path"):
-    st.info("Start by choosing a duration and focus — your care path will adapt.")
-    st.session_state["highlight_care_path"] = False
-path_len = st.selectbox("Path duration", ["2 weeks", "3 weeks", "4 weeks"], index=1, key="path_len")
-focus = st.selectbox("Primary focus", [
-    "Sleep regulation",
-    "Anxiety management",
-    "Burnout recovery",
-    "Depression support",
-    "General wellbeing",
-], key="focus")
-
-def build_path(duration_weeks: int, focus_area: str, phq_total: int = 0, gad_total: int = 0):
-    days = duration_weeks * 7
-    steps = []
-    for d in range(1, days + 1):
-        if focus_area == "Sleep regulation":
-            steps.append(f"Day {d}: Fixed bedtime + device-off 30m before sleep; 5-min breathwork.")
-        elif focus_area == "Anxiety management":
-            steps.append(f"Day {d}: 5-4-3-2-1 grounding + 4x box breathing; log one worry and reframe.")
-        elif focus_area == "Burnout recovery":
-            steps.append(f"Day {d}: 10-min walk + one boundary action (say no/delegate); gratitude 3 lines.")
-        elif focus_area == "Depression support":
-            steps.append(f"Day {d}: 1 small activity (shower/dish), 5-min sunlight, text one supportive person.")
-        else:
-            steps.append(f"Day {d}: 3-min habit: stretch + breath + one positive note.")
-    # Tailor intensity based on scores
-    note = ""
-    if phq_total >= 15 or gad_total >= 15:
-        note = "High symptom levels detected — prioritize minimal, doable steps and consider professional support."
-    elif phq_total >= 10 or gad_total >= 10:
-        note = "Moderate levels — add one optional support contact per week."
-    else:
-        note = "Keep consistency; celebrate small wins each week."
-    return steps, note
-
-duration_weeks = int(path_len.split(" ")[0])
-# Try to reuse PHQ/GAD totals if they exist in the widget keys
-phq_total_val = 0
-gad_total_val = 0
-try:
-    phq_total_val = sum(int(st.session_state.get(f"phq_{i}", "0 - Not at all").split(" ")[0]) for i in range(9))
-    gad_total_val = sum(int(st.session_state.get(f"gad_{i}", "0 - Not at all").split(" ")[0]) for i in range(7))
-except Exception:
-    pass
-
-path_steps, path_note = build_path(duration_weeks, focus, phq_total_val, gad_total_val)
-if st.button("Generate Care Path"):
-    st.session_state['care_path'] = {"focus": focus, "note": path_note, "steps": path_steps}
-    st.success("Care path generated.")
-if st.session_state.get('care_path'):
-    st.markdown(f"**Focus:** {st.session_state['care_path']['focus']}")
-    st.info(st.session_state['care_path']['note'])
-    show_n = st.slider("Show first N days", 7, min(28, len(st.session_state['care_path']['steps'])), 14)
-    for s in st.session_state['care_path']['steps'][:show_n]:
-        st.markdown(f"- {s}")
-    cp_md = (
-        "## Care Path\n\n" +
-        f"Focus: {st.session_state['care_path']['focus']}\n\n" +
-        st.session_state['care_path']['note'] + "\n\n" +
-        "\n".join([f"- {x}" for x in st.session_state['care_path']['steps']])
-    )
-    st.download_button("Download Care Path", cp_md, file_name="care_path.md", mime="text/markdown")
+render_care_path()
+
+@section_fragment("habit_coach")
+def render_habit_coach():
+    if 'habits' not in st.session_state:
+        st.session_state['habits'] = []
+    if 'habit_streak' not in st.session_state:
+        st.session_state['habit_streak'] = 0
+
+    habit = st.selectbox("Pick a micro-habit", [
+        "1 deep-breath cycle",
+        "30-second stretch",
+        "2-sentence journal",
+        "Drink a glass of water",
+    ])
+    trigger_rule = st.selectbox("Optional trigger rule", [
+        "None",
+        "If stress ≥7 → suggest grounding",
+        "If sleep ≤5 → suggest early wind-down",
+        "If mood ≤4 → suggest social contact",
+    ])
+    if st.button("Log Habit Done"):
+        st.session_state['habits'].append({"habit": habit, "ts": time.time()})
+        store.append("habit", user_id, {"habit": habit})
+        st.session_state['habit_streak'] += 1
+        st.success("Nice! Habit logged — streak +1")
+
+    st.write(f"Current streak: {st.session_state['habit_streak']} days")
+    if st.session_state['habits']:
+        mosaic = "".join(["🟩" if i % 2 == 0 else "🟦" for i in range(min(30, len(st.session_state['habits'])))])
+        st.markdown(f"Streak mosaic: {mosaic}")
+
+    # Simple trigger suggestions based on latest check-in
+    last_check = st.session_state['checkins'][-1] if st.session_state.get('checkins') else None
+    if trigger_rule != "None" and last_check:
+        suggestion = None
+        if trigger_rule.startswith("If stress") and last_check['stress'] >= 7:
+            suggestion = "Try 5-4-3-2-1 grounding and one supportive text."
+        elif trigger_rule.startswith("If sleep") and last_check['sleep'] <= 5:
+            suggestion = "Start wind-down 45m earlier; device-off; dim lights."
+        elif trigger_rule.startswith("If mood") and last_check['mood'] <= 4:
+            suggestion = "Reach out to a friend; 10-min walk; note one positive." 
+        if suggestion:
+            st.warning(f"Trigger active: {suggestion}")
 
 divider_fn()
 section_title_fn("Habit Coach", "📆")
-if 'habits' not in st.session_state:
-    st.session_state['habits'] = []
-if 'habit_streak' not in st.session_state:
-    st.session_state['habit_streak'] = 0
-
-habit = st.selectbox("Pick a micro-habit", [
-    "1 deep-breath cycle",
-    "30-second stretch",
-    "2-sentence journal",
-    "Drink a glass of water",
-])
-trigger_rule = st.selectbox("Optional trigger rule", [
-    "None",
-    "If stress ≥7 → suggest grounding",
-    "If sleep ≤5 → suggest early wind-down",
-    "If mood ≤4 → suggest social contact",
-])
-if st.button("Log Habit Done"):
-    st.session_state['habits'].append({"habit": habit})
-    st.session_state['habit_streak'] += 1
-    st.success("Nice! Habit logged — streak +1")
-
-st.write(f"Current streak: {st.session_state['habit_streak']} days")
-if st.session_state['habits']:
-    mosaic = "".join(["🟩" if i % 2 == 0 else "🟦" for i in range(min(30, len(st.session_state['habits'])))])
-    st.markdown(f"Streak mosaic: {mosaic}")
-
-# Simple trigger suggestions based on latest check-in
-last_check = st.session_state['checkins'][-1] if st.session_state.get('checkins') else None
-if trigger_rule != "None" and last_check:
-    suggestion = None
-    if trigger_rule.startswith("If stress") and last_check['stress'] >= 7:
-        suggestion = "Try 5-4-3-2-1 grounding and one supportive text."
-    elif trigger_rule.startswith("If sleep") and last_check['sleep'] <= 5:
-        suggestion = "Start wind-down 45m earlier; device-off; dim lights."
-    elif trigger_rule.startswith("If mood") and last_check['mood'] <= 4:
-        suggestion = "Reach out to a friend; 10-min walk; note one positive." 
-    if suggestion:
-        st.warning(f"Trigger active: {suggestion}")
+render_habit_coach()
 
-if st.button("Get Support Plan"):
-    if not api_key:
-        st.error("Please enter your OpenAI API key.")
+PLAN_SECTIONS = (
+    ("assessment", "Situation Assessment"),
+    ("action", "Action Plan & Resources"),
+    ("followup", "Long-term Support Strategy"),
+)
+SUMMARY_LABELS = {"assessment": "Assessment", "action": "Action Plan", "followup": "Follow-up Strategy"}
+
+def plan_route():
+    """``(route, note)`` for a plan request from the current intake."""
+    # Low-signal requests can go to the lighter model; anything risky keeps the chosen route
+    if light_routing:
+        return light_route(model_route, mental_state, recent_changes, current_symptoms)
+    return model_route, ""
+
+def start_plan_job():
+    """Queue the plan as a background job (or record a cache hit) and return it."""
+    task = build_task(mental_state, sleep_pattern, stress_level, support_system, recent_changes, current_symptoms)
+    route, note = plan_route()
+    run_mode = plan_run_mode(plan_mode == "Parallel (async)")
+    plan_model = route.cache_tag(run_mode)
+
+    cached = plan_cache.get(task, plan_model)
+    if cached is not None:
+        # Identical intake + model: reuse the stored plan, no LLM call
+        metrics = PlanMetrics(mode="cache")
+        metrics.mark_first_token()
+        metrics.finish()
+        return plan_jobs.complete(user_id, cached, "cache", plan_model, note, metrics.as_dict(), task=task,
+                                   route=route)
+
+    metrics = PlanMetrics(mode=run_mode)
+    budget = TokenBudget(max_prompt_tokens=int(prompt_budget), model=route.section)
+    stream = stream_plan
+    structured = structured_plan
+
+    # Runs on a scheduler thread: no Streamlit calls in here, progress goes to the job
+    def generate(on_summary, on_section):
+        return generate_plan(
+            run_mode, api_key, route, task, client_registry,
+            on_summary=on_summary,
+            on_section=on_section,
+            stream=stream,
+            metrics=metrics,
+            budget=budget,
+            structured=structured,
+        )
+
+    def cache_plan(output):
+        if all(output.values()):
+            plan_cache.put(task, plan_model, output)
+
+    # Identical requests on the same API key already in flight (any session) attach to the same job
+    return plan_jobs.submit(
+        user_id, api_key, generate,
+        key=(key_fingerprint(api_key), cache_key(task, plan_model), run_mode),
+        cost=LLM_CALLS_PER_PLAN[run_mode],
+        mode=run_mode, model=plan_model, note=note, metrics=metrics, task=task, route=route,
+        on_done=cache_plan,
+    )
+
+def start_section_job(job, key: str):
+    """Queue a job that rewrites one section of the finished ``job`` and keeps the other two."""
+    task = job.task or build_task(mental_state, sleep_pattern, stress_level, support_system, recent_changes,
+                                  current_symptoms)
+    # Same models as the rest of the plan, whatever the sidebar says now. Jobs saved before routes
+    # were recorded use the current route and leave the cached plan (keyed by the old route) alone
+    route = job.model_route
+    cache_result = route is not None
+    if route is None:
+        route, _note = plan_route()
+    metrics = PlanMetrics(mode="section")
+    budget = TokenBudget(max_prompt_tokens=int(prompt_budget), model=route.section)
+    kept = {gen: text for gen, text in job.output.items() if gen != key}
+    summaries = dict(job.summaries)
+    stream = stream_plan
+    structured = structured_plan
+
+    def generate(on_summary, on_section):
+        text = regenerate_section(
+            job.mode, api_key, route, task, key, client_registry,
+            summaries=summaries,
+            on_section=on_section,
+            stream=stream,
+            metrics=metrics,
+            budget=budget,
+            structured=structured,
+        )
+        if not text.strip():
+            raise ValueError(f"No {SUMMARY_LABELS[key]} section came back.")
+        return dict(kept, **{key: text})
+
+    def cache_plan(output):
+        # The stored plan for this intake gets the new section too
+        plan_cache.put(task, job.model, output)
+
+    return plan_jobs.submit(
+        user_id, api_key, generate,
+        key=(key_fingerprint(api_key), job.job_id, key),
+        cost=1,
+        mode=job.mode, model=job.model, note=job.note, metrics=metrics, task=task,
+        route=route if cache_result else None,
+        summaries=summaries, sections=kept,
+        on_done=cache_plan if cache_result else None,
+    )
+
+@section_fragment("plan_job", run_every=PLAN_POLL_SECONDS)
+def poll_plan_job(job_id: str):
+    job = plan_jobs.get(job_id)
+    if job is None or job.finished:
+        # Full rerun so the finished plan renders outside the polling fragment
+        st.rerun()
+    if job.status == "queued":
+        st.info(f"⏳ Waiting for a free slot · {scheduler.queue_depth} plan request(s) queued")
     else:
-        with st.spinner('🤖 AI Agents are analyzing your situation...'):
-            try:
-                task = f"""
-                Create a comprehensive mental health support plan based on:
-                
-                Emotional State: {mental_state}
-                Sleep: {sleep_pattern} hours per night
-                Stress Level: {stress_level}/10
-                Support System: {', '.join(support_system) if support_system else 'None reported'}
-                Recent Changes: {recent_changes}
-                Current Symptoms: {', '.join(current_symptoms) if current_symptoms else 'None reported'}
-                """
-
-                system_messages = {
-                    "assessment_agent": """
-                    You are an experienced mental health professional speaking directly to the user. Your task is to:
-                    1. Create a safe space by acknowledging their courage in seeking support
-                    2. Analyze their emotional state with clinical precision and genuine empathy
-                    3. Ask targeted follow-up questions to understand their full situation
-                    4. Identify patterns in their thoughts, behaviors, and relationships
-                    5. Assess risk levels with validated screening approaches
-                    6. Help them understand their current mental health in accessible language
-                    7. Validate their experiences without minimizing or catastrophizing
-
-                    Always use "you" and "your" when addressing the user. Blend clinical expertise with genuine warmth and never rush to conclusions.
-                    """,
-                    
-                    "action_agent": """
-                    You are a crisis intervention and resource specialist speaking directly to the user. Your task is to:
-                    1. Provide immediate evidence-based coping strategies tailored to their specific situation
-                    2. Prioritize interventions based on urgency and effectiveness
-                    3. Connect them with appropriate mental health services while acknowledging barriers (cost, access, stigma)
-                    4. Create a concrete daily wellness plan with specific times and activities
-                    5. Suggest specific support communities with details on how to join
-                    6. Balance crisis resources with empowerment techniques
-                    7. Teach simple self-regulation techniques they can use immediately
-
-                    Focus on practical, achievable steps that respect their current capacity and energy levels. Provide options ranging from minimal effort to more involved actions.
-                    """,
-                    
-                    "followup_agent": """
-                    You are a mental health recovery planner speaking directly to the user. Your task is to:
-                    1. Design a personalized long-term support strategy with milestone markers
-                    2. Create a progress monitoring system that matches their preferences and habits
-                    3. Develop specific relapse prevention strategies based on their unique triggers
-                    4. Establish a support network mapping exercise to identify existing resources
-                    5. Build a graduated self-care routine that evolves with their recovery
-                    6. Plan for setbacks with self-compassion techniques
-                    7. Set up a maintenance schedule with clear check-in mechanisms
-
-                    Focus on building sustainable habits that integrate with their lifestyle and values. Emphasize progress over perfection and teach skills for self-directed care.
-                    """
-                }
-
-                llm_config = {
-                    "config_list": [{"model": model_choice, "api_key": api_key}]
-                }
-
-                context_variables = {
-                    "assessment": None,
-                    "action": None,
-                    "followup": None,
-                }
-
-                def update_assessment_overview(assessment_summary: str, context_variables: dict) -> SwarmResult:
-                    context_variables["assessment"] = assessment_summary
-                    st.sidebar.success('Assessment: ' + assessment_summary)
-                    return SwarmResult(agent="action_agent", context_variables=context_variables)
-
-                def update_action_overview(action_summary: str, context_variables: dict) -> SwarmResult:
-                    context_variables["action"] = action_summary
-                    st.sidebar.success('Action Plan: ' + action_summary)
-                    return SwarmResult(agent="followup_agent", context_variables=context_variables)
-
-                def update_followup_overview(followup_summary: str, context_variables: dict) -> SwarmResult:
-                    context_variables["followup"] = followup_summary
-                    st.sidebar.success('Follow-up Strategy: ' + followup_summary)
-                    return SwarmResult(agent="assessment_agent", context_variables=context_variables)
-
-                def update_system_message_func(agent: SwarmAgent, messages) -> str:
-                    system_prompt = system_messages[agent.name]
-                    current_gen = agent.name.split("_")[0]
-                    
-                    if agent._context_variables.get(current_gen) is None:
-                        system_prompt += f"Call the update function provided to first provide a 2-3 sentence summary of your ideas on {current_gen.upper()} based on the context provided."
-                        agent.llm_config['tool_choice'] = {"type": "function", "function": {"name": f"update_{current_gen}_overview"}}
-                    else:
-                        agent.llm_config["tools"] = None
-                        agent.llm_config['tool_choice'] = None
-                        system_prompt += f"\n\nYour task\nYou task is write the {current_gen} part of the report. Do not include any other parts. Do not use XML tags.\nStart your reponse with: '## {current_gen.capitalize()} Design'."    
-                        k = list(agent._oai_messages.keys())[-1]
-                        agent._oai_messages[k] = agent._oai_messages[k][:1]
-
-                    system_prompt += f"\n\n\nBelow are some context for you to refer to:"
-                    for k, v in agent._context_variables.items():
-                        if v is not None:
-                            system_prompt += f"\n{k.capitalize()} Summary:\n{v}"
-
-                    agent.client = OpenAIWrapper(**agent.llm_config)
-                    return system_prompt
-                
-                if SwarmAgent is not None:
-                    state_update = UPDATE_SYSTEM_MESSAGE(update_system_message_func)
-                    assessment_agent = SwarmAgent(
-                        "assessment_agent", 
-                        llm_config=llm_config,
-                        functions=update_assessment_overview,
-                        update_agent_state_before_reply=[state_update]
-                    )
-
-                    action_agent = SwarmAgent(
-                        "action_agent",
-                        llm_config=llm_config,
-                        functions=update_action_overview,
-                        update_agent_state_before_reply=[state_update]
-                    )
-
-                    followup_agent = SwarmAgent(
-                        "followup_agent",
-                        llm_config=llm_config,
-                        functions=update_followup_overview,
-                        update_agent_state_before_reply=[state_update]
-                    )
-
-                    assessment_agent.register_hand_off(AFTER_WORK(action_agent))
-                    action_agent.register_hand_off(AFTER_WORK(followup_agent))
-                    followup_agent.register_hand_off(AFTER_WORK(assessment_agent))
-
-                    result, _, _ = initiate_swarm_chat(
-                        initial_agent=assessment_agent,
-                        agents=[assessment_agent, action_agent, followup_agent],
-                        user_agent=None,
-                        messages=task,
-                        max_rounds=13,
-                    )
-
-                    if hasattr(result, "chat_history") and len(result.chat_history) >= 3:
-                        st.session_state.output = {
-                            'assessment': result.chat_history[-3]['content'],
-                            'action': result.chat_history[-2]['content'],
-                            'followup': result.chat_history[-1]['content']
-                        }
-                    else:
-                        st.error("Unexpected swarm response format.")
-                        st.session_state.output = {
-                            'assessment': '',
-                            'action': '',
-                            'followup': ''
-                        }
+        st.info("🤖 AI Agents are analyzing your situation... you can keep using the app meanwhile.")
+    for key, text in dict(job.summaries).items():
+        st.caption(f"{SUMMARY_LABELS[key]}: {text}")
+    sections = dict(job.sections)
+    for key, label in PLAN_SECTIONS:
+        with st.expander(label, expanded=stream_plan and key in sections):
+            st.markdown(sections.get(key) or "_Writing..._")
+
+def render_plan(job, celebrate: bool):
+    for key, text in job.summaries.items():
+        st.sidebar.success(f"{SUMMARY_LABELS[key]}: {text}")
+    for key, label in PLAN_SECTIONS:
+        with st.expander(label, expanded=stream_plan):
+            st.markdown(job.output[key])
+            if st.button("Regenerate this section", key=f"regen_{key}",
+                         help="Rewrites only this section; the other two stay as they are."):
+                if not api_key:
+                    st.error("Please enter your OpenAI API key.")
                 else:
-                    if OpenAI is None:
-                        raise ImportError("OpenAI client is not installed. Please install 'openai'.")
-                    client = OpenAI(api_key=api_key)
-                    prompt = f"""
-You are a supportive mental health assistant. Based on the user's details, produce three sections:
-1) ## Assessment Design
-2) ## Action Design
-3) ## Followup Design
-Keep responses empathetic, practical, and safe.
-
-Details:
-{task}
-"""
-                    completion = client.chat.completions.create(
-                        model=model_choice,
-                        messages=[
-                            {"role": "system", "content": "You are a helpful, empathetic mental health assistant."},
-                            {"role": "user", "content": prompt},
-                        ],
-                        temperature=0.7,
-                    )
-                    content = completion.choices[0].message.content
-                    # Split naive by section headers for display
-                    def extract(section_title: str, text: str) -> str:
-                        import re
-                        pattern = rf"##\s*{section_title}.*?(?=(\n##|\Z))"
-                        m = re.search(pattern, text, flags=re.IGNORECASE | re.DOTALL)
-                        return m.group(0) if m else ""
-
-                    st.session_state.output = {
-                        'assessment': extract('Assessment', content),
-                        'action': extract('Action', content),
-                        'followup': extract('Followup', content),
-                    }
-
-                with st.expander("Situation Assessment"):
-                    st.markdown(st.session_state.output['assessment'])
-
-                with st.expander("Action Plan & Resources"):
-                    st.markdown(st.session_state.output['action'])
-
-                with st.expander("Long-term Support Strategy"):
-                    st.markdown(st.session_state.output['followup'])
-
-                st.success('✨ Mental health support plan generated successfully!')
-                success_confetti()
-                combined = (
-                    ("# Situation Assessment\n\n" + st.session_state.output['assessment']) +
-                    ("\n\n# Action Plan & Resources\n\n" + st.session_state.output['action']) +
-                    ("\n\n# Long-term Support Strategy\n\n" + st.session_state.output['followup'])
-                )
-                st.download_button(
-                    label="Download Plan (Markdown)",
-                    data=combined,
-                    file_name="mental_support_plan.md",
-                    mime="text/markdown",
-                )
-
-                # --- New: Therapist Handoff + Prep Pack ---
-                divider_fn()
-                section_title_fn("Therapist Handoff + Prep Pack", "🤝")
-                # Recompute PHQ/GAD from session if available
-                def _sum_scale(prefix: str, n: int) -> int:
-                    total = 0
-                    for i in range(n):
-                        raw = st.session_state.get(f"{prefix}_{i}") or "0 - Not at all"
-                        try:
-                            total += int(str(raw).split(" ")[0])
-                        except Exception:
-                            total += 0
-                    return total
-                phq_total_pp = _sum_scale("phq", 9)
-                gad_total_pp = _sum_scale("gad", 7)
-                def _sev(score: int, kind: str) -> str:
-                    if kind == "phq":
-                        return (
-                            "Minimal (0–4)" if score <= 4 else
-                            "Mild (5–9)" if score <= 9 else
-                            "Moderate (10–14)" if score <= 14 else
-                            "Moderately severe (15–19)" if score <= 19 else
-                            "Severe (20–27)"
-                        )
-                    else:
-                        return (
-                            "Minimal (0–4)" if score <= 4 else
-                            "Mild (5–9)" if score <= 9 else
-                            "Moderate (10–14)" if score <= 14 else
-                            "Severe (15–21)"
-                        )
-
-                overview = (st.session_state.get("mental_state") or "").strip()
-                changes = (st.session_state.get("recent_changes") or "").strip()
-                symptoms_list = st.session_state.get("current_symptoms") or []
-                safety_present = bool(st.session_state.get("safety_card"))
-                care_focus = st.session_state.get("care_path", {}).get("focus", "")
-
-                # Build a de-identified prep summary
-                prep_md = """## Therapy Prep Summary (De-identified)
+                    try:
+                        regen = start_section_job(job, key)
+                        st.session_state['plan_job'] = regen.job_id
+                        st.query_params["job"] = regen.job_id
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"An error occurred: {str(e)}")
+    metrics = job.metrics
+    st.session_state['plan_metrics'] = metrics
+    if metrics.get('ttft_s') is not None and metrics.get('total_s') is not None:
+        st.caption(f"First output after {metrics['ttft_s']:.2f}s · full plan in {metrics['total_s']:.2f}s ({metrics['mode']})")
+    if job.note:
+        st.caption(job.note)
+    if metrics.get('stages'):
+        st.caption("Stage latency: " + " · ".join(f"{name} {secs:.2f}s" for name, secs in metrics['stages'].items()))
+    if metrics.get('turns'):
+        st.caption(f"Tokens: {metrics['prompt_tokens']} prompt · {metrics['completion_tokens']} completion over {len(metrics['turns'])} turns")
+        with st.expander("Token usage per turn"):
+            st.table(metrics['stage_usage'])
+            st.table(metrics['turns'])
+
+    st.success('✨ Mental health support plan generated successfully!')
+    if celebrate:
+        success_confetti()
+    combined = (
+        ("# Situation Assessment\n\n" + job.output['assessment']) +
+        ("\n\n# Action Plan & Resources\n\n" + job.output['action']) +
+        ("\n\n# Long-term Support Strategy\n\n" + job.output['followup'])
+    )
+    st.download_button(
+        label="Download Plan (Markdown)",
+        data=combined,
+        file_name="mental_support_plan.md",
+        mime="text/markdown",
+    )
+
+    # --- New: Therapist Handoff + Prep Pack ---
+    divider_fn()
+    section_title_fn("Therapist Handoff + Prep Pack", "🤝")
+    scores = screening_scores()
+    other_screens = "".join(
+        f"\n- {r.instrument} total: {r.total} ({r.band})" for key, r in scores.items()
+        if key not in ("phq", "gad") and r.complete
+    )
+
+    overview = (st.session_state.get("mental_state") or "").strip()
+    changes = (st.session_state.get("recent_changes") or "").strip()
+    symptoms_list = st.session_state.get("current_symptoms") or []
+    safety_present = bool(st.session_state.get("safety_card"))
+    care_focus = st.session_state["care_path"].focus if st.session_state.get("care_path") else ""
+
+    # Build a de-identified prep summary
+    prep_md = """## Therapy Prep Summary (De-identified)
 
 ### Overview
 - Emotional state: {}{}
@@ -998,7 +1081,7 @@ Details:
 
 ### Screening
 - PHQ-9 total: {} ({})
-- GAD-7 total: {} ({})
+- GAD-7 total: {} ({}){}
 
 ### Safety
 - Safety card present: {}
@@ -1015,23 +1098,63 @@ Details:
 
 > Note: This summary avoids personal identifiers and is intended to speed up your first therapy session. You can edit it before sharing.
 """.format(
-                    overview[:300] + ("…" if len(overview) > 300 else ""),
-                    "" if overview else "(not provided)",
-                    changes[:300] + ("…" if len(changes) > 300 else ""),
-                    ", ".join(symptoms_list) if symptoms_list else "(none provided)",
-                    phq_total_pp, _sev(phq_total_pp, "phq"),
-                    gad_total_pp, _sev(gad_total_pp, "gad"),
-                    "Yes" if safety_present else "No",
-                    f" (focus: {care_focus})" if care_focus else "",
-                )
-
-                st.markdown(prep_md)
-                st.download_button(
-                    label="Download Therapy Prep (Markdown)",
-                    data=prep_md,
-                    file_name="therapy_prep_summary.md",
-                    mime="text/markdown",
-                )
-
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
+        overview[:300] + ("…" if len(overview) > 300 else ""),
+        "" if overview else "(not provided)",
+        changes[:300] + ("…" if len(changes) > 300 else ""),
+        ", ".join(symptoms_list) if symptoms_list else "(none provided)",
+        scores["phq"].total, scores["phq"].band,
+        scores["gad"].total, scores["gad"].band,
+        other_screens,
+        "Yes" if safety_present else "No",
+        f" (focus: {care_focus})" if care_focus else "",
+    )
+
+    st.markdown(prep_md)
+    st.download_button(
+        label="Download Therapy Prep (Markdown)",
+        data=prep_md,
+        file_name="therapy_prep_summary.md",
+        mime="text/markdown",
+    )
+
+if st.button("Get Support Plan"):
+    if not api_key:
+        st.error("Please enter your OpenAI API key.")
+    else:
+        try:
+            job = start_plan_job()
+            st.session_state['plan_job'] = job.job_id
+            # In the URL too, so a reload or reconnect finds the job again
+            st.query_params["job"] = job.job_id
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
+
+plan_job_id = st.session_state.get('plan_job') or st.query_params.get("job")
+if plan_job_id:
+    plan_job = plan_jobs.get(plan_job_id)
+    if plan_job is None:
+        st.session_state.pop('plan_job', None)
+        st.query_params.pop("job", None)
+    else:
+        st.session_state['plan_job'] = plan_job_id
+        if not plan_job.finished:
+            poll_plan_job(plan_job_id)
+        elif plan_job.status == "failed":
+            st.error(f"An error occurred: {plan_job.error}")
+        else:
+            st.session_state.output = plan_job.output
+            celebrate = st.session_state.get('_plan_job_shown') != plan_job_id
+            st.session_state['_plan_job_shown'] = plan_job_id
+            render_plan(plan_job, celebrate)
+
+cache_stats = plan_cache.snapshot()
+sched_stats = scheduler.snapshot()
+job_stats = plan_jobs.snapshot()
+cache_stats_slot.caption(
+    f"Hits: {cache_stats['memory_hits']} memory / {cache_stats['disk_hits']} disk · "
+    f"Misses: {cache_stats['misses']} · Hit rate: {cache_stats['hit_rate']:.0%} · "
+    f"Stored plans: {cache_stats['disk_entries']}  \n"
+    f"Scheduler: {sched_stats['queued']} queued · {sched_stats['running']}/{sched_stats['workers']} running · "
+    f"{job_stats['shared']} shared · {sched_stats['rate_limited']} rate-limited retries"
+)
+st.session_state['_script_seconds'] = time.perf_counter() - _script_started
@@ -0,0 +1,354 @@
+"""Headless plan generation over a queue of intake forms.
+
+    python batch_plans.py intakes.jsonl -o plans.jsonl --workers 8 --rpm 120
+
+Intakes are read from JSONL or CSV (one intake per line/row, the same fields
+as the app's Personal Information form plus an optional ``id``). Each one is
+turned into the same task and run through the same swarm/async/fallback
+engine as "Get Support Plan", on a :class:`llm_scheduler.RequestScheduler`
+sized by ``--workers`` and ``--rpm``. Finished plans are appended to the
+output JSONL as they complete; that file is also the checkpoint, so rerunning
+the same command skips intakes that already have a plan and retries the rest.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional
+
+from llm_clients import ClientRegistry
+from llm_scheduler import DEFAULT_RPM, DEFAULT_WORKERS, RequestScheduler, is_rate_limited
+from model_routing import ModelRoute
+from plan_cache import PlanCache, cache_key
+from plan_engine import (
+    LLM_CALLS_PER_PLAN,
+    STRUCTURED_OUTPUT,
+    PlanMetrics,
+    build_task,
+    generate_plan,
+    light_route,
+    plan_run_mode,
+)
+from token_budget import DEFAULT_PROMPT_BUDGET, TokenBudget
+
+DEFAULT_MODEL = "gpt-4.1-nano"
+
+
+def _as_list(value) -> tuple:
+    # CSV cells hold "Friends;Family" (or comma-separated); JSONL may already have a list
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(str(v).strip() for v in value if str(v).strip())
+    sep = ";" if ";" in str(value) else ","
+    return tuple(part.strip() for part in str(value).split(sep) if part.strip())
+
+
+@dataclass(frozen=True)
+class Intake:
+    """One intake form: the fields the app's Personal Information section collects."""
+
+    intake_id: str
+    mental_state: str = ""
+    sleep_pattern: str = "7"
+    stress_level: int = 5
+    support_system: tuple = ()
+    recent_changes: str = ""
+    current_symptoms: tuple = ()
+
+    @classmethod
+    def from_record(cls, record: dict, default_id: str) -> "Intake":
+        stress = record.get("stress_level")
+        return cls(
+            intake_id=str(record.get("id") or record.get("intake_id") or default_id),
+            mental_state=str(record.get("mental_state") or ""),
+            sleep_pattern=str(record.get("sleep_pattern") or "7"),
+            stress_level=int(stress) if str(stress or "").strip().isdigit() else 5,
+            support_system=_as_list(record.get("support_system")),
+            recent_changes=str(record.get("recent_changes") or ""),
+            current_symptoms=_as_list(record.get("current_symptoms")),
+        )
+
+    @property
+    def task(self) -> str:
+        return build_task(self.mental_state, self.sleep_pattern, self.stress_level, list(self.support_system),
+                          self.recent_changes, list(self.current_symptoms))
+
+
+def read_intakes(path: str) -> Iterator[Intake]:
+    """Intakes from a ``.csv`` file (header row) or JSONL, read lazily."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for n, row in enumerate(csv.DictReader(f), 1):
+                yield Intake.from_record(row, f"row-{n}")
+            return
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                yield Intake.from_record(json.loads(line), f"line-{n}")
+
+
+def completed_ids(path: str) -> set:
+    """IDs that already have a plan in an output file; a later record for the same ID wins."""
+    status = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            status[record.get("id")] = record.get("status")
+    return {intake_id for intake_id, state in status.items() if state == "ok"}
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    ok: int = 0
+    failed: int = 0
+    skipped: int = 0
+    cached: int = 0
+    shared: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    latencies: list = field(default_factory=list)
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def plans_per_minute(self) -> float:
+        return self.ok / self.seconds * 60 if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.ok}/{self.total - self.skipped} plans in {self.seconds:.1f}s "
+            f"({self.plans_per_minute:.1f} plans/min) · {self.failed} failed · {self.skipped} already done · "
+            f"{self.cached} cached · {self.shared} shared · {self.retries} retries\n"
+            f"latency p50 {_percentile(self.latencies, 0.5):.2f}s "
+            f"p95 {_percentile(self.latencies, 0.95):.2f}s · "
+            f"tokens {self.prompt_tokens} prompt / {self.completion_tokens} completion"
+        )
+
+
+class BatchPlanner:
+    """Generates plans for many intakes with the app's engine, a bounded pool and retries.
+
+    ``scheduler`` bounds concurrency and spaces calls per API key (and retries
+    429s); other failures are retried here up to ``retries`` times with
+    exponential backoff. Plans are served from and stored in ``cache`` like
+    the app does, unless it is None.
+    """
+
+    def __init__(self, api_key: str, route: ModelRoute, parallel: bool = False,
+                 clients: Optional[ClientRegistry] = None, scheduler: Optional[RequestScheduler] = None,
+                 cache: Optional[PlanCache] = None, prompt_budget: int = DEFAULT_PROMPT_BUDGET,
+                 light_routing: bool = False, retries: int = 2, retry_delay: float = 2.0,
+                 structured: bool = STRUCTURED_OUTPUT):
+        self.api_key = api_key
+        self.route = route
+        self.run_mode = plan_run_mode(parallel)
+        self.clients = clients or ClientRegistry()
+        self.scheduler = scheduler or RequestScheduler()
+        self.cache = cache
+        self.prompt_budget = prompt_budget
+        self.light_routing = light_routing
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.structured = structured
+
+    def _prepare(self, intake: Intake) -> tuple:
+        route, note = self.route, ""
+        if self.light_routing:
+            route, note = light_route(self.route, intake.mental_state, intake.recent_changes, intake.current_symptoms)
+        return intake.task, route, route.cache_tag(self.run_mode), note
+
+    def _work(self, task: str, route: ModelRoute, plan_model: str) -> Callable[[], dict]:
+        def generate() -> dict:
+            metrics = PlanMetrics(mode=self.run_mode)
+            output = generate_plan(
+                self.run_mode, self.api_key, route, task, self.clients,
+                stream=False, metrics=metrics, structured=self.structured,
+                budget=TokenBudget(max_prompt_tokens=self.prompt_budget, model=route.section),
+            )
+            if self.cache is not None and all(output.values()):
+                self.cache.put(task, plan_model, output)
+            return {"output": output, "metrics": metrics.as_dict()}
+        return generate
+
+    def _submit(self, prepared: tuple, attempt: int) -> tuple:
+        task, route, plan_model, _note = prepared
+        future, shared = self.scheduler.schedule(
+            self.api_key, self._work(task, route, plan_model),
+            key=(cache_key(task, plan_model), self.run_mode, attempt),
+            cost=LLM_CALLS_PER_PLAN[self.run_mode],
+        )
+        return future, shared
+
+    def run(self, intakes: Iterable[Intake], out_path: str, resume: bool = True,
+            on_record: Optional[Callable[[dict], None]] = None) -> BatchReport:
+        """Plan every intake, appending one JSON record per intake to ``out_path`` as it finishes.
+
+        Intakes with the same task and route share one scheduled generation;
+        each still gets its own record. Retries wait out their backoff here,
+        not on a pool worker.
+        """
+        report = BatchReport()
+        done = completed_ids(out_path) if resume else set()
+        # Keep the pool busy without reading the whole intake file into futures
+        window = self.scheduler.max_workers * 2
+        # future -> [(intake, prepared, attempt, submitted), ...]; several when the generation is shared
+        pending = {}
+        # (due time, tiebreak, intake, prepared, attempt) for retries still in their backoff
+        backoff = []
+        order = itertools.count()
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+            def write(record: dict) -> None:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if on_record is not None:
+                    on_record(record)
+
+            def finish(future) -> None:
+                waiting = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    for intake, prepared, attempt, _submitted in waiting:
+                        if attempt <= self.retries and not is_rate_limited(exc):
+                            report.retries += 1
+                            due = time.perf_counter() + self.retry_delay * 2 ** (attempt - 1)
+                            heapq.heappush(backoff, (due, next(order), intake, prepared, attempt + 1))
+                            continue
+                        report.failed += 1
+                        write({"id": intake.intake_id, "status": "failed", "attempts": attempt,
+                               "error": f"{type(exc).__name__}: {exc}"})
+                    return
+                # One generation, however many intakes it serves
+                report.prompt_tokens += result["metrics"].get("prompt_tokens", 0)
+                report.completion_tokens += result["metrics"].get("completion_tokens", 0)
+                for intake, prepared, attempt, submitted in waiting:
+                    _task, _route, plan_model, note = prepared
+                    seconds = time.perf_counter() - submitted
+                    report.ok += 1
+                    report.latencies.append(seconds)
+                    write({"id": intake.intake_id, "status": "ok", "mode": self.run_mode, "model": plan_model,
+                           "note": note, "attempts": attempt, "seconds": round(seconds, 3), **result})
+
+            def start(intake: Intake, prepared: tuple, attempt: int = 1) -> None:
+                future, shared = self._submit(prepared, attempt)
+                report.shared += shared
+                pending.setdefault(future, []).append((intake, prepared, attempt, time.perf_counter()))
+
+            def step() -> None:
+                # Wait for a finished generation or the next retry coming due, whichever is first
+                timeout = max(0.0, backoff[0][0] - time.perf_counter()) if backoff else None
+                if pending:
+                    for future in wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED).done:
+                        finish(future)
+                elif timeout:
+                    time.sleep(timeout)
+                while backoff and backoff[0][0] <= time.perf_counter():
+                    _due, _order, intake, prepared, attempt = heapq.heappop(backoff)
+                    start(intake, prepared, attempt)
+
+            for intake in intakes:
+                report.total += 1
+                if intake.intake_id in done:
+                    report.skipped += 1
+                    continue
+                prepared = self._prepare(intake)
+                if self.cache is not None:
+                    task, _route, plan_model, note = prepared
+                    cached = self.cache.get(task, plan_model)
+                    if cached is not None:
+                        report.ok += 1
+                        report.cached += 1
+                        write({"id": intake.intake_id, "status": "ok", "mode": "cache", "model": plan_model,
+                               "note": note, "attempts": 0, "seconds": 0.0, "output": cached, "metrics": {}})
+                        continue
+                start(intake, prepared)
+                while len(pending) + len(backoff) >= window:
+                    step()
+            while pending or backoff:
+                step()
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("intakes", help="JSONL or CSV file of intake forms")
+    parser.add_argument("-o", "--output", help="JSONL results and checkpoint (default: <intakes>.plans.jsonl)")
+    parser.add_argument("--api-key", default=os.environ.get("OPENAI_API_KEY", ""))
+    parser.add_argument("--model", default=DEFAULT_MODEL,
+                        help="model for every stage; SEHATSATHI_<STAGE>_MODEL overrides one stage")
+    parser.add_argument("--parallel", action="store_true", help="the app's \"Parallel (async)\" orchestration")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="plans generated at once")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="LLM calls per minute for the API key")
+    parser.add_argument("--retries", type=int, default=2, help="extra attempts per intake on non-429 errors")
+    parser.add_argument("--prompt-budget", type=int, default=DEFAULT_PROMPT_BUDGET)
+    parser.add_argument("--markdown", action="store_true", default=not STRUCTURED_OUTPUT,
+                        help="ask the fallback for Markdown sections instead of structured JSON")
+    parser.add_argument("--light-routing", action="store_true", help="send low-risk intakes to the light model")
+    parser.add_argument("--no-cache", action="store_true", help="neither read nor write the plan cache")
+    parser.add_argument("--restart", action="store_true", help="overwrite the output instead of resuming")
+    parser.add_argument("--quiet", action="store_true", help="no per-intake progress lines")
+    parser.add_argument("--openai-batch", action="store_true",
+                        help="submit the single-call fallback prompts through the OpenAI Batch API (results within 24h)")
+    parser.add_argument("--poll-seconds", type=float, default=30.0, help="Batch API status poll interval")
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or OPENAI_API_KEY)")
+    out_path = args.output or os.path.splitext(args.intakes)[0] + ".plans.jsonl"
+    route = ModelRoute.from_env(args.model)
+    cache = None if args.no_cache else PlanCache()
+    scheduler = RequestScheduler(max_workers=args.workers, requests_per_minute=args.rpm)
+    if args.openai_batch:
+        from openai_batch import OpenAIBatchPlanner
+
+        planner = OpenAIBatchPlanner(ClientRegistry().openai(args.api_key, route.fallback), route, cache=cache,
+                                     light_routing=args.light_routing, structured=not args.markdown,
+                                     poll_seconds=args.poll_seconds)
+    else:
+        planner = BatchPlanner(
+            args.api_key, route, parallel=args.parallel, scheduler=scheduler, cache=cache,
+            prompt_budget=args.prompt_budget, light_routing=args.light_routing, retries=args.retries,
+            structured=not args.markdown,
+        )
+    finished = [0]
+
+    def progress(record: dict) -> None:
+        finished[0] += 1
+        if not args.quiet:
+            detail = f"{record['seconds']:.2f}s {record['mode']}" if record["status"] == "ok" else record["error"]
+            print(f"[{finished[0]}] {record['id']}: {record['status']} ({detail})", file=sys.stderr)
+
+    try:
+        report = planner.run(read_intakes(args.intakes), out_path, resume=not args.restart, on_record=progress)
+    finally:
+        scheduler.shutdown()
+    print(report.summary())
+    print(f"results: {out_path}")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
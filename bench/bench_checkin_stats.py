@@ -0,0 +1,60 @@
+"""Check-in insights: DataFrame rebuild + ``df.corr()`` vs. incremental CheckinStats.
+
+    python bench/bench_checkin_stats.py --sizes 100 1000 10000 100000
+
+For each history size, times what one rerun of the Insights block costs:
+rebuilding the DataFrame and correlating it (the old path) against folding in
+one new check-in and reading the 90-day window correlations (the new path).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    from checkin_stats import CheckinStats
+
+    rng = random.Random(0)
+    now = time.time()
+    for size in args.sizes:
+        rows = [
+            {"mood": rng.randint(1, 10), "sleep": rng.randint(0, 12), "stress": rng.randint(1, 10),
+             "ts": now - (size - i) * 3600}
+            for i in range(size)
+        ]
+        stats = CheckinStats.from_checkins(rows)
+
+        rebuild, incremental = [], []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            pd.DataFrame(rows, columns=["mood", "sleep", "stress"]).corr(numeric_only=True)
+            rebuild.append(time.perf_counter() - started)
+
+            row = dict(rows[-1], ts=now)
+            started = time.perf_counter()
+            stats.add(row)
+            stats.window(90).correlations()
+            stats.trend("mood")
+            incremental.append(time.perf_counter() - started)
+
+        old, new = statistics.median(rebuild) * 1000, statistics.median(incremental) * 1000
+        print(f"checkins={size:>7}   df.corr {old:9.3f} ms   incremental {new:7.4f} ms   ({old / new:8.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
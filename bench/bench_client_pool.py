@@ -0,0 +1,71 @@
+"""Per-turn client overhead: fresh ``OpenAI()`` per call vs the shared ClientRegistry.
+
+    python bench/bench_client_pool.py --turns 200
+
+Runs against the local stub server, so the numbers isolate client construction
+and connection setup from model latency.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI  # noqa: E402
+
+from llm_backend import StubLLM, serve_stub  # noqa: E402
+from llm_clients import ClientRegistry  # noqa: E402
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def _time_turns(get_client, turns: int) -> list:
+    samples = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        get_client().chat.completions.create(model="gpt-4.1-nano", messages=MESSAGES)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _report(label: str, samples: list) -> float:
+    ordered = sorted(samples)
+    p50 = statistics.median(ordered) * 1000
+    p95 = ordered[int(0.95 * (len(ordered) - 1))] * 1000
+    print(f"{label:<28} p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+    return p50
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    server, base_url = serve_stub(StubLLM())
+    try:
+        def fresh():
+            return OpenAI(api_key="sk-bench", base_url=base_url)
+
+        registry = ClientRegistry(base_url=base_url, backend="openai")
+
+        def pooled():
+            return registry.openai("sk-bench", "gpt-4.1-nano")
+
+        # Warm both paths once so import/JIT-style one-offs are excluded
+        _time_turns(fresh, 3)
+        _time_turns(pooled, 3)
+        before = _report("fresh client per turn", _time_turns(fresh, args.turns))
+        after = _report("pooled ClientRegistry", _time_turns(pooled, args.turns))
+        print(f"per-turn overhead saved: {before - after:.2f} ms (p50), "
+              f"clients created: {registry.stats['clients_created']}")
+        registry.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
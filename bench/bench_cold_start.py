@@ -0,0 +1,114 @@
+"""Cold-start cost of the app: import profile and first render.
+
+    python bench/bench_cold_start.py --max-import-ms 200
+
+Runs ``python -X importtime`` over the modules ``ai_mental_wellbeing_agent.py``
+imports at the top (after Streamlit itself, which every app pays for) and
+prints the slowest ones with their cumulative time. A second fresh interpreter
+renders the app once with AppTest and lists which heavy dependencies that
+first paint pulled in.
+
+Exits non-zero when the import time exceeds ``--max-import-ms`` or a module
+named in ``--forbid`` is loaded by either step, so it can guard cold start in CI.
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "ai_mental_wellbeing_agent.py")
+HEAVY = ("openai", "autogen", "httpx", "httpx2", "numpy", "pandas", "pyarrow", "altair", "tiktoken", "PIL")
+
+FIRST_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+started = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+print(json.dumps({{"seconds": time.perf_counter() - started, "exceptions": len(at.exception),
+                  "loaded": sorted(m for m in set(sys.modules) - before if "." not in m)}}))
+"""
+
+
+def local_imports() -> list:
+    """Project modules the app imports at module level."""
+    tree = ast.parse(open(APP, encoding="utf-8").read())
+    names = []
+    for node in tree.body:
+        found = [node] if isinstance(node, (ast.Import, ast.ImportFrom)) else []
+        if isinstance(node, ast.Try):
+            found = [n for n in node.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+        for imp in found:
+            modules = [imp.module] if isinstance(imp, ast.ImportFrom) else [a.name for a in imp.names]
+            for module in modules:
+                if module and os.path.exists(os.path.join(ROOT, module.split(".")[0] + ".py")):
+                    names.append(module)
+    return list(dict.fromkeys(names))
+
+
+def import_profile(modules: list) -> dict:
+    """``-X importtime`` rows keyed by module: (self us, cumulative us, depth)."""
+    code = "import streamlit\n" + "\n".join(f"try:\n    import {m}\nexcept Exception:\n    pass" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True)
+    rows, after_streamlit = {}, False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if name == "streamlit" and depth == 0:
+            after_streamlit = True
+            continue
+        if after_streamlit:
+            rows[name] = (int(own), int(cumulative), depth)
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-import-ms", type=float, default=200.0)
+    parser.add_argument("--forbid", nargs="*", default=["openai", "autogen", "pandas"],
+                        help="modules that must not load before a plan or chart is requested")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    modules = local_imports()
+    rows = import_profile(modules)
+    top_level = {name: row for name, row in rows.items() if row[2] == 0}
+    total_ms = sum(row[1] for row in top_level.values()) / 1000
+    print(f"app imports after streamlit: {total_ms:.0f} ms over {len(modules)} project modules")
+    for name, (_own, cumulative, _depth) in sorted(top_level.items(), key=lambda kv: -kv[1][1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    imported_heavy = sorted({name.split(".")[0] for name in rows} & set(HEAVY))
+    print(f"heavy modules imported: {', '.join(imported_heavy) or 'none'}")
+
+    env = dict(os.environ, SEHATSATHI_LLM_BACKEND="stub")
+    env["SEHATSATHI_CACHE_DIR"] = env["SEHATSATHI_DATA_DIR"] = tempfile.mkdtemp(prefix="sehatsathi-bench-")
+    proc = subprocess.run([sys.executable, "-c", FIRST_RENDER.format(app=APP)], cwd=ROOT, env=env,
+                          capture_output=True, text=True)
+    render = json.loads(proc.stdout.strip().splitlines()[-1])
+    rendered_heavy = sorted(set(render["loaded"]) & set(HEAVY))
+    print(f"first render: {render['seconds'] * 1000:.0f} ms, {render['exceptions']} exceptions, "
+          f"heavy modules loaded: {', '.join(rendered_heavy) or 'none'}")
+
+    problems = []
+    if total_ms > args.max_import_ms:
+        problems.append(f"import time {total_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    leaked = sorted(set(args.forbid) & (set(imported_heavy) | set(rendered_heavy)))
+    if leaked:
+        problems.append(f"loaded at cold start: {', '.join(leaked)}")
+    if problems:
+        print("FAIL: " + "; ".join(problems))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
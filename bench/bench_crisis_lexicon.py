@@ -0,0 +1,68 @@
+"""Crisis phrase matching cost as the lexicon grows.
+
+    python bench/bench_crisis_lexicon.py --sizes 7 100 1000 5000 --words 200
+
+Pads the shipped phrase packs with synthetic phrases up to each size and times
+one scan of a ``--words`` long message (with no crisis language, the worst case
+for early-exit scans) using the old ``any(k in text)`` loop, a single compiled
+word-boundary regex alternation, and the Aho-Corasick ``CrisisLexicon``.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VOCAB = ("feel tired work family sleep night friend talk help day week stress exam money alone "
+         "phone walk eat class office home think mind heart mood calm anxious rest busy quiet").split()
+
+
+def _median_ms(fn, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7, 100, 1000, 5000])
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=30)
+    args = parser.parse_args()
+
+    from crisis_lexicon import CrisisLexicon, default_lexicon
+
+    rng = random.Random(0)
+    shipped = [phrase for phrase, _category, _language, _n in default_lexicon().entries]
+    text = " ".join(rng.choice(VOCAB) for _ in range(args.words))
+    for size in args.sizes:
+        phrases = shipped[:size]
+        while len(phrases) < size:
+            # Nonsense tokens so padding never matches the message
+            phrases.append(" ".join(f"zq{rng.randrange(10 ** 6)}" for _ in range(rng.randint(1, 4))))
+
+        started = time.perf_counter()
+        lexicon = CrisisLexicon((p, "crisis", "en") for p in phrases)
+        build = (time.perf_counter() - started) * 1000
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in phrases) + r")\b")
+        lowered = [p.lower() for p in phrases]
+
+        substring = _median_ms(lambda: any(k in text.lower() for k in lowered), args.repeats)
+        regex = _median_ms(lambda: pattern.search(text.lower()), args.repeats)
+        automaton = _median_ms(lambda: lexicon.detect(text), args.repeats)
+        print(f"phrases={size:>6}  build {build:7.1f} ms   any(k in t) {substring:8.3f} ms   "
+              f"regex {regex:8.3f} ms   aho-corasick {automaton:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""End-to-end "Get Support Plan" latency on the offline stub backend.
+
+    python bench/bench_plan_flow.py --runs 20 --mode Sequential --latency 0.05 --tps 400
+
+Drives the Streamlit script headlessly with ``streamlit.testing.v1.AppTest``,
+clicks "Get Support Plan" once per run with a distinct intake (so the plan
+cache never hits), waits for the background plan job to finish and reports
+p50/p95 wall time, LLM round count and prompt token volume per run.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--mode", default="Sequential", choices=["Sequential", "Parallel (async)"])
+    parser.add_argument("--latency", type=float, default=0.0, help="stub seconds before first token")
+    parser.add_argument("--tps", type=float, default=0.0, help="stub tokens per second (0 = instant)")
+    parser.add_argument("--no-stream", action="store_true", help="turn off live section streaming")
+    parser.add_argument("--rpm", type=float, default=1e6,
+                        help="scheduler requests per minute per key (default: no limit against the stub)")
+    args = parser.parse_args()
+
+    # Must be set before the app (and llm_backend) is first imported
+    os.environ["SEHATSATHI_LLM_BACKEND"] = "stub"
+    os.environ["SEHATSATHI_STUB_LATENCY"] = str(args.latency)
+    os.environ["SEHATSATHI_STUB_TPS"] = str(args.tps)
+    os.environ["SEHATSATHI_LLM_RPM"] = str(args.rpm)
+    os.environ["SEHATSATHI_CACHE_DIR"] = tempfile.mkdtemp(prefix="sehatsathi-bench-")
+    os.environ["SEHATSATHI_DATA_DIR"] = os.environ["SEHATSATHI_CACHE_DIR"]
+
+    from streamlit.testing.v1 import AppTest
+
+    from llm_backend import get_stub
+    from plan_jobs import JobStore
+
+    stub = get_stub()
+    # The app's job runner persists every status change; finished jobs are read back from here
+    jobs = JobStore()
+    at = AppTest.from_file(os.path.join(ROOT, "ai_mental_wellbeing_agent.py"), default_timeout=600)
+    at.run()
+    at.sidebar.text_input[0].input("sk-bench")
+    at.selectbox(key="plan_mode").select(args.mode)
+    at.checkbox(key="stream_plan").set_value(not args.no_stream)
+    at.run()
+
+    walls, rounds, prompt_tokens, completion_tokens = [], [], [], []
+    for i in range(args.runs):
+        at.text_area(key="mental_state").input(f"Feeling overwhelmed lately, anxious about work (run {i}).")
+        at.run()
+        stub.reset_stats()
+        button = next(b for b in at.button if b.label == "Get Support Plan")
+        started = time.perf_counter()
+        button.click().run()
+        if at.exception:
+            raise SystemExit(f"app raised: {at.exception[0].message}")
+        # The click only queues a background job; time it until the job is done
+        job_id = at.session_state["plan_job"]
+        while not (job := jobs.load(job_id)) or not job.finished:
+            time.sleep(0.002)
+        walls.append(time.perf_counter() - started)
+        if job.status == "failed":
+            raise SystemExit(f"plan job failed: {job.error}")
+        rounds.append(stub.stats["requests"])
+        prompt_tokens.append(stub.stats["prompt_tokens"])
+        completion_tokens.append(stub.stats["completion_tokens"])
+
+    print(f"mode={args.mode} runs={args.runs} latency={args.latency}s tps={args.tps or 'inf'} "
+          f"stream={not args.no_stream}")
+    print(f"wall time        p50 {statistics.median(walls) * 1000:8.1f} ms   p95 {_percentile(walls, 0.95) * 1000:8.1f} ms")
+    print(f"rounds/run       mean {statistics.mean(rounds):6.1f}")
+    print(f"prompt tokens    mean {statistics.mean(prompt_tokens):8.0f}   p95 {_percentile(prompt_tokens, 0.95):8.0f}")
+    print(f"completion tok.  mean {statistics.mean(completion_tokens):8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Provider search latency against a synthetic directory.
+
+    python bench/bench_provider_search.py --providers 50000 --format sqlite
+
+Writes a directory of ``--providers`` rows (CSV or SQLite) to a temp dir,
+times the one-off index build, then reports p50/p95 latency for a mix of
+exact, prefix, fuzzy, ZIP and nearest-within-radius searches with and without
+attribute filters, next to the old linear scan over every row.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CITIES = [
+    "Delhi", "New Delhi", "Mumbai", "Bengaluru", "Chennai", "Kolkata", "Hyderabad", "Pune", "Ahmedabad",
+    "Jaipur", "Lucknow", "Kanpur", "Nagpur", "Indore", "Bhopal", "Patna", "Srinagar", "Karachi", "Lahore",
+    "Islamabad", "New York", "Los Angeles", "Chicago", "Houston", "London", "Toronto",
+]
+TYPES = ["Therapist", "Psychiatrist", "Group", "Telehealth", "Counsellor"]
+
+
+def synthetic_rows(n: int, rng: random.Random) -> list:
+    from geo_index import Gazetteer
+
+    gazetteer = Gazetteer.load()
+    centres = [gazetteer.lookup(city, fuzzy=False)[1:] for city in CITIES]
+    rows = []
+    for i in range(n):
+        c = rng.randrange(len(CITIES))
+        rows.append({
+            "name": f"Provider {i}",
+            "type": rng.choice(TYPES),
+            "city": "Any" if rng.random() < 0.002 else CITIES[c],
+            "zip": f"{100000 + c * 1000 + rng.randrange(1000)}",
+            "afford": rng.choice(["Low-cost", "Insurance", "Any"]),
+            "lang": ";".join(rng.sample(["English", "Hindi", "Urdu"], rng.randint(1, 2))),
+            "remote": rng.choice(["Yes", "No"]),
+            # Scattered up to ~30 km around the city centre
+            "lat": round(centres[c][0] + rng.uniform(-0.27, 0.27), 5),
+            "lon": round(centres[c][1] + rng.uniform(-0.27, 0.27), 5),
+        })
+    return rows
+
+
+def write_directory(rows: list, fmt: str, directory: str) -> str:
+    fields = list(rows[0])
+    if fmt == "csv":
+        path = os.path.join(directory, "providers.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return path
+    path = os.path.join(directory, "providers.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE providers ({', '.join(fields)})")
+    conn.executemany(f"INSERT INTO providers VALUES ({', '.join('?' * len(fields))})", [tuple(r.values()) for r in rows])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def linear(rows: list, city: str, afford: str, language: str, remote: str) -> list:
+    # The pre-index filter, applied to every row
+    hits = []
+    for r in rows:
+        if city and city.lower() not in (r["city"].lower(), "any"):
+            continue
+        if afford != "Any" and r["afford"] != afford:
+            continue
+        if language != "Any" and language not in r["lang"].split(";"):
+            continue
+        if remote != "Any" and r["remote"] != remote:
+            continue
+        hits.append(r)
+    return hits
+
+
+def _p(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))] * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, default=50000)
+    parser.add_argument("--format", choices=["csv", "sqlite"], default="csv")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    from geo_index import Gazetteer
+    from provider_directory import ProviderDirectory
+
+    rng = random.Random(0)
+    rows = synthetic_rows(args.providers, rng)
+    path = write_directory(rows, args.format, tempfile.mkdtemp(prefix="sehatsathi-providers-"))
+
+    started = time.perf_counter()
+    directory = ProviderDirectory.load(path, gazetteer=Gazetteer.load())
+    print(f"providers={len(directory)} format={args.format} load+index {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    queries = {
+        "exact city": ("Delhi", "Any", "Any", "Any"),
+        "city + filters": ("Mumbai", "Low-cost", "Hindi", "Yes"),
+        "prefix": ("New", "Any", "English", "Any"),
+        "fuzzy": ("Bengalore", "Insurance", "Any", "Any"),
+        "zip prefix": ("1050", "Any", "Any", "Yes"),
+        "filters only": ("", "Low-cost", "Urdu", "No"),
+        "no filters": ("", "Any", "Any", "Any"),
+        "near, 25 km": ("New Delhi", "Any", "Any", "Any", 25),
+        "near + filters": ("110017", "Low-cost", "Urdu", "No", 50),
+        "near, any km": ("Gurgaon", "Insurance", "Hindi", "Any", None),
+    }
+    for label, (city, afford, language, remote, *radius) in queries.items():
+        indexed, scanned = [], []
+        for i in range(args.repeats):
+            started = time.perf_counter()
+            result = directory.search(city, afford, language, remote, page=i % 3, page_size=10,
+                                      radius_km=radius[0] if radius else None)
+            indexed.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            linear(rows, city, afford, language, remote)
+            scanned.append(time.perf_counter() - started)
+        print(f"  {label:<15} hits={result.total:>6}   indexed p50 {_p(indexed, 0.5):7.3f} ms  p95 {_p(indexed, 0.95):7.3f} ms"
+              f"   linear p50 {_p(scanned, 0.5):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Rerun cost: whole script vs. a single fragment-scoped section.
+
+    python bench/bench_rerun.py --runs 30 --checkins 500
+
+Before the sections became ``st.fragment`` units every widget interaction
+re-executed the whole script, so "full rerun" is the old per-interaction cost.
+An interaction inside a section now only reruns that section's fragment; its
+cost is read from ``st.session_state['_section_timings']``. AppTest always
+replays the full script, which is why the fragment timings come from the app's
+own instrumentation rather than from AppTest wall time.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--checkins", type=int, default=200, help="seeded check-in history size")
+    args = parser.parse_args()
+
+    os.environ["SEHATSATHI_LLM_BACKEND"] = "stub"
+    os.environ["SEHATSATHI_CACHE_DIR"] = tempfile.mkdtemp(prefix="sehatsathi-bench-")
+    os.environ["SEHATSATHI_DATA_DIR"] = os.environ["SEHATSATHI_CACHE_DIR"]
+
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "ai_mental_wellbeing_agent.py"), default_timeout=120)
+    # Seed history directly and mark the session as already loaded from the store
+    at.query_params["uid"] = "bench"
+    at.session_state["_store_user"] = "bench"
+    at.session_state["checkins"] = [
+        {"mood": 1 + i % 10, "sleep": i % 12, "stress": 10 - i % 10, "ts": time.time() - (args.checkins - i) * 3600}
+        for i in range(args.checkins)
+    ]
+    at.session_state["care_path"] = None
+    at.run()
+
+    walls, scripts, sections = [], [], {}
+    for i in range(args.runs):
+        at.slider(key="stress_level").set_value(1 + i % 10)
+        started = time.perf_counter()
+        at.run()
+        walls.append(time.perf_counter() - started)
+        scripts.append(at.session_state["_script_seconds"])
+        for name, seconds in at.session_state["_section_timings"].items():
+            sections.setdefault(name, []).append(seconds)
+
+    script_p50 = statistics.median(scripts) * 1000
+    print(f"runs={args.runs} checkins={args.checkins}")
+    print(f"full rerun (AppTest wall)   p50 {statistics.median(walls) * 1000:8.2f} ms")
+    print(f"full rerun (script body)    p50 {script_p50:8.2f} ms   <- every interaction before fragments")
+    print("fragment rerun per section:")
+    for name, samples in sections.items():
+        p50 = statistics.median(samples) * 1000
+        print(f"  {name:<14} p50 {p50:8.2f} ms   ({script_p50 / p50 if p50 else float('inf'):6.1f}x less work)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Risk model threshold sweep on held-out text (``data/triage_holdout.jsonl``).
+
+    python bench/bench_risk_calibration.py --thresholds 0.35 0.4 0.45 0.5 0.55 0.6
+
+Trains the classifier on the seed corpus as the app does, scores the held-out
+rows (none of which are in the seed) and reports, per threshold, the labels
+recalled, the spurious label flags and how many benign rows would get a flag.
+``risk_model.RISK_THRESHOLD`` is picked from this: no benign row flagged,
+with margin, at the best recall left.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--holdout", default=os.path.join(ROOT, "data", "triage_holdout.jsonl"))
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.35, 0.4, 0.45, 0.5, 0.55, 0.6])
+    args = parser.parse_args()
+
+    from risk_model import RISK_LABELS, RISK_THRESHOLD, RiskClassifier
+
+    classifier = RiskClassifier.from_seed()
+    with open(args.holdout, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    scored = [(classifier.scores(row["text"]), set(row.get("labels") or [])) for row in rows]
+    positives = sum(len(labels) for _scores, labels in scored)
+    benign = sum(not labels for _scores, labels in scored)
+
+    print(f"held-out rows={len(rows)} labels={positives} benign rows={benign} (current threshold {RISK_THRESHOLD})")
+    for threshold in args.thresholds:
+        recalled = spurious = benign_flagged = 0
+        for scores, labels in scored:
+            hits = {label for label in RISK_LABELS if scores[label] >= threshold}
+            recalled += len(hits & labels)
+            spurious += len(hits - labels)
+            benign_flagged += bool(hits) and not labels
+        print(f"threshold {threshold:.2f}   recall {recalled:3d}/{positives}   spurious flags {spurious:3d}   "
+              f"benign rows flagged {benign_flagged:3d}/{benign}")
+
+
+if __name__ == "__main__":
+    main()
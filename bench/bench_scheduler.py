@@ -0,0 +1,126 @@
+"""Many sessions asking for plans at once, with and without the request scheduler.
+
+    python bench/bench_scheduler.py --sessions 40 --duplicates 0.25 --server-rps 4
+
+A fake LLM server answers after ``--latency`` seconds and returns HTTP 429
+once a key has made more than ``--server-rps`` calls in the last second.
+"Direct" starts every request on its own thread at once, the way concurrent
+Streamlit sessions did; "scheduled" sends them through ``RequestScheduler``
+(bounded pool, per-key token bucket, single-flight, 429 backoff). Reports
+succeeded/failed requests, 429s seen by the server, calls actually made and
+p50/p95 completion time.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self):
+        super().__init__("rate limited")
+        self.response = None
+
+
+class FakeServer:
+    def __init__(self, rps: float, latency: float):
+        self.rps = rps
+        self.latency = latency
+        self.calls = deque()
+        self.lock = threading.Lock()
+        self.made = 0
+        self.rejected = 0
+
+    def call(self) -> str:
+        with self.lock:
+            now = time.monotonic()
+            while self.calls and now - self.calls[0] > 1:
+                self.calls.popleft()
+            if len(self.calls) >= self.rps:
+                self.rejected += 1
+                raise RateLimitError()
+            self.calls.append(now)
+            self.made += 1
+        time.sleep(self.latency)
+        return "ok"
+
+
+def _percentile(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values or [0.0])[0]
+
+
+def _report(label: str, server: FakeServer, times: list, failed: int, extra: str = "") -> None:
+    print(f"{label:<10} ok {len(times):>4}  failed {failed:>4}  server calls {server.made:>4}  "
+          f"429s {server.rejected:>4}  p50 {_percentile(times, 50):6.2f}s  p95 {_percentile(times, 95):6.2f}s  {extra}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--duplicates", type=float, default=0.25, help="share of sessions repeating an earlier intake")
+    parser.add_argument("--server-rps", type=float, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    from llm_scheduler import RequestScheduler
+
+    rng = random.Random(0)
+    intakes = []
+    for i in range(args.sessions):
+        intakes.append(rng.choice(intakes) if intakes and rng.random() < args.duplicates else f"intake-{i}")
+
+    server = FakeServer(args.server_rps, args.latency)
+    times, failed, lock = [], [0], threading.Lock()
+
+    def direct(started: float) -> None:
+        try:
+            server.call()
+        except RateLimitError:
+            with lock:
+                failed[0] += 1
+            return
+        with lock:
+            times.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=direct, args=(started,)) for _ in intakes]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    _report("direct", server, times, failed[0])
+
+    server = FakeServer(args.server_rps, args.latency)
+    # Keep the client-side limit just under the server's, with a small burst
+    scheduler = RequestScheduler(max_workers=args.workers, requests_per_minute=args.server_rps * 60 * 0.9,
+                                 burst=max(1.0, args.server_rps / 2), base_delay=0.2, max_delay=2.0)
+    times, failed, peak = [], 0, 0
+    started = time.perf_counter()
+    futures = [scheduler.schedule("sk-bench", server.call, key=intake)[0] for intake in intakes]
+    for future in futures:
+        peak = max(peak, scheduler.queue_depth)
+        try:
+            future.result()
+            times.append(time.perf_counter() - started)
+        except RateLimitError:
+            failed += 1
+    stats = scheduler.snapshot()
+    _report("scheduled", server, times, failed,
+            f"shared {stats['deduplicated']}  retries {stats['rate_limited']}  peak queue {peak}")
+    scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Screening score cost: old label parsing per rerun vs the scoring engine, and batch cohort scoring.
+
+    python bench/bench_screening.py --runs 2000 --responses 100000
+
+"Old" is what each full rerun used to do: parse the ``"2 - ..."`` widget labels
+of all PHQ-9 and GAD-7 items in four places (triage, screeners, care path,
+prep pack) and band the totals with if/else chains. "Engine" reads the integer
+answer codes once per section and looks the scores up in ``screening``'s
+memoised table. The cohort part scores ``--responses`` random PHQ-9 answer
+vectors one by one in Python and as one NumPy batch.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LABELS = ("0 - Not at all", "1 - Several days", "2 - More than half the days", "3 - Nearly every day")
+
+
+def _median_us(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def _old_band(total: int, kind: str) -> str:
+    if kind == "phq":
+        return ("Minimal (0–4)" if total <= 4 else "Mild (5–9)" if total <= 9 else "Moderate (10–14)" if total <= 14
+                else "Moderately severe (15–19)" if total <= 19 else "Severe (20–27)")
+    return ("Minimal (0–4)" if total <= 4 else "Mild (5–9)" if total <= 9 else "Moderate (10–14)" if total <= 14
+            else "Severe (15–21)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--responses", type=int, default=100_000)
+    args = parser.parse_args()
+
+    from screening import INSTRUMENTS, cohort_report, score, score_batch, score_state
+
+    rng = random.Random(0)
+    codes = {f"phq_{i}": rng.randrange(4) for i in range(9)} | {f"gad_{i}": rng.randrange(4) for i in range(7)}
+    labelled = {key: LABELS[code] for key, code in codes.items()}
+
+    def old():
+        for _site in range(4):
+            phq = sum(int(labelled.get(f"phq_{i}", LABELS[0]).split(" ")[0]) for i in range(9))
+            gad = sum(int(labelled.get(f"gad_{i}", LABELS[0]).split(" ")[0]) for i in range(7))
+            _old_band(phq, "phq"), _old_band(gad, "gad")
+
+    def engine(keys=("phq", "gad")):
+        for _site in range(4):
+            score_state(codes, keys)
+
+    print(f"PHQ-9 + GAD-7 per full rerun:  old {_median_us(old, args.runs):7.1f} us   "
+          f"engine {_median_us(engine, args.runs):7.1f} us   "
+          f"(all {len(INSTRUMENTS)} instruments {_median_us(lambda: engine(INSTRUMENTS), args.runs):.1f} us)")
+
+    import numpy as np
+
+    matrix = np.random.default_rng(0).integers(0, 4, (args.responses, 9))
+    rows = [tuple(int(c) for c in row) for row in matrix]
+    score.cache_clear()
+    started = time.perf_counter()
+    one_by_one = [score("phq", row).total for row in rows]
+    loop_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    totals, _bands = score_batch("phq", matrix)
+    batch_ms = (time.perf_counter() - started) * 1000
+    assert one_by_one == totals.tolist()
+    print(f"{args.responses:,} PHQ-9 responses:  per-row {loop_ms:8.1f} ms   NumPy batch {batch_ms:8.1f} ms")
+    report = cohort_report("phq", matrix)
+    print("cohort bands: " + ", ".join(f"{label} {n:,}" for label, n in report["bands"].items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Redoing one disliked section: the whole plan again vs regenerating just that section.
+
+    python bench/bench_section_regen.py --runs 10 --mode async --latency 0.1 --tps 400
+
+Against the offline stub, each run writes a plan, then redoes the Action
+section twice: once the old way (``generate_plan`` again, every round) and
+once with ``regenerate_section`` (only ``action_agent``'s write-up from the
+plan's summaries, or the single-call prompt for that section in fallback
+mode). Reports wall time, LLM rounds and tokens per redo.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--mode", default="async", choices=["async", "fallback"])
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds before first token")
+    parser.add_argument("--tps", type=float, default=400.0, help="stub tokens per second (0 = instant)")
+    args = parser.parse_args()
+
+    os.environ["SEHATSATHI_LLM_BACKEND"] = "stub"
+    os.environ["SEHATSATHI_STUB_LATENCY"] = str(args.latency)
+    os.environ["SEHATSATHI_STUB_TPS"] = str(args.tps)
+
+    from llm_backend import get_stub
+    from llm_clients import ClientRegistry
+    from model_routing import ModelRoute
+    from plan_engine import generate_plan, regenerate_section
+
+    stub = get_stub()
+    clients = ClientRegistry()
+    route = ModelRoute.uniform("gpt-4o-mini")
+    rows = {"whole plan": [], "one section": []}
+    for i in range(args.runs):
+        task = f"Feeling overwhelmed lately, anxious about work (run {i})."
+        summaries = {}
+        generate_plan(args.mode, "sk-bench", route, task, clients, on_summary=summaries.__setitem__, stream=False)
+        for name in rows:
+            stub.reset_stats()
+            started = time.perf_counter()
+            if name == "whole plan":
+                generate_plan(args.mode, "sk-bench", route, task, clients, stream=False)
+            else:
+                regenerate_section(args.mode, "sk-bench", route, task, "action", clients, summaries=summaries,
+                                   stream=False)
+            rows[name].append((time.perf_counter() - started, stub.stats["requests"],
+                               stub.stats["prompt_tokens"] + stub.stats["completion_tokens"]))
+
+    print(f"mode={args.mode} runs={args.runs} latency={args.latency}s tps={args.tps or 'inf'}")
+    for name, samples in rows.items():
+        walls, rounds, tokens = zip(*samples)
+        print(f"{name:<12} wall p50 {statistics.median(walls) * 1000:8.1f} ms   "
+              f"rounds {statistics.mean(rounds):4.1f}   tokens {statistics.mean(tokens):7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cost of a plan whose reply drops a section: full regeneration vs re-requesting only that section.
+
+    python bench/bench_structured_output.py --runs 10 --latency 0.1 --tps 400
+
+Runs the single-call fallback against the offline stub with one section left
+out of every multi-section reply (``StubLLM.drop_sections``). "Regenerate" is
+what a user had to do before: ask for the whole plan again. "Repair" is the
+structured mode: one JSON parse finds the missing field and only that section
+is re-requested. Reports wall time and completion tokens per plan for both,
+and the parse cost of regex extraction vs the JSON parse.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _median_us(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds before first token")
+    parser.add_argument("--tps", type=float, default=400.0, help="stub tokens per second (0 = instant)")
+    parser.add_argument("--drop", default="Action", choices=["Assessment", "Action", "Followup"])
+    args = parser.parse_args()
+
+    os.environ["SEHATSATHI_LLM_BACKEND"] = "stub"
+    os.environ["SEHATSATHI_STUB_LATENCY"] = str(args.latency)
+    os.environ["SEHATSATHI_STUB_TPS"] = str(args.tps)
+
+    from llm_backend import get_stub
+    from llm_clients import ClientRegistry
+    from plan_engine import PlanMetrics, parse_plan_json, run_fallback_plan, split_sections
+
+    stub = get_stub()
+    stub.drop_sections = {args.drop}
+    client = ClientRegistry().openai("sk-bench")
+    rows = {"regenerate": ([], []), "repair": ([], [])}
+    for i in range(args.runs):
+        task = f"Feeling overwhelmed lately, anxious about work (run {i})."
+        for name in rows:
+            metrics = PlanMetrics()
+            started = time.perf_counter()
+            if name == "regenerate":
+                # The incomplete plan, then the whole plan again
+                for _ in range(2):
+                    run_fallback_plan(client, "gpt-4.1-nano", task, stream=False, metrics=metrics, repair_rounds=0)
+            else:
+                output = run_fallback_plan(client, "gpt-4.1-nano", task, stream=False, metrics=metrics,
+                                           structured=True)
+                assert all(output.values()), output
+            rows[name][0].append(time.perf_counter() - started)
+            rows[name][1].append(metrics.completion_tokens)
+
+    print(f"runs={args.runs} latency={args.latency}s tps={args.tps or 'inf'} dropped={args.drop}")
+    for name, (walls, tokens) in rows.items():
+        print(f"{name:<11} wall p50 {statistics.median(walls) * 1000:8.1f} ms   "
+              f"completion tokens {statistics.mean(tokens):6.0f}")
+
+    stub.drop_sections = set()
+    stub.latency, stub.tokens_per_second = 0.0, 0.0
+    output = run_fallback_plan(client, "gpt-4.1-nano", "Parse sample.", stream=False, repair_rounds=0)
+    markdown = "\n\n".join(output.values())
+    structured = json.dumps(split_sections(markdown))
+    print(f"parse: regex extract {_median_us(lambda: split_sections(markdown), 2000):.1f} us   "
+          f"JSON {_median_us(lambda: parse_plan_json(structured), 2000):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Theme and sidebar-image cost per full rerun: old inline path vs cached assets.
+
+    python bench/bench_theme_assets.py --runs 200
+
+"Old" is what every full rerun used to do: send the theme CSS plus a separate
+accent ``<style>`` block, and hand ``logo.png`` / ``developer.jpg`` to
+``st.image`` by path, which reads and hashes the original file each time (and
+the browser downloads the full-size original). "Cached" looks up the prebuilt
+theme bundle and the resized WebP images from ``theme_assets``. Reports
+bytes emitted per rerun, image bytes a new session downloads, and the time
+spent preparing them.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+IMAGES = ("logo.png", "developer.jpg")
+
+
+def _median_us(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    from theme_assets import build_theme, load_image
+    from ui_theme import THEME_CSS
+
+    paths = [os.path.join(ROOT, name) for name in IMAGES]
+    primary, secondary = "#22c55e", "#10b981"
+    accents = f"<style>:root{{--primary:{primary};--primary-2:{secondary};--accent:{primary};--accent-2:{secondary};}}</style>"
+
+    def old():
+        html = [THEME_CSS, accents]
+        for path in paths:
+            with open(path, "rb") as f:
+                hashlib.md5(f.read()).hexdigest()
+        return html
+
+    def cached():
+        html = [build_theme("Default", primary, secondary).html]
+        for path in paths:
+            hashlib.md5(load_image(path).data).hexdigest()
+        return html
+
+    started = time.perf_counter()
+    cached()
+    first_build = (time.perf_counter() - started) * 1000
+
+    old_css = sum(len(h) for h in old())
+    new_css = sum(len(h) for h in cached())
+    old_images = sum(os.path.getsize(p) for p in paths)
+    new_images = sum(len(load_image(p).data) for p in paths)
+    print(f"CSS per full rerun:        old {old_css:>8,} B   cached {new_css:>8,} B")
+    print(f"images per new session:    old {old_images:>8,} B   cached {new_images:>8,} B")
+    print(f"prepare per rerun:         old {_median_us(old, args.runs):8.0f} us  cached {_median_us(cached, args.runs):8.0f} us"
+          f"   (first build {first_build:.0f} ms, once per process)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Daily step per focus area and program phase; "{...}" fields come from segment params
+TEMPLATES = {
+    "sleep/core": "Fixed bedtime + device-off 30m before sleep; 5-min breathwork.",
+    "sleep/build": "Fixed bedtime and wake time (±30m, weekends too); 10-min wind-down routine.",
+    "sleep/maintain": "Keep the sleep window; one screen-free hour before bed; note sleep quality 1-5.",
+    "anxiety/core": "5-4-3-2-1 grounding + 4x box breathing; log one worry and reframe.",
+    "anxiety/build": "10-min worry window; face one small avoided task; 4x box breathing after.",
+    "anxiety/maintain": "Grounding when you notice tension; review the worry log for patterns.",
+    "burnout/core": "10-min walk + one boundary action (say no/delegate); gratitude 3 lines.",
+    "burnout/build": "20-min walk; protect one focus block; one boundary action; gratitude 3 lines.",
+    "burnout/maintain": "Movement break every 90 min of work; plan tomorrow's top 3; log energy 1-5.",
+    "depression/core": "1 small activity (shower/dish), 5-min sunlight, text one supportive person.",
+    "depression/build": "2 small activities + 15-min outdoors; one pleasant activity; reach out once.",
+    "depression/maintain": "Keep a daily routine anchor; one meaningful activity; note one positive.",
+    "general/core": "3-min habit: stretch + breath + one positive note.",
+    "general/build": "10-min habit: stretch, breath, short walk; one positive note.",
+    "general/maintain": "Keep your 10-min habit; one kind act for yourself or someone else.",
+    "review": "Week {week} review: note what helped, drop what didn't, pick one step to adjust.",
+}
+
+FOCUS_TEMPLATES = {
+    "Sleep regulation": "sleep",
+    "Anxiety management": "anxiety",
+    "Burnout recovery": "burnout",
+    "Depression support": "depression",
+    "General wellbeing": "general",
+}
+
+DURATIONS_WEEKS = (2, 3, 4, 8, 12, 26, 52)
+
+# Longer programs move through phases; each phase's weeks, in order (the last one runs to the end)
+PHASES = (("core", 4), ("build", 8), ("maintain", None))
+# Programs past this length get a review day closing each week
+REVIEW_AFTER_WEEKS = 4
+
+
+@dataclass(frozen=True)
+class Segment:
+    template: str
+    first_day: int
+    last_day: int
+    # Every ``review_every``-th day uses the review template instead
+    review_every: int = 0
+
+    def step(self, day: int) -> str:
+        if self.review_every and day % self.review_every == 0:
+            return TEMPLATES["review"].format(week=day // self.review_every)
+        return TEMPLATES[self.template]
+
+
+@dataclass(frozen=True)
+class CarePath:
+    """A care path as a few template segments; day text is only formatted when shown.
+
+    A 52-week program is three segments, not 364 strings, so it is cheap to
+    keep in session state and to memoise.
+    """
+
+    focus: str
+    note: str
+    segments: tuple
+
+    @property
+    def days(self) -> int:
+        return self.segments[-1].last_day if self.segments else 0
+
+    def __len__(self) -> int:
+        return self.days
+
+    def step(self, day: int) -> str:
+        if not 1 <= day <= self.days:
+            raise IndexError(day)
+        starts = [s.first_day for s in self.segments]
+        segment = self.segments[bisect_right(starts, day) - 1]
+        return f"Day {day}: {segment.step(day)}"
+
+    def steps(self, first_day: int = 1, count: int = 7) -> list:
+        last = min(self.days, first_day + count - 1)
+        return [self.step(day) for day in range(max(1, first_day), last + 1)]
+
+
+def _note(phq_total: int, gad_total: int) -> str:
+    # Tailor intensity based on scores
+    if phq_total >= 15 or gad_total >= 15:
+        return "High symptom levels detected — prioritize minimal, doable steps and consider professional support."
+    if phq_total >= 10 or gad_total >= 10:
+        return "Moderate levels — add one optional support contact per week."
+    return "Keep consistency; celebrate small wins each week."
+
+
+@lru_cache(maxsize=256)
+def build_path(duration_weeks: int, focus_area: str, phq_total: int = 0, gad_total: int = 0) -> CarePath:
+    prefix = FOCUS_TEMPLATES.get(focus_area, "general")
+    days = duration_weeks * 7
+    review = 7 if duration_weeks > REVIEW_AFTER_WEEKS else 0
+    segments, first = [], 1
+    for phase, weeks in PHASES:
+        if first > days:
+            break
+        last = days if weeks is None or duration_weeks <= REVIEW_AFTER_WEEKS else min(days, first + weeks * 7 - 1)
+        segments.append(Segment(f"{prefix}/{phase}", first, last, review))
+        first = last + 1
+    return CarePath(focus_area, _note(phq_total, gad_total), tuple(segments))
+
+
+@lru_cache(maxsize=64)
+def path_markdown(path: CarePath) -> str:
+    lines = [f"- {step}" for step in path.steps(1, path.days)]
+    return f"## Care Path\n\nFocus: {path.focus}\n\n{path.note}\n\n" + "\n".join(lines)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from itertools import combinations
+from typing import Iterable, Optional
+
+METRICS = ("mood", "sleep", "stress")
+PAIRS = tuple(combinations(METRICS, 2))
+
+# Rolling windows offered in the Insights block, in days
+WINDOW_DAYS = (7, 30, 90)
+
+
+class RunningStats:
+    """Count, sums, sums of squares and cross-products over the check-in metrics.
+
+    ``add`` and ``remove`` are O(1), so a rolling window only pays for the
+    check-ins entering and leaving it.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.sum = dict.fromkeys(METRICS, 0.0)
+        self.sumsq = dict.fromkeys(METRICS, 0.0)
+        self.cross = dict.fromkeys(PAIRS, 0.0)
+
+    def _update(self, row: dict, sign: int) -> None:
+        self.n += sign
+        for m in METRICS:
+            v = row[m]
+            self.sum[m] += sign * v
+            self.sumsq[m] += sign * v * v
+        for a, b in PAIRS:
+            self.cross[(a, b)] += sign * row[a] * row[b]
+
+    def add(self, row: dict) -> None:
+        self._update(row, 1)
+
+    def remove(self, row: dict) -> None:
+        self._update(row, -1)
+
+    def mean(self, metric: str) -> Optional[float]:
+        return self.sum[metric] / self.n if self.n else None
+
+    def corr(self, a: str, b: str) -> Optional[float]:
+        """Pearson correlation, or None with fewer than two points or zero variance."""
+        if self.n < 2:
+            return None
+        key = (a, b) if (a, b) in self.cross else (b, a)
+        cov = self.n * self.cross[key] - self.sum[a] * self.sum[b]
+        var_a = self.n * self.sumsq[a] - self.sum[a] ** 2
+        var_b = self.n * self.sumsq[b] - self.sum[b] ** 2
+        # Integer inputs can leave tiny negative residue instead of an exact zero
+        if var_a <= 1e-9 or var_b <= 1e-9:
+            return None
+        return max(-1.0, min(1.0, cov / math.sqrt(var_a * var_b)))
+
+    def correlations(self) -> dict:
+        return {f"{a}~{b}": self.corr(a, b) for a, b in PAIRS}
+
+
+class RollingStats(RunningStats):
+    """RunningStats over the last ``window_seconds``; old check-ins are evicted as time moves on."""
+
+    def __init__(self, window_seconds: float):
+        super().__init__()
+        self.window_seconds = window_seconds
+        self.rows: deque = deque()
+
+    def add(self, row: dict) -> None:
+        self.rows.append(row)
+        super().add(row)
+        self.advance(row["ts"])
+
+    def advance(self, now: Optional[float] = None) -> None:
+        # Amortised O(1): each check-in is evicted at most once
+        cutoff = (time.time() if now is None else now) - self.window_seconds
+        while self.rows and self.rows[0]["ts"] < cutoff:
+            self.remove(self.rows.popleft())
+
+
+class EWMA:
+    """Exponentially weighted moving average over successive check-ins."""
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1)
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        self.value = x if self.value is None else self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class CheckinStats:
+    """Incremental analytics for the Weekly Check-in insights and nudges.
+
+    Keeps all-time totals, 7/30/90-day rolling windows and fast/slow EWMAs per
+    metric. Each new check-in is folded in once; reading insights never
+    rescans the history.
+    """
+
+    def __init__(self, fast_span: int = 3, slow_span: int = 14):
+        self.total = RunningStats()
+        self.windows = {days: RollingStats(days * 86400) for days in WINDOW_DAYS}
+        self.fast = {m: EWMA(fast_span) for m in METRICS}
+        self.slow = {m: EWMA(slow_span) for m in METRICS}
+        self.last: Optional[dict] = None
+
+    @classmethod
+    def from_checkins(cls, checkins: Iterable[dict]) -> "CheckinStats":
+        stats = cls()
+        for checkin in checkins:
+            stats.add(checkin)
+        return stats
+
+    @property
+    def count(self) -> int:
+        return self.total.n
+
+    def add(self, checkin: dict) -> None:
+        row = {m: float(checkin.get(m) or 0) for m in METRICS}
+        row["ts"] = checkin.get("ts") or time.time()
+        self.total.add(row)
+        for window in self.windows.values():
+            window.add(row)
+        for m in METRICS:
+            self.fast[m].update(row[m])
+            self.slow[m].update(row[m])
+        self.last = row
+
+    def window(self, days: Optional[int] = None, now: Optional[float] = None) -> RunningStats:
+        """Stats for the last ``days`` (one of WINDOW_DAYS), or all time when None."""
+        if days is None:
+            return self.total
+        stats = self.windows[days]
+        stats.advance(now)
+        return stats
+
+    def trend(self, metric: str) -> float:
+        """Fast minus slow EWMA: positive when the metric is rising lately."""
+        fast, slow = self.fast[metric].value, self.slow[metric].value
+        return 0.0 if fast is None or slow is None else fast - slow
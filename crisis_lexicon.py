@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import os
+import re
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional
+
+DEFAULT_PACK_DIR = os.environ.get(
+    "SEHATSATHI_CRISIS_PACKS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "crisis"),
+)
+
+# Words (Latin, Devanagari with its vowel signs, Arabic/Urdu) or a clause break; the
+# danda and Urdu/Arabic full stop, comma and question mark count as breaks
+_BREAK = ".!?;:,\n\u0964\u0965\u060c\u061b\u061f\u06d4"
+_TOKEN = re.compile(
+    "[\\w'\u0900-\u0963\u0966-\u097f\u0610-\u061a\u0620-\u065f\u066e-\u06d3\u06d5-\u06ff\u0750-\u077f]+"
+    f"|[{_BREAK}]+"
+)
+_CLAUSE = "\x00"
+
+# Arabic code points commonly typed for their Urdu counterparts
+_URDU_FOLD = str.maketrans({"\u064a": "\u06cc", "\u0649": "\u06cc", "\u0643": "\u06a9", "\u0647": "\u06c1"})
+
+NEGATIONS = {
+    "en": {"not", "no", "never", "dont", "doesnt", "didnt", "wont", "wouldnt", "shouldnt", "isnt", "arent"},
+    "hi": {"nahi", "nahin", "nhi", "mat", "na", "नहीं", "नही", "मत", "न"},
+    "ur": {"nahi", "nahin", "nhi", "mat", "na", "نہیں", "نہ", "مت"},
+}
+# Hindi and Urdu put the negation after the verb ("marna chahta nahi hoon")
+NEGATION_BEFORE = 3
+NEGATION_AFTER = {"hi": 2, "ur": 2}
+
+_IRREGULAR = {"dying": "die", "died": "die", "dies": "die", "lying": "lie", "lives": "life", "wanna": "want"}
+
+
+def stem(token: str) -> str:
+    """Crude suffix stripping for English tokens; applied to text and phrases alike."""
+    if not token.isascii():
+        return token
+    token = _IRREGULAR.get(token, token)
+    for suffix in ("ing", "ed"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[: -len(suffix)]
+            if len(token) > 3 and token[-1] == token[-2] and token[-1] not in "aeiouls":
+                token = token[:-1]  # cutting -> cut
+            break
+    else:
+        if token.endswith("s") and len(token) > 3 and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]  # hope / hoping -> hop
+    return token
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFD", text.casefold()).replace("\u093c", "")  # drop Devanagari nukta
+    return unicodedata.normalize("NFC", text).translate(_URDU_FOLD).replace("\u2019", "'")
+
+
+def tokenize(normalized: str) -> list:
+    """``(stem, start, end)`` per word of already normalised text, with a clause-break token for punctuation."""
+    tokens = []
+    for m in _TOKEN.finditer(normalized):
+        word = m.group()
+        if word[0] in _BREAK:
+            tokens.append((_CLAUSE, m.start(), m.end()))
+        else:
+            tokens.append((stem(word.replace("'", "")), m.start(), m.end()))
+    return tokens
+
+
+@dataclass(frozen=True)
+class CrisisMatch:
+    phrase: str
+    category: str
+    language: str
+    matched: str
+    negated: bool
+
+
+class CrisisLexicon:
+    """Aho-Corasick automaton over stemmed word sequences.
+
+    Phrases match on word boundaries and through inflections ("killing myself"
+    hits "kill myself"). One pass over the text finds every phrase, so the cost
+    grows with the text, not with the size of the lexicon. A match is negated
+    when a cue from its language sits close by in the same clause.
+    """
+
+    def __init__(self, entries: Iterable[tuple]):
+        self.goto: list = [{}]
+        self.fail: list = [0]
+        self.out: list = [[]]
+        self.entries: list = []
+        for phrase, category, language in entries:
+            words = [t for t, _s, _e in tokenize(normalize_text(phrase)) if t != _CLAUSE]
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                nxt = self.goto[state].get(word)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][word] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(len(self.entries))
+            self.entries.append((phrase, category, language, len(words)))
+        self._link()
+
+    def _link(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(word, 0)
+                # Depth-1 states would otherwise point at themselves through the root
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def from_packs(cls, pack_dir: str = DEFAULT_PACK_DIR, languages: Optional[Iterable[str]] = None) -> "CrisisLexicon":
+        """Load ``<lang>.txt`` packs: one ``phrase | category`` per line, ``#`` for comments."""
+        wanted = set(languages) if languages else None
+        entries = []
+        for name in sorted(os.listdir(pack_dir)):
+            language, ext = os.path.splitext(name)
+            if ext != ".txt" or (wanted is not None and language not in wanted):
+                continue
+            with open(os.path.join(pack_dir, name), encoding="utf-8") as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        phrase, _, category = line.partition("|")
+                        entries.append((phrase.strip(), category.strip() or "crisis", language))
+        return cls(entries)
+
+    def _negated(self, tokens: list, first: int, last: int, language: str) -> bool:
+        cues = NEGATIONS.get(language, NEGATIONS["en"])
+        for i in range(first - 1, max(-1, first - 1 - NEGATION_BEFORE), -1):
+            if tokens[i][0] == _CLAUSE:
+                break
+            if tokens[i][0] in cues:
+                return True
+        for i in range(last + 1, min(len(tokens), last + 1 + NEGATION_AFTER.get(language, 0))):
+            if tokens[i][0] == _CLAUSE:
+                break
+            if tokens[i][0] in cues:
+                return True
+        return False
+
+    def matches(self, text: str) -> list:
+        if not text:
+            return []
+        normalized = normalize_text(text)
+        tokens = tokenize(normalized)
+        found, state = [], 0
+        for i, (word, _start, end) in enumerate(tokens):
+            while state and word not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(word, 0)
+            for entry in self.out[state]:
+                phrase, category, language, length = self.entries[entry]
+                first = i - length + 1
+                found.append(CrisisMatch(phrase, category, language, normalized[tokens[first][1]:end],
+                                         self._negated(tokens, first, i, language)))
+        return found
+
+    def detect(self, text: str) -> bool:
+        return any(not m.negated for m in self.matches(text))
+
+
+@lru_cache(maxsize=1)
+def default_lexicon() -> CrisisLexicon:
+    return CrisisLexicon.from_packs()
+
+
+def detect_crisis(text: str) -> bool:
+    return default_lexicon().detect(text)
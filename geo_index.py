@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import csv
+import difflib
+import heapq
+import math
+import os
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+DEFAULT_GAZETTEER_PATH = os.environ.get(
+    "SEHATSATHI_GAZETTEER",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.csv"),
+)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _key(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_xyz(lat: float, lon: float) -> tuple:
+    """Unit-sphere point; straight-line (chord) order equals great-circle order."""
+    p, l = math.radians(lat), math.radians(lon)
+    return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def km_to_chord(km: float) -> float:
+    return 2 * math.sin(min(math.pi, km / EARTH_RADIUS_KM) / 2)
+
+
+class Gazetteer:
+    """Offline place lookup: city name, alias or postal code -> (label, lat, lon).
+
+    Rows are ``name,aliases,zip_prefixes,country,lat,lon`` with ``;`` separating
+    multiple aliases/prefixes. Postal codes resolve by their longest known
+    prefix; names by exact match, then prefix, then closest spelling.
+    """
+
+    def __init__(self, rows: Iterable[dict]):
+        self.places: dict = {}
+        self.prefixes: dict = {}
+        for row in rows:
+            place = (row["name"].strip(), float(row["lat"]), float(row["lon"]))
+            for name in [row["name"], *(row.get("aliases") or "").split(";")]:
+                if _key(name):
+                    self.places.setdefault(_key(name), place)
+            for prefix in (row.get("zip_prefixes") or "").split(";"):
+                if prefix.strip():
+                    self.prefixes.setdefault(prefix.strip(), place)
+        self.names = sorted(self.places)
+        self.max_prefix = max((len(p) for p in self.prefixes), default=0)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GAZETTEER_PATH) -> "Gazetteer":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(csv.DictReader(f))
+
+    def lookup(self, place: str, fuzzy: bool = True) -> Optional[tuple]:
+        key = _key(place)
+        if not key:
+            return None
+        digits = key.replace(" ", "")
+        if digits.isdigit():
+            for n in range(min(len(digits), self.max_prefix), 0, -1):
+                if digits[:n] in self.prefixes:
+                    return self.prefixes[digits[:n]]
+            return None
+        if key in self.places:
+            return self.places[key]
+        i = bisect_left(self.names, key)
+        if i < len(self.names) and self.names[i].startswith(key):
+            return self.places[self.names[i]]
+        if fuzzy:
+            close = difflib.get_close_matches(key, self.names, n=1, cutoff=0.75)
+            if close:
+                return self.places[close[0]]
+        return None
+
+
+class KDTree:
+    """Static 3-d tree over unit-sphere points for k-nearest queries with a radius and a filter.
+
+    Nodes live in flat lists (point index, split axis, left, right); the tree
+    is built once by median split and never modified.
+    """
+
+    def __init__(self, points: list, ids: list):
+        self.points = points
+        self.ids = ids
+        self.node_point: list = []
+        self.node_axis: list = []
+        self.left: list = []
+        self.right: list = []
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, items: list, depth: int) -> int:
+        if not items:
+            return -1
+        axis = depth % 3
+        items.sort(key=lambda i: self.points[i][axis])
+        mid = len(items) // 2
+        node = len(self.node_point)
+        self.node_point.append(items[mid])
+        self.node_axis.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.left[node] = self._build(items[:mid], depth + 1)
+        self.right[node] = self._build(items[mid + 1:], depth + 1)
+        return node
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def nearest(self, target: tuple, k: int, max_dist: float = 2.0,
+                accept: Optional[Callable[[int], bool]] = None) -> list:
+        """Up to ``k`` ``(chord distance, id)`` pairs within ``max_dist``, nearest first."""
+        best: list = []  # max-heap of (-squared distance, id)
+        bound = max_dist * max_dist
+        # (node, squared distance from target to the node's side of its parent split)
+        stack = [(self.root, 0.0)] if self.root >= 0 else []
+        while stack:
+            node, gap = stack.pop()
+            if gap > bound:
+                continue
+            p = self.points[self.node_point[node]]
+            d2 = (p[0] - target[0]) ** 2 + (p[1] - target[1]) ** 2 + (p[2] - target[2]) ** 2
+            if d2 <= bound:
+                rid = self.ids[self.node_point[node]]
+                if accept is None or accept(rid):
+                    heapq.heappush(best, (-d2, rid))
+                    if len(best) > k:
+                        heapq.heappop(best)
+                    if len(best) == k:
+                        bound = -best[0][0]
+            axis = self.node_axis[node]
+            diff = target[axis] - p[axis]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # Push the far side first so the near side is explored first
+            if far >= 0 and diff * diff <= bound:
+                stack.append((far, diff * diff))
+            if near >= 0:
+                stack.append((near, gap))
+        return [(math.sqrt(-d2), rid) for d2, rid in sorted(best, reverse=True)]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+# Seconds spent importing each lazily loaded module, for the cold-start benchmark
+LOAD_SECONDS: dict = {}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def available(module: str) -> bool:
+    """Whether ``module`` is installed, asked of the import finders without running it."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load(module: str):
+    with _lock:
+        started = time.perf_counter()
+        loaded = importlib.import_module(module)
+        LOAD_SECONDS.setdefault(module, time.perf_counter() - started)
+        return loaded
+
+
+@lru_cache(maxsize=None)
+def optional_attr(module: str, name: str) -> Optional[object]:
+    """``module.name`` imported on first call, or None when the package is missing or broken."""
+    try:
+        return getattr(load(module), name)
+    except Exception:
+        return None
+
+
+class LazyModule:
+    """Module stand-in that imports the real module on first attribute access.
+
+    ``np = LazyModule("numpy")`` at the top of a file keeps ``np.zeros(...)``
+    call sites unchanged while moving the import cost to the first call.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        module = self._module
+        if module is None:
+            module = self._module = load(self._name)
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
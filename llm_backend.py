@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+
+from lazy_imports import available, load
+from token_budget import approx_tokens
+
+# "openai" talks to the real API; "stub" answers locally and deterministically
+BACKEND_ENV = "SEHATSATHI_LLM_BACKEND"
+STUB_BASE_URL = "http://stub.local/v1"
+
+_VOCAB = (
+    "you", "your", "feel", "sleep", "breathe", "gentle", "routine", "support", "notice",
+    "small", "steps", "today", "week", "rest", "walk", "journal", "friend", "plan",
+    "calm", "progress", "check-in", "energy", "kind", "pause", "ground", "evening",
+)
+
+
+def get_backend() -> str:
+    return os.environ.get(BACKEND_ENV, "openai").strip().lower() or "openai"
+
+
+class StubLLM:
+    """Deterministic stand-in for the chat completions endpoint.
+
+    ``latency`` is the delay before the first token and ``tokens_per_second``
+    the generation rate (0 means instant). Replies are derived from a hash of
+    the request so repeated runs produce identical plans.
+    """
+
+    def __init__(self, latency: float = 0.0, tokens_per_second: float = 0.0,
+                 section_tokens: int = 120, summary_tokens: int = 40):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.section_tokens = section_tokens
+        self.summary_tokens = summary_tokens
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.batches = StubBatches(self)
+        # Section titles ("Action") left out of replies asked for several sections, to exercise repairs
+        self.drop_sections: set = set()
+
+    @classmethod
+    def from_env(cls) -> "StubLLM":
+        return cls(
+            latency=float(os.environ.get("SEHATSATHI_STUB_LATENCY", "0") or 0),
+            tokens_per_second=float(os.environ.get("SEHATSATHI_STUB_TPS", "0") or 0),
+        )
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _words(self, seed: str, count: int) -> list:
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        return [_VOCAB[(digest[i % len(digest)] + i) % len(_VOCAB)] for i in range(count)]
+
+    def _reply(self, request: dict) -> tuple:
+        """Return ``(content, tool_call)`` for a request; exactly one is set."""
+        messages = request.get("messages") or []
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        seed = request.get("model", "") + prompt
+
+        forced = request.get("tool_choice")
+        if isinstance(forced, dict) and forced.get("type") == "function":
+            name = forced["function"]["name"]
+            param = f"{name.split('_')[1]}_summary" if name.count("_") >= 2 else "summary"
+            for tool in request.get("tools") or []:
+                fn = tool.get("function", {})
+                if fn.get("name") == name:
+                    param = (fn.get("parameters", {}).get("required") or [param])[0]
+            summary = " ".join(self._words(seed, self.summary_tokens)).capitalize() + "."
+            return None, {"name": name, "arguments": json.dumps({param: summary})}
+
+        response_format = request.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            keys = (response_format.get("json_schema") or {}).get("schema", {}).get("required") or ["assessment"]
+            if len(keys) > 1:
+                keys = [key for key in keys if key.capitalize() not in self.drop_sections]
+            return json.dumps({
+                key: f"## {key.capitalize()} Design\n\n" + " ".join(self._words(seed + key.capitalize(), self.section_tokens)).capitalize() + "."
+                for key in keys
+            }), None
+
+        headings = []
+        for title in re.findall(r"##\s*(\w+) Design", prompt):
+            if title not in headings:
+                headings.append(title)
+        if not headings:
+            headings = ["Assessment"]
+        if len(headings) > 1:
+            headings = [title for title in headings if title not in self.drop_sections] or headings[:1]
+        parts = []
+        for title in headings:
+            body = " ".join(self._words(seed + title, self.section_tokens))
+            parts.append(f"## {title} Design\n\n{body.capitalize()}.")
+        return "\n\n".join(parts), None
+
+    def _account(self, request: dict, completion_text: str) -> dict:
+        prompt_text = "".join(str(m.get("content") or "") for m in request.get("messages") or [])
+        usage = {
+            "prompt_tokens": approx_tokens(prompt_text),
+            "completion_tokens": approx_tokens(completion_text),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+        return usage
+
+    def _sleep_for(self, tokens: int) -> None:
+        if self.tokens_per_second > 0:
+            time.sleep(tokens / self.tokens_per_second)
+
+    def complete(self, request: dict) -> dict:
+        content, tool_call = self._reply(request)
+        text = content if content is not None else tool_call["arguments"]
+        if self.latency:
+            time.sleep(self.latency)
+        self._sleep_for(approx_tokens(text))
+        message = {"role": "assistant", "content": content}
+        if tool_call is not None:
+            message["tool_calls"] = [{"id": "call_stub", "type": "function", "function": tool_call}]
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_call is not None else "stop",
+            }],
+            "usage": self._account(request, text),
+        }
+
+    def stream(self, request: dict) -> Iterator[dict]:
+        content, tool_call = self._reply(request)
+        text = content if content is not None else tool_call["arguments"]
+        self._account(request, text)
+        if self.latency:
+            time.sleep(self.latency)
+        pieces = re.findall(r"\S+\s*|\s+", text)
+        for i, piece in enumerate(pieces):
+            self._sleep_for(1)
+            if tool_call is not None:
+                delta = {"tool_calls": [{"index": 0, "id": "call_stub", "type": "function",
+                                         "function": {"name": tool_call["name"] if i == 0 else None,
+                                                      "arguments": piece}}]}
+            else:
+                delta = {"content": piece}
+            yield {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+            }
+
+    def sse(self, request: dict) -> Iterator[bytes]:
+        for event in self.stream(request):
+            yield f"data: {json.dumps(event)}\n\n".encode("utf-8")
+        yield b"data: [DONE]\n\n"
+
+
+def _multipart_fields(body: bytes, content_type: str) -> dict:
+    """``name -> (filename, bytes)`` for each part of a multipart/form-data body."""
+    from email.parser import BytesParser
+    from email.policy import HTTP
+
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("utf-8") + body)
+    return {
+        part.get_param("name", header="content-disposition"): (part.get_filename(), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    }
+
+
+class StubBatches:
+    """In-memory Files and Batches endpoints answering each batch line with a :class:`StubLLM`.
+
+    A new batch reports ``validating``, the first retrieve ``in_progress`` and
+    the next one ``completed`` with its output file, so callers exercise their
+    polling loop. Lines whose ``custom_id`` is in ``fail_ids`` land in the
+    error file instead.
+    """
+
+    def __init__(self, stub: StubLLM):
+        self.stub = stub
+        self.fail_ids: set = set()
+        self._files: dict = {}
+        self._batches: dict = {}
+        self._lock = threading.Lock()
+
+    def _file(self, data: bytes, filename: str, purpose: str) -> dict:
+        with self._lock:
+            file_id = f"file-stub{len(self._files) + 1}"
+            self._files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": filename, "purpose": purpose, "status": "processed"}
+
+    def _run(self, batch: dict) -> None:
+        outputs, errors = [], []
+        for n, line in enumerate(self._files[batch["input_file_id"]].decode("utf-8").splitlines()):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            entry = {"id": f"batch_req_{n}", "custom_id": request.get("custom_id")}
+            if entry["custom_id"] in self.fail_ids:
+                errors.append(dict(entry, response=None, error={"code": "stub_failure", "message": "Injected failure"}))
+                continue
+            body = self.stub.complete(request.get("body") or {})
+            outputs.append(dict(entry, response={"status_code": 200, "request_id": f"req_{n}", "body": body}, error=None))
+        batch["request_counts"] = {"total": len(outputs) + len(errors), "completed": len(outputs), "failed": len(errors)}
+        if outputs:
+            batch["output_file_id"] = self._file("".join(json.dumps(o) + "\n" for o in outputs).encode("utf-8"),
+                                                 "batch_output.jsonl", "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self._file("".join(json.dumps(e) + "\n" for e in errors).encode("utf-8"),
+                                                "batch_errors.jsonl", "batch_output")["id"]
+        batch["status"], batch["completed_at"] = "completed", int(time.time())
+
+    def handle(self, method: str, path: str, body: bytes, content_type: str) -> tuple:
+        """``(status code, JSON payload or raw bytes)`` for a Files/Batches request; path is relative to ``/v1``."""
+        parts = path.strip("/").split("/")
+        if method == "POST" and parts == ["files"]:
+            fields = _multipart_fields(body, content_type)
+            filename, data = fields.get("file", ("upload.jsonl", b""))
+            purpose = (fields.get("purpose") or (None, b"batch"))[1].decode("utf-8")
+            return 200, self._file(data or b"", filename or "upload.jsonl", purpose)
+        if method == "GET" and len(parts) == 3 and parts[0] == "files" and parts[2] == "content":
+            data = self._files.get(parts[1])
+            return (404, {"error": {"message": "No such file"}}) if data is None else (200, data)
+        if method == "POST" and parts == ["batches"]:
+            request = json.loads(body or b"{}")
+            if request.get("input_file_id") not in self._files:
+                return 400, {"error": {"message": "Unknown input_file_id"}}
+            with self._lock:
+                batch_id = f"batch_stub{len(self._batches) + 1}"
+                batch = self._batches[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request.get("endpoint"),
+                    "input_file_id": request["input_file_id"], "completion_window": request.get("completion_window"),
+                    "status": "validating", "created_at": int(time.time()), "metadata": request.get("metadata"),
+                    "output_file_id": None, "error_file_id": None, "errors": None,
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                }
+            return 200, dict(batch)
+        if method == "GET" and len(parts) == 2 and parts[0] == "batches":
+            batch = self._batches.get(parts[1])
+            if batch is None:
+                return 404, {"error": {"message": "No such batch"}}
+            if batch["status"] == "validating":
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                self._run(batch)
+            return 200, dict(batch)
+        return 404, {"error": {"message": f"Stub does not serve {method} /{path.strip('/')}"}}
+
+
+def _batch_path(path: str) -> Optional[str]:
+    # "/v1/batches/x" -> "batches/x"; None for chat completions
+    tail = path.split("/v1/", 1)[-1]
+    return tail if tail.split("/", 1)[0] in ("files", "batches") else None
+
+
+@lru_cache(maxsize=1)
+def httpx_module():
+    """``httpx``, or None when missing; imported on first use, not at app start."""
+    # Newer openai releases ship on the httpx2 fork with the same API
+    for name in ("httpx", "httpx2"):
+        if available(name):
+            try:
+                return load(name)
+            except ImportError:
+                continue
+    return None
+
+
+@lru_cache(maxsize=1)
+def stub_transports() -> Optional[tuple]:
+    """``(StubTransport, AsyncStubTransport)`` answering from a :class:`StubLLM`, or None without httpx.
+
+    The classes subclass httpx's transports, so they are built on first use.
+    """
+    httpx = httpx_module()
+    if httpx is None:
+        return None
+
+    class _SyncSSE(httpx.SyncByteStream):
+        def __init__(self, chunks: Iterator[bytes]):
+            self._chunks = chunks
+
+        def __iter__(self):
+            yield from self._chunks
+
+    class _AsyncSSE(httpx.AsyncByteStream):
+        def __init__(self, chunks: Iterator[bytes]):
+            # One generator per response: httpx may call __aiter__ again while closing
+            self._chunks = chunks
+
+        async def __aiter__(self):
+            # Generate in a worker thread so simulated latency doesn't block the event loop
+            import asyncio
+            loop = asyncio.get_running_loop()
+            sentinel = object()
+            while True:
+                chunk = await loop.run_in_executor(None, next, self._chunks, sentinel)
+                if chunk is sentinel:
+                    break
+                yield chunk
+
+    class StubTransport(httpx.BaseTransport):
+        """httpx transport that answers chat completions from a :class:`StubLLM`."""
+
+        def __init__(self, stub: StubLLM):
+            self.stub = stub
+
+        def handle_request(self, request):
+            batch_path = _batch_path(request.url.path)
+            if batch_path is not None:
+                status, payload = self.stub.batches.handle(request.method, batch_path, request.read(),
+                                                           request.headers.get("content-type", ""))
+                if isinstance(payload, bytes):
+                    return httpx.Response(status, content=payload)
+                return httpx.Response(status, json=payload)
+            body = json.loads(request.read() or b"{}")
+            if body.get("stream"):
+                return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                      stream=_SyncSSE(self.stub.sse(body)))
+            return httpx.Response(200, json=self.stub.complete(body))
+
+    class AsyncStubTransport(httpx.AsyncBaseTransport):
+        def __init__(self, stub: StubLLM):
+            self.stub = stub
+
+        async def handle_async_request(self, request):
+            import asyncio
+            body = json.loads(await request.aread() or b"{}")
+            if body.get("stream"):
+                return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                      stream=_AsyncSSE(self.stub.sse(body)))
+            payload = await asyncio.get_running_loop().run_in_executor(None, self.stub.complete, body)
+            return httpx.Response(200, json=payload)
+
+    return StubTransport, AsyncStubTransport
+
+
+def serve_stub(stub: StubLLM):
+    """Serve ``stub`` over HTTP/1.1 on a free localhost port; returns ``(server, base_url)``.
+
+    Used for call sites that build their own HTTP client (AutoGen's
+    OpenAIWrapper) and for connection-level benchmarks.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if request.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for data in stub.sse(request):
+                    self._chunk(data)
+                self._chunk(b"")
+                return
+            payload = json.dumps(stub.complete(request)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _chunk(self, data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+_stub: Optional[StubLLM] = None
+_stub_url: Optional[str] = None
+_stub_lock = threading.Lock()
+
+
+def get_stub() -> StubLLM:
+    """Process-wide stub instance, configured from SEHATSATHI_STUB_* on first use."""
+    global _stub
+    with _stub_lock:
+        if _stub is None:
+            _stub = StubLLM.from_env()
+        return _stub
+
+
+def stub_base_url() -> str:
+    """Base URL of the HTTP-served stub, started on first use."""
+    global _stub_url
+    stub = get_stub()
+    with _stub_lock:
+        if _stub_url is None:
+            _, _stub_url = serve_stub(stub)
+        return _stub_url
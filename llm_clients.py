@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from lazy_imports import optional_attr
+from llm_backend import STUB_BASE_URL, get_backend, get_stub, httpx_module, stub_base_url, stub_transports
+
+
+def _close(obj) -> None:
+    """Close an evicted client; AutoGen wrappers hold one OpenAI client per config entry."""
+    closers = [getattr(obj, "close", None)]
+    closers += [getattr(getattr(c, "_oai_client", None), "close", None) for c in getattr(obj, "_clients", None) or []]
+    for close in closers:
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+def key_fingerprint(api_key: str) -> str:
+    # Never keep raw keys as dict keys; a short digest is enough to tell them apart
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class ClientRegistry:
+    """Process-wide OpenAI clients keyed by (api key fingerprint, model).
+
+    All clients share one keep-alive ``httpx.Client`` so TLS sessions and
+    connections survive across turns, agents and Streamlit sessions. AutoGen
+    ``OpenAIWrapper`` instances are cached the same way, additionally keyed on
+    the llm_config so the tool-call and write-up variants each get one wrapper.
+
+    With the ``stub`` backend (see :mod:`llm_backend`) every client is wired to
+    the local deterministic stub instead of the OpenAI API.
+
+    Both pools are LRU-bounded (``max_clients`` / ``max_wrappers``): with one
+    key per user they would otherwise grow with every user. Evicted entries
+    are closed unless they only borrow the shared HTTP client.
+
+    The registry is built at app start; httpx is only imported, and the
+    shared client only created, when the first OpenAI client is requested.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, max_connections: int = 32,
+                 max_keepalive_connections: int = 16, timeout: float = 120.0,
+                 backend: Optional[str] = None, max_clients: int = 256, max_wrappers: int = 256):
+        self.backend = backend or get_backend()
+        self.base_url = STUB_BASE_URL if self.backend == "stub" else base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.timeout = timeout
+        self._http = None
+        self._http_ready = False
+        self.max_clients = max_clients
+        self.max_wrappers = max_wrappers
+        self._clients: OrderedDict = OrderedDict()
+        self._wrappers: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"clients_created": 0, "wrappers_created": 0, "reused": 0, "evicted": 0}
+
+    def _shared_http(self):
+        # Caller holds the lock; None when httpx is missing (clients then build their own)
+        if not self._http_ready:
+            self._http_ready = True
+            httpx = httpx_module()
+            if httpx is not None and self.backend == "stub":
+                StubTransport, _AsyncStubTransport = stub_transports()
+                self._http = httpx.Client(transport=StubTransport(get_stub()), timeout=self.timeout)
+            elif httpx is not None:
+                self._http = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_keepalive_connections,
+                    ),
+                    timeout=self.timeout,
+                )
+        return self._http
+
+    def openai(self, api_key: str, model: str = ""):
+        # openai is imported on the first client, not at app start
+        OpenAI = optional_attr("openai", "OpenAI")
+        if OpenAI is None:
+            raise ImportError("OpenAI client is not installed. Please install 'openai'.")
+        key = (key_fingerprint(api_key), model)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                kwargs = {"api_key": api_key}
+                if self.base_url:
+                    kwargs["base_url"] = self.base_url
+                http = self._shared_http()
+                if http is not None:
+                    kwargs["http_client"] = http
+                client = OpenAI(**kwargs)
+                self._clients[key] = client
+                self.stats["clients_created"] += 1
+                # Clients on the shared pool own no connections; closing one would close the pool
+                self._evict(self._clients, self.max_clients, close=self._http is None)
+            else:
+                self._clients.move_to_end(key)
+                self.stats["reused"] += 1
+            return client
+
+    def async_openai(self, api_key: str):
+        """A new ``AsyncOpenAI`` client; async clients are bound to one event loop, so they are not pooled."""
+        AsyncOpenAI = optional_attr("openai", "AsyncOpenAI")
+        if AsyncOpenAI is None:
+            raise ImportError("OpenAI client is not installed. Please install 'openai'.")
+        kwargs = {"api_key": api_key}
+        if self.base_url:
+            kwargs["base_url"] = self.base_url
+        httpx = httpx_module()
+        if self.backend == "stub" and httpx is not None:
+            _StubTransport, AsyncStubTransport = stub_transports()
+            kwargs["http_client"] = httpx.AsyncClient(transport=AsyncStubTransport(get_stub()))
+        return AsyncOpenAI(**kwargs)
+
+    def llm_config(self, api_key: str, model: str) -> dict:
+        """AutoGen ``llm_config`` for the active backend."""
+        entry = {"model": model, "api_key": api_key}
+        if self.backend == "stub":
+            # OpenAIWrapper builds its own HTTP client, so it talks to the stub over localhost
+            entry["base_url"] = stub_base_url()
+        elif self.base_url:
+            entry["base_url"] = self.base_url
+        return {"config_list": [entry]}
+
+    def wrapper(self, wrapper_cls, llm_config: dict):
+        config_list = llm_config.get("config_list") or [{}]
+        first = config_list[0]
+        signature = hashlib.sha256(
+            json.dumps(llm_config, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        key = (key_fingerprint(first.get("api_key", "")), first.get("model", ""), signature)
+        with self._lock:
+            wrapper = self._wrappers.get(key)
+            if wrapper is None:
+                wrapper = wrapper_cls(**llm_config)
+                self._wrappers[key] = wrapper
+                self.stats["wrappers_created"] += 1
+                self._evict(self._wrappers, self.max_wrappers, close=True)
+            else:
+                self._wrappers.move_to_end(key)
+                self.stats["reused"] += 1
+            return wrapper
+
+    def _evict(self, pool: OrderedDict, limit: int, close: bool) -> None:
+        # Caller holds the lock
+        while len(pool) > limit:
+            _key, evicted = pool.popitem(last=False)
+            self.stats["evicted"] += 1
+            if close:
+                _close(evicted)
+
+    def close(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._wrappers.clear()
+            if self._http is not None:
+                self._http.close()
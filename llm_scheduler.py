@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Awaitable, Callable, Hashable, Optional
+
+from llm_clients import key_fingerprint
+
+DEFAULT_WORKERS = int(os.environ.get("SEHATSATHI_LLM_WORKERS", "4") or 4)
+# LLM calls per minute allowed per API key
+DEFAULT_RPM = float(os.environ.get("SEHATSATHI_LLM_RPM", "60") or 60)
+
+
+class TokenBucket:
+    """Classic token bucket; ``reserve`` books capacity and says how long to wait for it.
+
+    Reservations may drive the balance negative, which queues later callers
+    behind earlier ones without a condition variable.
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, cost: float = 1.0, now: Optional[float] = None) -> float:
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= cost
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Server-suggested delay from ``retry-after-ms`` / ``retry-after`` headers, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class _Job:
+    """One scheduled ``fn`` and the LLM calls it has made so far."""
+
+    def __init__(self, scheduler: "RequestScheduler", api_key: str, fn: Callable[[], object], cost: float,
+                 future: Future):
+        self.scheduler = scheduler
+        self.api_key = api_key
+        self.fn = fn
+        self.cost = cost
+        self.future = future
+        self.attempt = 0
+        self.calls = 0
+
+
+# The job running on this worker thread (copied into the asyncio tasks it starts)
+_current_job: contextvars.ContextVar = contextvars.ContextVar("llm_scheduler_job", default=None)
+
+
+def llm_call(request: Callable[[], object]):
+    """Make one LLM request; inside a scheduled job a 429 retries this request alone."""
+    job = _current_job.get()
+    if job is None:
+        return request()
+    return job.scheduler._call(job, request)
+
+
+async def allm_call(request: Callable[[], Awaitable]):
+    """:func:`llm_call` for ``AsyncOpenAI`` requests; the backoff awaits instead of blocking the loop."""
+    job = _current_job.get()
+    if job is None:
+        return await request()
+    return await job.scheduler._acall(job, request)
+
+
+class RequestScheduler:
+    """Process-wide gate in front of LLM work.
+
+    - a bounded worker pool caps how many plan generations run at once;
+    - a token bucket per API key spaces out jobs by the LLM calls each will
+      make; a job that has to wait is started by a timer, not parked on a worker;
+    - jobs sharing a ``key`` while one is in flight join it (single-flight);
+    - 429s are retried with exponential backoff and jitter, honouring
+      ``Retry-After`` when the server sends it. Requests made through
+      :func:`llm_call` / :func:`allm_call` are retried one at a time, so a
+      429 on the fifth call of a plan does not repeat the first four; a job
+      whose own ``fn`` raised the 429 is requeued on the timer.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, requests_per_minute: float = DEFAULT_RPM,
+                 burst: Optional[float] = None, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.max_workers = max_workers
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst if burst is not None else max(1.0, requests_per_minute / 6)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-scheduler")
+        self._buckets: dict = {}
+        self._inflight: dict = {}
+        # Re-entrant: add_done_callback runs inline when the job already finished
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        # (due, tiebreak, job) waiting for the bucket or a retry backoff; one timer thread serves them all
+        self._delayed: list = []
+        self._order = itertools.count()
+        self._timer: Optional[threading.Thread] = None
+        self.stats = {
+            "submitted": 0, "deduplicated": 0, "completed": 0, "failed": 0,
+            "rate_limited": 0, "queued": 0, "running": 0, "waited_seconds": 0.0,
+        }
+
+    def _bucket(self, api_key: str) -> TokenBucket:
+        fingerprint = key_fingerprint(api_key)
+        with self._lock:
+            bucket = self._buckets.get(fingerprint)
+            if bucket is None:
+                bucket = self._buckets[fingerprint] = TokenBucket(self.requests_per_minute / 60, self.burst)
+            return bucket
+
+    def schedule(self, api_key: str, fn: Callable[[], object], key: Optional[Hashable] = None,
+                 cost: float = 1.0) -> tuple:
+        """Queue ``fn`` and return ``(future, shared)``.
+
+        ``cost`` is the number of LLM calls the job makes; ``shared`` is True
+        when an identical in-flight job was joined instead of starting a new one.
+        """
+        with self._lock:
+            if key is not None and key in self._inflight:
+                self.stats["deduplicated"] += 1
+                return self._inflight[key], True
+            self.stats["submitted"] += 1
+            future: Future = Future()
+            job = _Job(self, api_key, fn, cost, future)
+            self._queue(job, self._bucket(api_key).reserve(cost))
+            if key is not None:
+                self._inflight[key] = future
+                future.add_done_callback(lambda _f: self._forget(key, future))
+            return future, False
+
+    def run(self, api_key: str, fn: Callable[[], object], key: Optional[Hashable] = None, cost: float = 1.0):
+        return self.schedule(api_key, fn, key, cost)[0].result()
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _queue(self, job: _Job, delay: float) -> None:
+        with self._lock:
+            self.stats["queued"] += 1
+            if delay <= 0:
+                self._pool.submit(self._run, job)
+                return
+            self.stats["waited_seconds"] += delay
+            heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._order), job))
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._timer_loop, name="llm-scheduler-timer", daemon=True)
+                self._timer.start()
+            self._changed.notify_all()
+
+    def _timer_loop(self) -> None:
+        with self._lock:
+            while True:
+                if not self._delayed:
+                    self._changed.wait()
+                    continue
+                wait = self._delayed[0][0] - time.monotonic()
+                if wait > 0:
+                    self._changed.wait(wait)
+                    continue
+                _due, _order, job = heapq.heappop(self._delayed)
+                self._pool.submit(self._run, job)
+
+    def _backoff(self, api_key: str, exc: BaseException, attempt: int, cost: float) -> Optional[float]:
+        """Seconds before a rate-limited request is retried, or None to give up on ``exc``."""
+        if not is_rate_limited(exc) or attempt >= self.max_retries:
+            return None
+        delay = retry_after(exc)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        # The retry is billed again, for the calls it repeats only
+        delay = max(delay, self._bucket(api_key).reserve(cost))
+        with self._lock:
+            self.stats["rate_limited"] += 1
+            self.stats["waited_seconds"] += delay
+        return delay
+
+    def _call(self, job: _Job, request: Callable[[], object]):
+        job.calls += 1
+        for attempt in itertools.count():
+            try:
+                return request()
+            except Exception as exc:
+                delay = self._backoff(job.api_key, exc, attempt, 1)
+                if delay is None:
+                    raise
+                # Mid-job: the calls already made are kept, so this one waits in place
+                time.sleep(delay)
+
+    async def _acall(self, job: _Job, request: Callable[[], Awaitable]):
+        job.calls += 1
+        for attempt in itertools.count():
+            try:
+                return await request()
+            except Exception as exc:
+                delay = self._backoff(job.api_key, exc, attempt, 1)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+
+    def _run(self, job: _Job) -> None:
+        with self._lock:
+            self.stats["queued"] -= 1
+            self.stats["running"] += 1
+        token = _current_job.set(job)
+        try:
+            if job.attempt == 0 and not job.future.set_running_or_notify_cancel():
+                return
+            try:
+                result = job.fn()
+            except Exception as exc:
+                # Only a job that made no call through llm_call can be rerun without repeating work
+                delay = None if job.calls else self._backoff(job.api_key, exc, job.attempt, job.cost)
+                if delay is None:
+                    with self._lock:
+                        self.stats["failed"] += 1
+                    job.future.set_exception(exc)
+                else:
+                    job.attempt += 1
+                    self._queue(job, delay)
+                return
+            with self._lock:
+                self.stats["completed"] += 1
+            job.future.set_result(result)
+        finally:
+            _current_job.reset(token)
+            with self._lock:
+                self.stats["running"] -= 1
+                self._changed.notify_all()
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self.stats["queued"]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._inflight), workers=self.max_workers,
+                        waited_seconds=round(self.stats["waited_seconds"], 2))
+
+    def shutdown(self) -> None:
+        """Wait for every queued, delayed and running job, then stop the workers."""
+        with self._lock:
+            self._changed.wait_for(lambda: not self.stats["queued"] and not self.stats["running"])
+        self._pool.shutdown(wait=True)
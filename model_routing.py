@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+# Plan stages that can each run on their own model
+STAGES = ("summary", "section", "fallback")
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Which model serves each plan stage.
+
+    ``summary`` handles the forced ``update_*_overview`` tool calls (2-3
+    sentences, a good fit for the fastest model), ``section`` the
+    ``## ... Design`` write-ups and ``fallback`` the single-call plan.
+    """
+
+    summary: str
+    section: str
+    fallback: str
+
+    @classmethod
+    def uniform(cls, model: str) -> "ModelRoute":
+        return cls(model, model, model)
+
+    @classmethod
+    def from_env(cls, default: str, summary: Optional[str] = None, section: Optional[str] = None,
+                 fallback: Optional[str] = None) -> "ModelRoute":
+        """Explicit arguments win, then ``SEHATSATHI_<STAGE>_MODEL``, then ``default``."""
+        chosen = {"summary": summary, "section": section, "fallback": fallback}
+        return cls(**{
+            stage: chosen[stage] or os.environ.get(f"SEHATSATHI_{stage.upper()}_MODEL") or default
+            for stage in STAGES
+        })
+
+    def cache_tag(self, mode: str) -> str:
+        """Plan-cache model key: only the stages a mode actually uses."""
+        if mode == "fallback":
+            return self.fallback
+        if self.summary == self.section:
+            return self.section
+        return f"summary={self.summary};section={self.section}"
@@ -0,0 +1,310 @@
+"""Bulk plan generation through the OpenAI Batch API.
+
+    python batch_plans.py intakes.jsonl -o plans.jsonl --openai-batch
+
+For non-urgent work (regenerating plans after a prompt change, nightly
+cohorts) the single-call fallback prompt of every intake is written to a
+batch JSONL file, uploaded, and run by OpenAI within the 24h window at batch
+pricing and outside the synchronous rate limits. Results are parsed into the
+``assessment``/``action``/``followup`` sections the same way the live fallback
+does it (JSON sections, or :func:`plan_engine.split_sections` with
+structured output off); sections a reply left out are re-requested on their
+own in one follow-up batch. Plans are appended to the same output/checkpoint
+file as :mod:`batch_plans`.
+
+Submitted batch IDs are recorded next to the output (``<output>.batches.json``)
+before polling starts, so a rerun after an interruption attaches to them
+instead of paying for the requests twice. With ``SEHATSATHI_LLM_BACKEND=stub``
+the Files/Batches endpoints are served by :class:`llm_backend.StubBatches`.
+"""
+from __future__ import annotations
+
+import io
+import json
+import os
+import time
+from typing import Callable, Iterable, Optional
+
+from batch_plans import BatchReport, Intake, completed_ids
+from model_routing import ModelRoute
+from plan_cache import PlanCache, cache_key
+from plan_engine import (
+    FALLBACK_TEMPERATURE,
+    SECTION_KEYS,
+    STRUCTURED_OUTPUT,
+    fallback_messages,
+    light_route,
+    missing_sections,
+    parse_plan_json,
+    plan_response_format,
+    split_sections,
+)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# API limits per batch input file, with some headroom on the size
+MAX_REQUESTS_PER_BATCH = 50_000
+MAX_BATCH_BYTES = 190 * 1024 * 1024
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+DEFAULT_POLL_SECONDS = 30.0
+
+
+def batch_line(custom_id: str, model: str, task: str, structured: bool = STRUCTURED_OUTPUT,
+               keys: tuple = SECTION_KEYS) -> dict:
+    """One Batch API request: the fallback chat completion for ``task`` (only ``keys`` when repairing)."""
+    body = {"model": model, "messages": fallback_messages(task, structured, keys), "temperature": FALLBACK_TEMPERATURE}
+    if structured:
+        body["response_format"] = plan_response_format(keys)
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+
+def chunk_lines(lines: Iterable[dict], max_requests: int = MAX_REQUESTS_PER_BATCH,
+                max_bytes: int = MAX_BATCH_BYTES) -> list:
+    """Serialized batch files (bytes), each within the per-batch request and size limits."""
+    files, current, size = [], [], 0
+    for line in lines:
+        data = (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
+        if current and (len(current) >= max_requests or size + len(data) > max_bytes):
+            files.append(b"".join(current))
+            current, size = [], 0
+        current.append(data)
+        size += len(data)
+    if current:
+        files.append(b"".join(current))
+    return files
+
+
+def _file_text(content) -> str:
+    text = getattr(content, "text", None)
+    if text is None:
+        text = content.read() if hasattr(content, "read") else content
+    return text.decode("utf-8") if isinstance(text, bytes) else str(text)
+
+
+def parse_results(text: str) -> dict:
+    """``custom_id -> (content, usage, error)`` from a batch output or error file."""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        body = response.get("body") or {}
+        error = entry.get("error")
+        if error is None and response.get("status_code", 200) != 200:
+            error = body.get("error") or {"message": f"HTTP {response.get('status_code')}"}
+        content = ""
+        if error is None:
+            choices = body.get("choices") or [{}]
+            content = (choices[0].get("message") or {}).get("content") or ""
+        message = None if error is None else (error.get("message") if isinstance(error, dict) else str(error))
+        results[entry.get("custom_id")] = (content, body.get("usage") or {}, message)
+    return results
+
+
+class OpenAIBatchPlanner:
+    """Plans for many intakes via the Batch API, written in :mod:`batch_plans`' output format.
+
+    ``client`` is an OpenAI client (e.g. ``ClientRegistry().openai(api_key)``).
+    Identical intakes (same task and model) become one batch request. ``sleep``
+    is the pause between polls and can be swapped out in tests.
+    """
+
+    def __init__(self, client, route: ModelRoute, cache: Optional[PlanCache] = None,
+                 light_routing: bool = False, structured: bool = STRUCTURED_OUTPUT, repair: bool = True,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS, max_wait: Optional[float] = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.client = client
+        self.route = route
+        self.structured = structured
+        self.repair = repair
+        self.cache = cache
+        self.light_routing = light_routing
+        self.poll_seconds = poll_seconds
+        self.max_wait = max_wait
+        self.sleep = sleep
+
+    def _prepare(self, intake: Intake) -> tuple:
+        route, note = self.route, ""
+        if self.light_routing:
+            route, note = light_route(self.route, intake.mental_state, intake.recent_changes, intake.current_symptoms)
+        task = intake.task
+        return task, route.fallback, note
+
+    def parse(self, content: str, keys: tuple = SECTION_KEYS) -> dict:
+        return parse_plan_json(content, keys) if self.structured else split_sections(content)
+
+    def _repair(self, collected: dict) -> None:
+        """Re-request only the sections replies left out, as one follow-up batch, and merge them in."""
+        lines, targets = [], {}
+        for (batch_id, custom_id), (_batch_id, entry, output, _usage, error) in collected.items():
+            missing = tuple(missing_sections(output))
+            if error is None and missing:
+                # Numbered: the same custom_id can come from two batches (a resumed one and a new one)
+                repair_id = f"{custom_id}:repair:{len(targets)}"
+                targets[repair_id] = ((batch_id, custom_id), missing)
+                lines.append(batch_line(repair_id, entry["models"][custom_id], entry["tasks"][custom_id],
+                                        self.structured, missing))
+        if not lines:
+            return
+        batch_ids = [self.submit(data, {"source": "sehatsathi", "repair": "1"}) for data in chunk_lines(lines)]
+        for batch in self.wait(batch_ids).values():
+            if batch.status != "completed":
+                continue
+            for repair_id, (content, usage, error) in self.results(batch).items():
+                if repair_id not in targets or error is not None:
+                    continue
+                key, missing = targets[repair_id]
+                target = collected[key]
+                target[2].update({gen: text for gen, text in self.parse(content, missing).items() if text})
+                for name in ("prompt_tokens", "completion_tokens"):
+                    target[3][name] = target[3].get(name, 0) + usage.get(name, 0)
+
+    def submit(self, data: bytes, metadata: Optional[dict] = None) -> str:
+        uploaded = self.client.files.create(file=("plans.jsonl", io.BytesIO(data)), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window=COMPLETION_WINDOW,
+            metadata=metadata or {"source": "sehatsathi"},
+        )
+        return batch.id
+
+    def wait(self, batch_ids: Iterable[str]) -> dict:
+        """Poll until every batch reaches a terminal state; ``batch_id -> batch``."""
+        pending, finished = list(batch_ids), {}
+        started = time.monotonic()
+        while pending:
+            for batch_id in list(pending):
+                batch = self.client.batches.retrieve(batch_id)
+                if batch.status in TERMINAL_STATES:
+                    finished[batch_id] = batch
+                    pending.remove(batch_id)
+            if pending:
+                if self.max_wait is not None and time.monotonic() - started > self.max_wait:
+                    raise TimeoutError(f"Batches still running after {self.max_wait:.0f}s: {', '.join(pending)}")
+                self.sleep(self.poll_seconds)
+        return finished
+
+    def results(self, batch) -> dict:
+        results = {}
+        for file_id in (batch.error_file_id, batch.output_file_id):
+            if file_id:
+                results.update(parse_results(_file_text(self.client.files.content(file_id))))
+        return results
+
+    def run(self, intakes: Iterable[Intake], out_path: str, resume: bool = True,
+            on_record: Optional[Callable[[dict], None]] = None) -> BatchReport:
+        report = BatchReport()
+        started = time.perf_counter()
+        state_path = out_path + ".batches.json"
+        state = {"batches": {}}
+        if resume and os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        elif os.path.exists(state_path):
+            os.remove(state_path)
+        done = completed_ids(out_path) if resume else set()
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+
+        def save_state() -> None:
+            tmp = state_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+            os.replace(tmp, state_path)
+
+        with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+            def write(record: dict) -> None:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if on_record is not None:
+                    on_record(record)
+
+            # Batches a previous run submitted and did not collect: their intakes are already paid for
+            in_flight = {intake_id for b in state["batches"].values() for ids in b["requests"].values()
+                         for intake_id, _note in ids}
+            # custom_id -> batch already carrying that request, so a new intake with the same task joins it
+            in_flight_requests = {cid: batch_id for batch_id, b in state["batches"].items() for cid in b["requests"]}
+            joined = False
+            requests, lines = {}, []
+            for intake in intakes:
+                report.total += 1
+                if intake.intake_id in done or intake.intake_id in in_flight:
+                    report.skipped += intake.intake_id in done
+                    continue
+                task, model, note = self._prepare(intake)
+                if self.cache is not None:
+                    cached = self.cache.get(task, model)
+                    if cached is not None:
+                        report.ok += 1
+                        report.cached += 1
+                        write({"id": intake.intake_id, "status": "ok", "mode": "cache", "model": model,
+                               "note": note, "attempts": 0, "seconds": 0.0, "output": cached, "metrics": {}})
+                        continue
+                custom_id = cache_key(task, model)[:40]
+                if custom_id in in_flight_requests:
+                    report.shared += 1
+                    state["batches"][in_flight_requests[custom_id]]["requests"][custom_id].append((intake.intake_id, note))
+                    joined = True
+                    continue
+                if custom_id in requests:
+                    report.shared += 1
+                else:
+                    requests[custom_id] = {"model": model, "task": task, "ids": []}
+                    lines.append(batch_line(custom_id, model, task, self.structured))
+                requests[custom_id]["ids"].append((intake.intake_id, note))
+
+            if joined:
+                save_state()
+            for data in chunk_lines(lines):
+                ids = [json.loads(line)["custom_id"] for line in data.decode("utf-8").splitlines()]
+                batch_id = self.submit(data)
+                state["batches"][batch_id] = {
+                    "submitted": time.time(),
+                    "models": {cid: requests[cid]["model"] for cid in ids},
+                    "tasks": {cid: requests[cid]["task"] for cid in ids},
+                    "requests": {cid: requests[cid]["ids"] for cid in ids},
+                }
+                save_state()
+
+            # (batch_id, custom_id) -> [batch_id, entry, sections, usage, error] for every request of the
+            # finished batches; custom_ids are only unique within one batch
+            collected = {}
+            for batch_id, batch in self.wait(list(state["batches"])).items():
+                entry = state["batches"][batch_id]
+                results = self.results(batch) if batch.status == "completed" else {}
+                for custom_id in entry["requests"]:
+                    content, usage, error = results.get(custom_id, ("", {}, f"batch {batch.status}"))
+                    collected[batch_id, custom_id] = [batch_id, entry, self.parse(content) if error is None else {},
+                                                      dict(usage), error]
+            if self.repair:
+                self._repair(collected)
+
+            for (_batch_id, custom_id), (batch_id, entry, output, usage, error) in collected.items():
+                model = entry["models"][custom_id]
+                seconds = round(time.time() - entry["submitted"], 3)
+                missing = missing_sections(output)
+                if error is None and missing:
+                    error = f"missing sections: {', '.join(missing)}"
+                if error is None:
+                    report.prompt_tokens += usage.get("prompt_tokens", 0)
+                    report.completion_tokens += usage.get("completion_tokens", 0)
+                    report.latencies.append(seconds)
+                    if self.cache is not None:
+                        self.cache.put(entry["tasks"][custom_id], model, output)
+                for intake_id, note in entry["requests"][custom_id]:
+                    if error is None:
+                        report.ok += 1
+                        write({"id": intake_id, "status": "ok", "mode": "openai-batch", "model": model,
+                               "note": note, "attempts": 1, "seconds": seconds, "output": output,
+                               "metrics": {"batch_id": batch_id, "prompt_tokens": usage.get("prompt_tokens", 0),
+                                           "completion_tokens": usage.get("completion_tokens", 0)}})
+                    else:
+                        report.failed += 1
+                        write({"id": intake_id, "status": "failed", "attempts": 1, "batch_id": batch_id,
+                               "error": error})
+            for batch_id in {c[0] for c in collected.values()}:
+                del state["batches"][batch_id]
+            save_state()
+        if not state["batches"] and os.path.exists(state_path):
+            os.remove(state_path)
+        report.seconds = time.perf_counter() - started
+        return report
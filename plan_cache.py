@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+# Bump when prompts change so stale plans are not served for the new wording
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SEHATSATHI_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+
+def normalize_task(task: str) -> str:
+    # The task f-string carries indentation and blank lines; only the words matter
+    return " ".join((task or "").split())
+
+
+def cache_key(task: str, model: str) -> str:
+    raw = f"v{CACHE_VERSION}\0{model}\0{normalize_task(task)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """Two-tier cache of generated plans: in-memory LRU in front of SQLite.
+
+    Entries expire after ``ttl_seconds``; the disk tier is trimmed to
+    ``max_disk_entries`` / ``max_disk_bytes`` by least-recent access.
+    ``clock`` returns the current time in seconds (swappable in tests).
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 128,
+                 ttl_seconds: float = 7 * 24 * 3600, max_disk_entries: int = 5000,
+                 max_disk_bytes: int = 64 * 1024 * 1024, clock: Callable[[], float] = time.time):
+        self.path = path or os.path.join(DEFAULT_CACHE_DIR, "plans.sqlite")
+        self.max_memory_entries = max_memory_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.clock = clock
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " key TEXT PRIMARY KEY, model TEXT, created REAL, last_access REAL,"
+            " size INTEGER, payload TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS plans_last_access ON plans(last_access)")
+        self._db.commit()
+
+    def get(self, task: str, model: str) -> Optional[dict]:
+        key = cache_key(task, model)
+        now = self.clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, output = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return dict(output)
+                del self._memory[key]
+
+            row = self._db.execute("SELECT created, payload FROM plans WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[0] <= self.ttl_seconds:
+                self._db.execute("UPDATE plans SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                output = json.loads(row[1])
+                self._remember(key, row[0], output)
+                self.stats["disk_hits"] += 1
+                return dict(output)
+            if row is not None:
+                self._db.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["evictions"] += 1
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, task: str, model: str, output: dict) -> None:
+        key = cache_key(task, model)
+        now = self.clock()
+        payload = json.dumps(output, ensure_ascii=False)
+        with self._lock:
+            self._remember(key, now, dict(output))
+            self._db.execute(
+                "INSERT OR REPLACE INTO plans (key, model, created, last_access, size, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, now, now, len(payload.encode("utf-8")), payload),
+            )
+            self._evict_disk(now)
+            self._db.commit()
+            self.stats["writes"] += 1
+
+    def delete(self, task: str, model: str) -> None:
+        key = cache_key(task, model)
+        with self._lock:
+            self._memory.pop(key, None)
+            self._db.execute("DELETE FROM plans WHERE key = ?", (key,))
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM plans")
+            self._db.commit()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+            lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": count,
+                "disk_bytes": size,
+            }
+
+    def _remember(self, key: str, created: float, output: dict) -> None:
+        self._memory[key] = (created, output)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._db.execute("DELETE FROM plans WHERE created < ?", (now - self.ttl_seconds,)).rowcount
+        self.stats["evictions"] += max(expired, 0)
+        count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM plans").fetchone()
+        if count <= self.max_disk_entries and size <= self.max_disk_bytes:
+            return
+        # Drop least-recently used rows until both limits hold
+        for key, row_size in self._db.execute("SELECT key, size FROM plans ORDER BY last_access ASC").fetchall():
+            if count <= self.max_disk_entries and size <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM plans WHERE key = ?", (key,))
+            self._memory.pop(key, None)
+            count -= 1
+            size -= row_size
+            self.stats["evictions"] += 1
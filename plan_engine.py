@@ -0,0 +1,824 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Callable, Optional
+
+from crisis_lexicon import detect_crisis
+from lazy_imports import available, load, optional_attr
+from llm_scheduler import allm_call, llm_call
+from model_routing import ModelRoute
+from risk_model import LIGHT_MODEL, assess_text
+from token_budget import TokenBudget, log_turn, message_tokens
+
+
+_SWARM_NAMES = ("SwarmAgent", "SwarmResult", "initiate_swarm_chat", "OpenAIWrapper", "AFTER_WORK", "UPDATE_SYSTEM_MESSAGE")
+
+
+@lru_cache(maxsize=1)
+def swarm_api() -> Optional[SimpleNamespace]:
+    """AG2/AutoGen swarm classes, imported on first use; None when AutoGen is not installed.
+
+    AutoGen and its OpenAI dependency take most of a second to import, so
+    nothing here runs until a swarm plan is actually requested.
+    """
+    if not available("autogen"):
+        return None
+    # Preferred agentchat namespace (newer versions), then the legacy top-level one
+    for module in ("autogen.agentchat", "autogen"):
+        try:
+            found = load(module)
+            return SimpleNamespace(**{name: getattr(found, name) for name in _SWARM_NAMES})
+        except (ImportError, AttributeError):
+            continue
+    return None
+
+
+def async_available() -> bool:
+    """Whether the parallel mode can run, checked without importing ``openai``."""
+    return available("openai")
+
+
+SECTION_KEYS = ("assessment", "action", "followup")
+
+# LLM calls one plan makes, charged against the per-key rate limit
+LLM_CALLS_PER_PLAN = {"fallback": 1, "async": 6, "swarm": 6}
+
+SYSTEM_MESSAGES = {
+    "assessment_agent": """
+    You are an experienced mental health professional speaking directly to the user. Your task is to:
+    1. Create a safe space by acknowledging their courage in seeking support
+    2. Analyze their emotional state with clinical precision and genuine empathy
+    3. Ask targeted follow-up questions to understand their full situation
+    4. Identify patterns in their thoughts, behaviors, and relationships
+    5. Assess risk levels with validated screening approaches
+    6. Help them understand their current mental health in accessible language
+    7. Validate their experiences without minimizing or catastrophizing
+
+    Always use "you" and "your" when addressing the user. Blend clinical expertise with genuine warmth and never rush to conclusions.
+    """,
+
+    "action_agent": """
+    You are a crisis intervention and resource specialist speaking directly to the user. Your task is to:
+    1. Provide immediate evidence-based coping strategies tailored to their specific situation
+    2. Prioritize interventions based on urgency and effectiveness
+    3. Connect them with appropriate mental health services while acknowledging barriers (cost, access, stigma)
+    4. Create a concrete daily wellness plan with specific times and activities
+    5. Suggest specific support communities with details on how to join
+    6. Balance crisis resources with empowerment techniques
+    7. Teach simple self-regulation techniques they can use immediately
+
+    Focus on practical, achievable steps that respect their current capacity and energy levels. Provide options ranging from minimal effort to more involved actions.
+    """,
+
+    "followup_agent": """
+    You are a mental health recovery planner speaking directly to the user. Your task is to:
+    1. Design a personalized long-term support strategy with milestone markers
+    2. Create a progress monitoring system that matches their preferences and habits
+    3. Develop specific relapse prevention strategies based on their unique triggers
+    4. Establish a support network mapping exercise to identify existing resources
+    5. Build a graduated self-care routine that evolves with their recovery
+    6. Plan for setbacks with self-compassion techniques
+    7. Set up a maintenance schedule with clear check-in mechanisms
+
+    Focus on building sustainable habits that integrate with their lifestyle and values. Emphasize progress over perfection and teach skills for self-directed care.
+    """
+}
+
+FALLBACK_SYSTEM_MESSAGE = "You are a helpful, empathetic mental health assistant."
+FALLBACK_TEMPERATURE = 0.7
+# Ask the single-call fallback for JSON sections (strict schema) rather than Markdown headings
+STRUCTURED_OUTPUT = os.environ.get("SEHATSATHI_STRUCTURED_OUTPUT", "1").strip() != "0"
+
+# Minimum seconds between live UI refreshes while tokens stream in
+STREAM_REFRESH_SECONDS = 0.08
+
+
+def empty_output() -> dict:
+    return {key: '' for key in SECTION_KEYS}
+
+
+def build_task(mental_state, sleep_pattern, stress_level, support_system, recent_changes, current_symptoms) -> str:
+    return f"""
+                Create a comprehensive mental health support plan based on:
+
+                Emotional State: {mental_state}
+                Sleep: {sleep_pattern} hours per night
+                Stress Level: {stress_level}/10
+                Support System: {', '.join(support_system) if support_system else 'None reported'}
+                Recent Changes: {recent_changes}
+                Current Symptoms: {', '.join(current_symptoms) if current_symptoms else 'None reported'}
+                """
+
+
+def plan_run_mode(parallel: bool = False) -> str:
+    """``async`` when asked for, else the swarm when AutoGen is installed, else the single-call fallback."""
+    return "async" if parallel else "swarm" if swarm_api() is not None else "fallback"
+
+
+def light_route(route: ModelRoute, mental_state: str, recent_changes: str, current_symptoms) -> tuple:
+    """``(route, note)``: low-signal, non-crisis intakes go to :data:`risk_model.LIGHT_MODEL`."""
+    if detect_crisis(mental_state) or detect_crisis(recent_changes):
+        return route, ""
+    if not assess_text(mental_state, recent_changes, ", ".join(current_symptoms or [])).low_signal:
+        return route, ""
+    light = ModelRoute.uniform(LIGHT_MODEL)
+    if light == route:
+        return route, ""
+    return light, f"Low-risk request: plan written by {LIGHT_MODEL}"
+
+
+# Heading each section starts with: "## <title> Design"
+SECTION_TITLES = {"assessment": "Assessment", "action": "Action", "followup": "Followup"}
+_COUNT_WORDS = {1: "one section", 2: "two sections", 3: "three sections"}
+
+
+def build_fallback_prompt(task: str, keys: tuple = SECTION_KEYS) -> str:
+    headings = "\n".join(f"{n}) ## {SECTION_TITLES[key]} Design" for n, key in enumerate(keys, 1))
+    return f"""
+You are a supportive mental health assistant. Based on the user's details, produce {_COUNT_WORDS[len(keys)]}:
+{headings}
+Keep responses empathetic, practical, and safe.
+
+Details:
+{task}
+"""
+
+
+def build_structured_prompt(task: str, keys: tuple = SECTION_KEYS) -> str:
+    fields = ", ".join(f'"{key}" (## {SECTION_TITLES[key]} Design)' for key in keys)
+    return f"""
+You are a supportive mental health assistant. Based on the user's details, reply with a JSON object with the fields {fields}.
+Each field holds that section in Markdown, starting with its heading.
+Keep responses empathetic, practical, and safe.
+
+Details:
+{task}
+"""
+
+
+def plan_response_format(keys: tuple = SECTION_KEYS) -> dict:
+    """``response_format`` asking for exactly ``keys`` as Markdown strings (JSON schema, strict)."""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "support_plan",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    key: {"type": "string", "description": f"Markdown starting with '## {SECTION_TITLES[key]} Design'"}
+                    for key in keys
+                },
+                "required": list(keys),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def fallback_messages(task: str, structured: bool = False, keys: tuple = SECTION_KEYS) -> list:
+    """Chat messages of the single-call plan, shared by the live fallback and batch submissions."""
+    prompt = build_structured_prompt(task, keys) if structured else build_fallback_prompt(task, keys)
+    return [
+        {"role": "system", "content": FALLBACK_SYSTEM_MESSAGE},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def agent_system_prompt(agent_name: str, context_variables: dict, final: bool,
+                        budget: Optional[TokenBudget] = None) -> str:
+    """System prompt for one agent turn: the overview tool call, or the final write-up.
+
+    With a ``budget`` the context summaries are shortened/dropped to fit it.
+    """
+    system_prompt = SYSTEM_MESSAGES[agent_name]
+    current_gen = agent_name.split("_")[0]
+
+    if not final:
+        system_prompt += f"Call the update function provided to first provide a 2-3 sentence summary of your ideas on {current_gen.upper()} based on the context provided."
+    else:
+        system_prompt += f"\n\nYour task\nYou task is write the {current_gen} part of the report. Do not include any other parts. Do not use XML tags.\nStart your reponse with: '## {current_gen.capitalize()} Design'."
+
+    if budget is not None:
+        context_variables = budget.fit_context(context_variables, current=current_gen)
+    system_prompt += f"\n\n\nBelow are some context for you to refer to:"
+    for k, v in context_variables.items():
+        if v is not None:
+            system_prompt += f"\n{k.capitalize()} Summary:\n{v}"
+    return system_prompt
+
+
+def extract(section_title: str, text: str) -> str:
+    pattern = rf"##\s*{section_title}.*?(?=(\n##|\Z))"
+    m = re.search(pattern, text, flags=re.IGNORECASE | re.DOTALL)
+    return m.group(0) if m else ""
+
+
+def split_sections(text: str) -> dict:
+    # Split naive by section headers for display
+    return {
+        'assessment': extract('Assessment', text),
+        'action': extract('Action', text),
+        'followup': extract('Followup', text),
+    }
+
+
+def _json_string_prefix(raw: str) -> str:
+    """Decoded JSON string body up to its closing quote, or as much as has arrived."""
+    i = 0
+    while i < len(raw) and raw[i] != '"':
+        i += 2 if raw[i] == "\\" else 1
+    body = raw[:min(i, len(raw))]
+    # Drop a trailing escape cut off mid-way ("\\", "\\u00")
+    for cut in range(0, 6):
+        try:
+            return json.loads(f'"{body[:len(body) - cut]}"')
+        except ValueError:
+            continue
+    return ""
+
+
+_JSON_FIELD = re.compile(r'"(' + "|".join(SECTION_KEYS) + r')"\s*:\s*"')
+
+
+def parse_plan_json(text: str, keys: tuple = SECTION_KEYS) -> dict:
+    """Sections from a structured reply, one parse for all three.
+
+    Fields that are missing, blank or not strings come back empty so the caller
+    can re-request just those. An incomplete object (still streaming, or cut off
+    at the length limit) yields the fields received so far.
+    """
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = {m.group(1): _json_string_prefix(text[m.end():]) for m in _JSON_FIELD.finditer(text)}
+    if not isinstance(data, dict):
+        data = {}
+    sections = {}
+    for key in keys:
+        value = data.get(key)
+        value = value.strip() if isinstance(value, str) else ""
+        heading = f"## {SECTION_TITLES[key]} Design"
+        # Add the heading when the model left it out (but not to a heading still streaming in)
+        if value and not re.match(rf"##\s*{SECTION_TITLES[key]}", value, flags=re.IGNORECASE) \
+                and not heading.lower().startswith(value.lower()):
+            value = f"{heading}\n\n{value}"
+        sections[key] = value
+    return sections
+
+
+def missing_sections(output: Optional[dict]) -> list:
+    return [key for key in SECTION_KEYS if not (output or {}).get(key, "").strip()]
+
+
+@dataclass
+class PlanMetrics:
+    """Wall-clock timings for one plan generation (seconds, perf_counter based)."""
+    mode: str = ""
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    stages: dict = field(default_factory=dict)
+    turns: list = field(default_factory=list)
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        self.stages[name] = seconds
+
+    def record_turn(self, agent: str, stage: str, prompt_tokens: int, completion_tokens: int,
+                    model: str = "", seconds: Optional[float] = None) -> None:
+        self.turns.append(log_turn(agent, stage, prompt_tokens, completion_tokens, model, seconds))
+
+    def stage_usage(self) -> list:
+        """Turns rolled up per (stage, model): count, summed latency and tokens."""
+        rows = {}
+        for turn in self.turns:
+            row = rows.setdefault((turn["stage"], turn.get("model", "")), {
+                "stage": turn["stage"], "model": turn.get("model", ""), "turns": 0,
+                "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0,
+            })
+            row["turns"] += 1
+            row["seconds"] = round(row["seconds"] + (turn.get("seconds") or 0.0), 3)
+            row["prompt_tokens"] += turn["prompt_tokens"]
+            row["completion_tokens"] += turn["completion_tokens"]
+        return list(rows.values())
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(t["prompt_tokens"] for t in self.turns)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(t["completion_tokens"] for t in self.turns)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def total(self) -> Optional[float]:
+        return None if self.finished is None else self.finished - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "mode": self.mode, "ttft_s": self.ttft, "total_s": self.total, "stages": dict(self.stages),
+            "turns": list(self.turns), "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "stage_usage": self.stage_usage(),
+        }
+
+
+SectionCallback = Callable[[str, str], None]
+
+
+def _noop(_key: str, _text: str) -> None:
+    return None
+
+
+def _fallback_call(client, model: str, task: str, keys: tuple, structured: bool, on_section: SectionCallback,
+                   stream: bool, metrics: PlanMetrics, stage: str) -> dict:
+    """One chat completion writing the sections in ``keys``; returns them (blank when not delivered)."""
+    messages = fallback_messages(task, structured, keys)
+    kwargs = {"response_format": plan_response_format(keys)} if structured else {}
+    parse = (lambda text: parse_plan_json(text, keys)) if structured else split_sections
+    budget = TokenBudget(model=model)
+    prompt_tokens = sum(message_tokens(m, model) for m in messages)
+    started = time.perf_counter()
+    if not stream:
+        completion = llm_call(lambda: client.chat.completions.create(
+            model=model, messages=messages, temperature=FALLBACK_TEMPERATURE, **kwargs))
+        content = completion.choices[0].message.content or ""
+        metrics.mark_first_token()
+        usage = getattr(completion, "usage", None)
+        metrics.record_turn(
+            "fallback", stage,
+            getattr(usage, "prompt_tokens", None) or prompt_tokens,
+            getattr(usage, "completion_tokens", None) or budget.count(content),
+            model, time.perf_counter() - started,
+        )
+        sections = parse(content)
+        for key in keys:
+            on_section(key, sections[key])
+        return {key: sections[key] for key in keys}
+
+    chunks = []
+    last_refresh = 0.0
+    shown = {key: "" for key in keys}
+
+    def _refresh() -> None:
+        current = parse("".join(chunks))
+        for key in keys:
+            if current[key] != shown[key]:
+                shown[key] = current[key]
+                on_section(key, current[key])
+
+    response = llm_call(lambda: client.chat.completions.create(
+        model=model, messages=messages, temperature=FALLBACK_TEMPERATURE, stream=True, **kwargs))
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        metrics.mark_first_token()
+        chunks.append(delta)
+        now = time.perf_counter()
+        if now - last_refresh >= STREAM_REFRESH_SECONDS:
+            last_refresh = now
+            _refresh()
+    _refresh()
+    metrics.record_turn("fallback", stage, prompt_tokens, budget.count("".join(chunks)),
+                        model, time.perf_counter() - started)
+    return shown
+
+
+def run_fallback_plan(client, model: str, task: str, on_section: SectionCallback = _noop,
+                      stream: bool = True, metrics: Optional[PlanMetrics] = None, structured: bool = False,
+                      repair_rounds: int = 1) -> dict:
+    """Single chat completion producing all three sections.
+
+    With ``stream=True`` the sections are re-split as tokens arrive and pushed to
+    ``on_section(key, text)`` so the UI can fill the expanders live.
+    ``structured`` asks for a JSON object with the three sections (strict JSON
+    schema) instead of Markdown split on its headings. Sections that come back
+    missing or blank are re-requested on their own, up to ``repair_rounds``
+    extra calls, instead of regenerating the whole plan.
+    """
+    metrics = metrics or PlanMetrics(mode="fallback")
+    output = _fallback_call(client, model, task, SECTION_KEYS, structured, on_section, stream, metrics, "plan")
+    for _ in range(repair_rounds):
+        missing = tuple(missing_sections(output))
+        if not missing:
+            break
+        output.update(_fallback_call(client, model, task, missing, structured, on_section, stream, metrics, "repair"))
+    metrics.finish()
+    return output
+
+
+def run_swarm_plan(api_key: str, model: str, task: str, on_summary: SectionCallback = _noop,
+                   on_section: SectionCallback = _noop, metrics: Optional[PlanMetrics] = None,
+                   clients=None, budget: Optional[TokenBudget] = None,
+                   route: Optional[ModelRoute] = None) -> Optional[dict]:
+    """Assessment -> Action -> Follow-up swarm.
+
+    ``on_summary`` receives each 2-3 sentence overview as the tool call lands and
+    ``on_section`` each ``## ... Design`` write-up as the agent sends it.
+    ``clients`` is an optional :class:`llm_clients.ClientRegistry`; with it the
+    per-turn ``OpenAIWrapper`` is reused instead of rebuilt on every reply.
+    ``budget`` caps each turn's system context and history (default
+    :class:`token_budget.TokenBudget` settings); token counts per turn land in
+    ``metrics.turns``. ``route`` picks the model per turn: ``route.summary``
+    for the forced overview tool calls, ``route.section`` for the write-ups
+    (default: ``model`` for both).
+    Each write-up is taken from the agent that sent it; a section the swarm
+    did not deliver is written once more on its own from the shared summaries
+    (:func:`write_section`) instead of rerunning the swarm. Returns ``None``
+    when a section is still missing after that.
+    """
+    api = swarm_api()
+    if api is None:
+        raise ImportError("AutoGen is not installed. Please install 'pyautogen'.")
+    SwarmAgent, SwarmResult, OpenAIWrapper = api.SwarmAgent, api.SwarmResult, api.OpenAIWrapper
+    metrics = metrics or PlanMetrics(mode="swarm")
+    budget = budget or TokenBudget(model=model)
+    route = route or ModelRoute.uniform(model)
+    # agent name -> (prompt tokens, model, start time) of the reply being generated
+    pending_turns = {}
+    written = {}
+    if clients is not None:
+        llm_config = clients.llm_config(api_key, model)
+    else:
+        llm_config = {
+            "config_list": [{"model": model, "api_key": api_key}]
+        }
+
+    context_variables = {
+        "assessment": None,
+        "action": None,
+        "followup": None,
+    }
+
+    def update_assessment_overview(assessment_summary: str, context_variables: dict) -> SwarmResult:
+        context_variables["assessment"] = assessment_summary
+        metrics.mark_first_token()
+        on_summary("assessment", assessment_summary)
+        return SwarmResult(agent="action_agent", context_variables=context_variables)
+
+    def update_action_overview(action_summary: str, context_variables: dict) -> SwarmResult:
+        context_variables["action"] = action_summary
+        metrics.mark_first_token()
+        on_summary("action", action_summary)
+        return SwarmResult(agent="followup_agent", context_variables=context_variables)
+
+    def update_followup_overview(followup_summary: str, context_variables: dict) -> SwarmResult:
+        context_variables["followup"] = followup_summary
+        metrics.mark_first_token()
+        on_summary("followup", followup_summary)
+        return SwarmResult(agent="assessment_agent", context_variables=context_variables)
+
+    def update_system_message_func(agent: SwarmAgent, messages) -> str:
+        current_gen = agent.name.split("_")[0]
+        final = agent._context_variables.get(current_gen) is not None
+
+        if not final:
+            agent.llm_config['tool_choice'] = {"type": "function", "function": {"name": f"update_{current_gen}_overview"}}
+        else:
+            agent.llm_config["tools"] = None
+            agent.llm_config['tool_choice'] = None
+
+        stage_model = route.section if final else route.summary
+        agent.llm_config["config_list"] = [dict(c, model=stage_model) for c in agent.llm_config["config_list"]]
+
+        system_prompt = agent_system_prompt(agent.name, agent._context_variables, final, budget)
+        if agent._oai_messages:
+            k = list(agent._oai_messages.keys())[-1]
+            if final:
+                agent._oai_messages[k] = agent._oai_messages[k][:1]
+            else:
+                agent._oai_messages[k] = budget.trim_messages(agent._oai_messages[k], reserved=budget.count(system_prompt))
+            prompt_tokens = budget.prompt_tokens(system_prompt, agent._oai_messages[k])
+        else:
+            prompt_tokens = budget.prompt_tokens(system_prompt, messages or [])
+        pending_turns[agent.name] = (prompt_tokens, stage_model, time.perf_counter())
+
+        if clients is not None:
+            agent.client = clients.wrapper(OpenAIWrapper, agent.llm_config)
+        else:
+            agent.client = OpenAIWrapper(**agent.llm_config)
+        return system_prompt
+
+    def emit_section(sender, message, recipient, silent):
+        # Hook on outgoing messages: forward each final write-up as soon as it is sent
+        content = message.get("content") if isinstance(message, dict) else message
+        is_section = isinstance(content, str) and content.lstrip().startswith("##")
+        if sender.name in pending_turns:
+            prompt_tokens, stage_model, started = pending_turns.pop(sender.name)
+            metrics.record_turn(
+                sender.name, "section" if is_section else "summary",
+                prompt_tokens, message_tokens(message, stage_model), stage_model, time.perf_counter() - started,
+            )
+        if is_section:
+            metrics.mark_first_token()
+            written[sender.name.split("_")[0]] = content
+            on_section(sender.name.split("_")[0], content)
+        return message
+
+    state_update = api.UPDATE_SYSTEM_MESSAGE(update_system_message_func)
+    assessment_agent = SwarmAgent(
+        "assessment_agent",
+        llm_config=llm_config,
+        functions=update_assessment_overview,
+        update_agent_state_before_reply=[state_update]
+    )
+
+    action_agent = SwarmAgent(
+        "action_agent",
+        llm_config=llm_config,
+        functions=update_action_overview,
+        update_agent_state_before_reply=[state_update]
+    )
+
+    followup_agent = SwarmAgent(
+        "followup_agent",
+        llm_config=llm_config,
+        functions=update_followup_overview,
+        update_agent_state_before_reply=[state_update]
+    )
+
+    assessment_agent.register_hand_off(api.AFTER_WORK(action_agent))
+    action_agent.register_hand_off(api.AFTER_WORK(followup_agent))
+    followup_agent.register_hand_off(api.AFTER_WORK(assessment_agent))
+
+    for agent in (assessment_agent, action_agent, followup_agent):
+        agent.register_hook("process_message_before_send", emit_section)
+
+    result, final_context, _ = api.initiate_swarm_chat(
+        initial_agent=assessment_agent,
+        agents=[assessment_agent, action_agent, followup_agent],
+        user_agent=None,
+        messages=task,
+        max_rounds=13,
+    )
+
+    output = {key: written.get(key, "") for key in SECTION_KEYS}
+    # Sections the hook missed: any message that starts with the section's heading
+    for message in getattr(result, "chat_history", None) or []:
+        content = message.get("content") if isinstance(message, dict) else None
+        for key, title in SECTION_TITLES.items():
+            if not output[key] and isinstance(content, str) and re.match(rf"\s*##\s*{title}", content, re.IGNORECASE):
+                output[key] = content
+    missing = missing_sections(output)
+    if missing:
+        # AutoGen depends on openai, so a plain client is always available here
+        client = clients.openai(api_key, route.section) if clients is not None else load("openai").OpenAI(api_key=api_key)
+        summaries = final_context if isinstance(final_context, dict) else context_variables
+        for key in missing:
+            output[key] = write_section(client, route.section, task, key, summaries, budget, metrics, on_section,
+                                        stage="repair")
+    metrics.finish()
+    return None if missing_sections(output) else output
+
+
+def write_section(client, model: str, task: str, gen: str, context_variables: dict,
+                  budget: Optional[TokenBudget] = None, metrics: Optional[PlanMetrics] = None,
+                  on_section: SectionCallback = _noop, stage: str = "section") -> str:
+    """One ``## <Gen> Design`` write-up from the summaries in ``context_variables``, as ``<gen>_agent`` writes it."""
+    metrics = metrics or PlanMetrics(mode="section")
+    budget = budget or TokenBudget(model=model)
+    started = time.perf_counter()
+    messages = [
+        {"role": "system", "content": agent_system_prompt(f"{gen}_agent", context_variables, final=True, budget=budget)},
+        {"role": "user", "content": task},
+    ]
+    completion = llm_call(lambda: client.chat.completions.create(model=model, messages=messages))
+    text = completion.choices[0].message.content or ""
+    metrics.mark_first_token()
+    on_section(gen, text)
+    usage = getattr(completion, "usage", None)
+    metrics.record_turn(
+        f"{gen}_agent", stage,
+        getattr(usage, "prompt_tokens", None) or sum(message_tokens(m, model) for m in messages),
+        getattr(usage, "completion_tokens", None) or budget.count(text),
+        model, time.perf_counter() - started,
+    )
+    return text
+
+
+def _overview_tool(gen: str) -> dict:
+    # Same shape AutoGen derives from the update_*_overview functions
+    return {
+        "type": "function",
+        "function": {
+            "name": f"update_{gen}_overview",
+            "description": f"Record a 2-3 sentence {gen} summary.",
+            "parameters": {
+                "type": "object",
+                "properties": {f"{gen}_summary": {"type": "string"}},
+                "required": [f"{gen}_summary"],
+            },
+        },
+    }
+
+
+async def _async_summary(client, model: str, task: str, gen: str, context_variables: dict,
+                         budget: TokenBudget, metrics: PlanMetrics) -> str:
+    started = time.perf_counter()
+    tool = _overview_tool(gen)
+    messages = [
+        {"role": "system", "content": agent_system_prompt(f"{gen}_agent", context_variables, final=False, budget=budget)},
+        {"role": "user", "content": task},
+    ]
+    completion = await allm_call(lambda: client.chat.completions.create(
+        model=model,
+        messages=messages,
+        tools=[tool],
+        tool_choice={"type": "function", "function": {"name": tool["function"]["name"]}},
+    ))
+    message = completion.choices[0].message
+    summary = message.content or ""
+    for call in message.tool_calls or []:
+        try:
+            summary = json.loads(call.function.arguments)[f"{gen}_summary"]
+            break
+        except (ValueError, KeyError, TypeError):
+            continue
+    usage = getattr(completion, "usage", None)
+    metrics.record_turn(
+        f"{gen}_agent", "summary",
+        getattr(usage, "prompt_tokens", None) or sum(message_tokens(m, model) for m in messages),
+        getattr(usage, "completion_tokens", None) or budget.count(summary),
+        model, time.perf_counter() - started,
+    )
+    return summary
+
+
+async def _async_section(client, model: str, task: str, gen: str, context_variables: dict,
+                         on_section: SectionCallback, stream: bool, metrics: PlanMetrics,
+                         budget: TokenBudget) -> str:
+    started = time.perf_counter()
+    messages = [
+        {"role": "system", "content": agent_system_prompt(f"{gen}_agent", context_variables, final=True, budget=budget)},
+        {"role": "user", "content": task},
+    ]
+    if not stream:
+        completion = await allm_call(lambda: client.chat.completions.create(model=model, messages=messages))
+        text = completion.choices[0].message.content or ""
+        metrics.mark_first_token()
+        on_section(gen, text)
+    else:
+        chunks = []
+        last_refresh = 0.0
+        response = await allm_call(lambda: client.chat.completions.create(model=model, messages=messages, stream=True))
+        async for chunk in response:
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            metrics.mark_first_token()
+            chunks.append(chunk.choices[0].delta.content)
+            now = time.perf_counter()
+            if now - last_refresh >= STREAM_REFRESH_SECONDS:
+                last_refresh = now
+                on_section(gen, "".join(chunks))
+        text = "".join(chunks)
+        on_section(gen, text)
+    metrics.record_turn(f"{gen}_agent", "section", sum(message_tokens(m, model) for m in messages), budget.count(text),
+                        model, time.perf_counter() - started)
+    metrics.record_stage(f"section:{gen}", time.perf_counter() - started)
+    return text
+
+
+async def run_async_plan(client, model: str, task: str, on_summary: SectionCallback = _noop,
+                         on_section: SectionCallback = _noop, stream: bool = True,
+                         metrics: Optional[PlanMetrics] = None, budget: Optional[TokenBudget] = None,
+                         route: Optional[ModelRoute] = None) -> dict:
+    """Summaries first, then the three ``## ... Design`` write-ups concurrently.
+
+    The summaries run in swarm order because each one sees the earlier ones, the
+    same context the swarm shares. The long sections only need those summaries,
+    so they are gathered in parallel on an ``AsyncOpenAI`` client. ``route``
+    picks the summary and section models (default: ``model`` for both).
+    """
+    metrics = metrics or PlanMetrics(mode="async")
+    budget = budget or TokenBudget(model=model)
+    route = route or ModelRoute.uniform(model)
+    context_variables = {key: None for key in SECTION_KEYS}
+
+    summaries_started = time.perf_counter()
+    for gen in SECTION_KEYS:
+        started = time.perf_counter()
+        context_variables[gen] = await _async_summary(client, route.summary, task, gen, context_variables, budget, metrics)
+        metrics.record_stage(f"summary:{gen}", time.perf_counter() - started)
+        metrics.mark_first_token()
+        on_summary(gen, context_variables[gen])
+    metrics.record_stage("summaries", time.perf_counter() - summaries_started)
+
+    sections_started = time.perf_counter()
+    texts = await asyncio.gather(*(
+        _async_section(client, route.section, task, gen, context_variables, on_section, stream, metrics, budget)
+        for gen in SECTION_KEYS
+    ))
+    output = dict(zip(SECTION_KEYS, texts))
+    # A blank write-up is requested once more on its own, not the whole plan
+    missing = missing_sections(output)
+    if missing:
+        retried = await asyncio.gather(*(
+            _async_section(client, route.section, task, gen, context_variables, on_section, stream, metrics, budget)
+            for gen in missing
+        ))
+        output.update(zip(missing, retried))
+    metrics.record_stage("sections", time.perf_counter() - sections_started)
+    metrics.finish()
+    return output
+
+
+def generate_plan(run_mode: str, api_key: str, route: ModelRoute, task: str, clients,
+                  on_summary: SectionCallback = _noop, on_section: SectionCallback = _noop, stream: bool = True,
+                  metrics: Optional[PlanMetrics] = None, budget: Optional[TokenBudget] = None,
+                  structured: bool = STRUCTURED_OUTPUT) -> dict:
+    """One plan in ``run_mode`` (see :func:`plan_run_mode`); the work behind "Get Support Plan" and batch runs.
+
+    ``clients`` is the :class:`llm_clients.ClientRegistry` to draw clients from;
+    ``structured`` applies to the fallback (see :func:`run_fallback_plan`).
+    Raises ``ValueError`` when the swarm does not end in the three sections.
+    """
+    if run_mode == "async":
+        return run_async_plan_blocking(
+            api_key, route.section, task,
+            clients=clients,
+            on_summary=on_summary,
+            on_section=on_section,
+            stream=stream,
+            metrics=metrics,
+            budget=budget,
+            route=route,
+        )
+    if run_mode == "swarm":
+        output = run_swarm_plan(
+            api_key, route.section, task,
+            on_summary=on_summary,
+            on_section=on_section,
+            metrics=metrics,
+            clients=clients,
+            budget=budget,
+            route=route,
+        )
+        if output is None:
+            raise ValueError("Unexpected swarm response format.")
+        return output
+    return run_fallback_plan(
+        clients.openai(api_key, route.fallback), route.fallback, task,
+        on_section=on_section,
+        stream=stream,
+        metrics=metrics,
+        structured=structured,
+    )
+
+
+def regenerate_section(run_mode: str, api_key: str, route: ModelRoute, task: str, key: str, clients,
+                       summaries: Optional[dict] = None, on_section: SectionCallback = _noop, stream: bool = True,
+                       metrics: Optional[PlanMetrics] = None, budget: Optional[TokenBudget] = None,
+                       structured: bool = STRUCTURED_OUTPUT) -> str:
+    """Write one section of an existing plan again, leaving the other two as they are.
+
+    Swarm and async plans rerun only ``<key>_agent``'s write-up with the plan's
+    ``summaries`` as context (:func:`write_section`): one call instead of the
+    summary rounds and all three write-ups. Fallback plans, and plans without
+    all three summaries (cache hits), ask the single-call prompt for that
+    section alone.
+    """
+    metrics = metrics or PlanMetrics(mode="section")
+    summaries = summaries or {}
+    if run_mode in ("swarm", "async") and all(summaries.get(gen) for gen in SECTION_KEYS):
+        context_variables = {gen: summaries[gen] for gen in SECTION_KEYS}
+        text = write_section(clients.openai(api_key, route.section), route.section, task, key, context_variables,
+                             budget, metrics, on_section)
+    else:
+        text = _fallback_call(clients.openai(api_key, route.fallback), route.fallback, task, (key,), structured,
+                              on_section, stream, metrics, "section")[key]
+    metrics.finish()
+    return text
+
+
+def run_async_plan_blocking(api_key: str, model: str, task: str, clients=None, **kwargs) -> dict:
+    """Run :func:`run_async_plan` to completion from synchronous code (the Streamlit script thread)."""
+    AsyncOpenAI = optional_attr("openai", "AsyncOpenAI")
+    if clients is None and AsyncOpenAI is None:
+        raise ImportError("OpenAI client is not installed. Please install 'openai'.")
+
+    async def _main() -> dict:
+        client = clients.async_openai(api_key) if clients is not None else AsyncOpenAI(api_key=api_key)
+        async with client:
+            return await run_async_plan(client, model, task, **kwargs)
+
+    return asyncio.run(_main())
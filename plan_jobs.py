@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Hashable, Optional
+
+from llm_scheduler import RequestScheduler
+from model_routing import ModelRoute
+from wellbeing_store import DEFAULT_DATA_DIR
+
+JOB_STATES = ("queued", "running", "done", "failed")
+
+# Finished jobs older than this are dropped from disk when the store opens
+JOB_TTL_SECONDS = 7 * 24 * 3600
+
+INTERRUPTED_ERROR = "Interrupted: the server restarted before this plan finished. Please request it again."
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan_jobs (
+    job_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    updated REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS plan_jobs_user_updated ON plan_jobs(user_id, updated);
+"""
+
+
+@dataclass
+class PlanJob:
+    job_id: str
+    user_id: str
+    mode: str = ""
+    model: str = ""
+    task: str = ""
+    # Stage -> model the plan was written with (see :class:`model_routing.ModelRoute`)
+    route: dict = field(default_factory=dict)
+    status: str = "queued"
+    # Filled while the job runs, so a polling UI can show progress
+    summaries: dict = field(default_factory=dict)
+    sections: dict = field(default_factory=dict)
+    output: Optional[dict] = None
+    metrics: dict = field(default_factory=dict)
+    note: str = ""
+    error: str = ""
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def model_route(self) -> Optional[ModelRoute]:
+        return ModelRoute(**self.route) if self.route else None
+
+
+class JobStore:
+    """SQLite record of plan jobs; a finished job's plan is read back from here after a reload."""
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = JOB_TTL_SECONDS):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "plan_jobs.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._interrupt_unfinished()
+        self._conn.execute(
+            "DELETE FROM plan_jobs WHERE updated < ? AND status IN ('done', 'failed')", (time.time() - ttl_seconds,)
+        )
+        self._conn.commit()
+
+    def _interrupt_unfinished(self) -> None:
+        # Queued/running rows left by an earlier process: no worker will ever finish them
+        rows = self._conn.execute("SELECT payload FROM plan_jobs WHERE status IN ('queued', 'running')").fetchall()
+        for (payload,) in rows:
+            job = PlanJob(**json.loads(payload))
+            # ``updated`` is kept, so the TTL below still counts from the job's last progress
+            job.status, job.error = "failed", INTERRUPTED_ERROR
+            self.save(job)
+
+    def save(self, job: PlanJob) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plan_jobs (job_id, user_id, status, updated, payload) VALUES (?, ?, ?, ?, ?)",
+                (job.job_id, job.user_id, job.status, job.updated, json.dumps(asdict(job))),
+            )
+            self._conn.commit()
+
+    def load(self, job_id: str) -> Optional[PlanJob]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM plan_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return PlanJob(**json.loads(row[0])) if row else None
+
+    def delete_user(self, user_id: str) -> list:
+        """Delete every stored job of ``user_id`` and return them."""
+        with self._lock:
+            rows = self._conn.execute("SELECT payload FROM plan_jobs WHERE user_id = ?", (user_id,)).fetchall()
+            self._conn.execute("DELETE FROM plan_jobs WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+        return [PlanJob(**json.loads(payload)) for (payload,) in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class PlanJobRunner:
+    """Runs plan generations as background jobs on the request scheduler.
+
+    Live jobs are kept in memory and updated section by section by the worker;
+    every state change is written to the :class:`JobStore`, so the plan
+    survives a closed tab or a dropped websocket. A second request for a job
+    still in flight (same ``key``) attaches to it instead of starting another;
+    callers put the API key fingerprint in ``key`` so jobs are only shared
+    between requests billed to the same key. ``on_done`` receives the finished
+    plan (e.g. to cache it) unless the job was deleted in the meantime.
+    """
+
+    def __init__(self, scheduler: RequestScheduler, store: Optional[JobStore] = None):
+        self.scheduler = scheduler
+        self.store = store or JobStore()
+        self._live: dict = {}
+        self._by_key: dict = {}
+        # Live jobs deleted by their user: never saved again, whenever their worker returns
+        self._dropped: set = set()
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "shared": 0, "done": 0, "failed": 0}
+
+    def submit(self, user_id: str, api_key: str, work: Callable[[Callable, Callable], dict],
+               key: Optional[Hashable] = None, cost: float = 1.0, mode: str = "", model: str = "",
+               note: str = "", metrics=None, task: str = "", summaries: Optional[dict] = None,
+               sections: Optional[dict] = None, route: Optional[ModelRoute] = None,
+               on_done: Optional[Callable[[dict], None]] = None) -> PlanJob:
+        """Queue ``work(on_summary, on_section)``, which returns the finished plan sections.
+
+        ``summaries`` and ``sections`` seed the job's progress, e.g. the parts of
+        an earlier plan kept while one section is regenerated.
+        """
+        with self._lock:
+            if key is not None and key in self._by_key:
+                self.stats["shared"] += 1
+                return self._live[self._by_key[key]]
+            job = PlanJob(uuid.uuid4().hex, user_id, mode=mode, model=model, task=task, note=note,
+                          route=asdict(route) if route else {},
+                          summaries=dict(summaries or {}), sections=dict(sections or {}))
+            self._live[job.job_id] = job
+            if key is not None:
+                self._by_key[key] = job.job_id
+            self.stats["submitted"] += 1
+        self.store.save(job)
+
+        def on_summary(section: str, text: str) -> None:
+            job.summaries[section] = text
+            job.updated = time.time()
+
+        def on_section(section: str, text: str) -> None:
+            job.sections[section] = text
+            job.updated = time.time()
+
+        def execute():
+            if not self._transition(job, "running"):
+                return {}
+            return work(on_summary, on_section)
+
+        future, _shared = self.scheduler.schedule(api_key, execute, cost=cost)
+        future.add_done_callback(lambda f: self._finish(job, key, f, metrics, on_done))
+        return job
+
+    def complete(self, user_id: str, output: dict, mode: str = "", model: str = "", note: str = "",
+                 metrics: Optional[dict] = None, task: str = "", route: Optional[ModelRoute] = None) -> PlanJob:
+        """Record a plan that needed no generation (e.g. a cache hit) as a finished job."""
+        job = PlanJob(uuid.uuid4().hex, user_id, mode=mode, model=model, task=task, status="done",
+                      route=asdict(route) if route else {},
+                      output=dict(output), sections=dict(output), metrics=metrics or {}, note=note)
+        self.store.save(job)
+        return job
+
+    def _transition(self, job: PlanJob, status: str) -> bool:
+        """Record ``status``; False (and nothing saved) if the job was deleted."""
+        with self._lock:
+            if job.job_id in self._dropped:
+                return False
+            job.status = status
+            job.updated = time.time()
+            self.store.save(job)
+            return True
+
+    def _finish(self, job: PlanJob, key: Optional[Hashable], future, metrics, on_done) -> None:
+        error = future.exception()
+        if metrics is not None:
+            job.metrics = metrics.as_dict()
+        if error is None:
+            job.output = future.result()
+            job.sections = dict(job.output)
+        else:
+            job.error = str(error) or type(error).__name__
+        with self._lock:
+            if job.job_id in self._dropped:
+                self._dropped.discard(job.job_id)
+                return
+            if error is None and on_done is not None:
+                try:
+                    on_done(job.output)
+                except Exception:
+                    # A failed side write (e.g. the plan cache) must not lose the finished plan
+                    pass
+            # Persist before dropping from memory so a poll never misses the job
+            job.status = "done" if error is None else "failed"
+            job.updated = time.time()
+            self.store.save(job)
+            self._live.pop(job.job_id, None)
+            if key is not None and self._by_key.get(key) == job.job_id:
+                del self._by_key[key]
+            self.stats[job.status] += 1
+
+    def get(self, job_id: str) -> Optional[PlanJob]:
+        with self._lock:
+            job = self._live.get(job_id)
+        if job is not None:
+            return job
+        job = self.store.load(job_id)
+        if job is not None and not job.finished:
+            # Not live here and not finished: its worker is gone (e.g. another process that stopped)
+            job.status, job.error = "failed", INTERRUPTED_ERROR
+        return job
+
+    def delete_user(self, user_id: str) -> list:
+        """Delete every job of ``user_id``, live or stored, and return them.
+
+        Live jobs are dropped rather than interrupted: their worker skips the
+        LLM calls if it has not started, and whatever it returns is discarded.
+        """
+        with self._lock:
+            live = [job for job in self._live.values() if job.user_id == user_id]
+            for job in live:
+                self._dropped.add(job.job_id)
+                del self._live[job.job_id]
+            self._by_key = {k: job_id for k, job_id in self._by_key.items() if job_id not in self._dropped}
+            stored = self.store.delete_user(user_id)
+        live_ids = {job.job_id for job in live}
+        return live + [job for job in stored if job.job_id not in live_ids]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, live=len(self._live))
@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import csv
+import difflib
+import os
+import re
+import sqlite3
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from geo_index import Gazetteer, KDTree, haversine_km, km_to_chord, to_xyz
+
+DEFAULT_PROVIDERS_PATH = os.environ.get(
+    "SEHATSATHI_PROVIDERS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "providers.csv"),
+)
+
+# Columns every directory row is normalised to; "lang" may hold several values separated by ";".
+# Optional "lat"/"lon" columns place a provider on the map; without them it is geocoded from city/ZIP.
+FIELDS = ("name", "type", "city", "zip", "afford", "lang", "remote")
+INDEXED = ("city", "afford", "lang", "remote")
+
+# Providers listed with this city serve everyone (national/telehealth)
+ANY_CITY = "any"
+
+# Cap on nearest providers returned for one place search (paged 10 at a time in the UI)
+MAX_NEAREST = 200
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(value) -> str:
+    return _SPACES.sub(" ", str(value or "").strip()).casefold()
+
+
+@dataclass
+class SearchResult:
+    total: int
+    page: int
+    page_size: int
+    rows: list
+    matched_places: tuple = ()
+    # Set when the place resolved through the gazetteer; rows then carry "distance_km"
+    origin: Optional[tuple] = None
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.page_size))
+
+
+class ProviderDirectory:
+    """In-memory provider directory with inverted indexes for the resource search.
+
+    Each indexed field maps a normalised value to the set of row ids holding
+    it. City and ZIP keys are also kept sorted so a partial entry resolves by
+    prefix with ``bisect``; a misspelt city falls back to fuzzy matching over
+    the distinct city names, never over the rows.
+
+    With a gazetteer, providers that have coordinates go into a k-d tree and a
+    City/ZIP the gazetteer knows is answered by distance instead.
+    """
+
+    def __init__(self, rows: Iterable[dict], gazetteer: Optional[Gazetteer] = None):
+        self.gazetteer = gazetteer
+        self.coords: dict = {}
+        self.rows: list = []
+        self.index = {field: {} for field in INDEXED}
+        self.zips: dict = {}
+        for raw in rows:
+            row = {field: str(raw.get(field) or "").strip() for field in FIELDS}
+            if not row["name"]:
+                continue
+            rid = len(self.rows)
+            self.rows.append(row)
+            for field in INDEXED:
+                values = row[field].split(";") if field == "lang" else [row[field]]
+                for value in values:
+                    self.index[field].setdefault(normalize(value), set()).add(rid)
+            if row["zip"]:
+                self.zips.setdefault(normalize(row["zip"]), set()).add(rid)
+            point = self._locate(raw, row)
+            if point is not None:
+                self.coords[rid] = point
+        self.city_keys = sorted(k for k in self.index["city"] if k != ANY_CITY)
+        self.zip_keys = sorted(self.zips)
+        self.tree = self._tree(self.coords)
+        # One tree per (afford, lang, remote) combination, so filtered nearest
+        # searches only walk providers that already pass the filters
+        buckets: dict = {}
+        for rid in self.coords:
+            row = self.rows[rid]
+            for lang in row["lang"].split(";"):
+                key = (normalize(row["afford"]), normalize(lang), normalize(row["remote"]))
+                buckets.setdefault(key, []).append(rid)
+        self.trees = {key: self._tree({rid: self.coords[rid] for rid in ids}) for key, ids in buckets.items()}
+
+    @staticmethod
+    def _tree(coords: dict) -> KDTree:
+        return KDTree([to_xyz(*point) for point in coords.values()], list(coords))
+
+    def _locate(self, raw: dict, row: dict) -> Optional[tuple]:
+        try:
+            return float(raw["lat"]), float(raw["lon"])
+        except (KeyError, TypeError, ValueError):
+            pass
+        if self.gazetteer is None or normalize(row["city"]) == ANY_CITY:
+            return None
+        place = self.gazetteer.lookup(row["city"], fuzzy=False) or self.gazetteer.lookup(row["zip"], fuzzy=False)
+        return place[1:] if place else None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PROVIDERS_PATH, gazetteer: Optional[Gazetteer] = None) -> "ProviderDirectory":
+        """Load from ``.csv``, ``.parquet`` (needs pandas + pyarrow) or SQLite (table ``providers``)."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".csv":
+            with open(path, newline="", encoding="utf-8") as f:
+                return cls(csv.DictReader(f), gazetteer)
+        if ext == ".parquet":
+            import pandas as pd
+            return cls(pd.read_parquet(path).fillna("").to_dict("records"), gazetteer)
+        if ext in (".db", ".sqlite", ".sqlite3"):
+            conn = sqlite3.connect(path)
+            conn.row_factory = sqlite3.Row
+            try:
+                return cls((dict(r) for r in conn.execute("SELECT * FROM providers")), gazetteer)
+            finally:
+                conn.close()
+        raise ValueError(f"Unsupported provider directory format: {path}")
+
+    def _prefix(self, keys: list, postings: dict, prefix: str) -> tuple:
+        matched, ids = [], set()
+        for key in keys[bisect_left(keys, prefix):]:
+            if not key.startswith(prefix):
+                break
+            matched.append(key)
+            ids |= postings[key]
+        return matched, ids
+
+    def match_place(self, place: str) -> tuple:
+        """Row ids for a City/ZIP entry and the place keys it resolved to.
+
+        Exact city or ZIP first, then prefix, then the closest city spellings.
+        """
+        key = normalize(place)
+        if key.replace(" ", "").isdigit():
+            return self._prefix(self.zip_keys, self.zips, key.replace(" ", ""))
+        cities = self.index["city"]
+        if key in cities:
+            return [key], set(cities[key])
+        matched, ids = self._prefix(self.city_keys, cities, key)
+        if not matched:
+            matched = difflib.get_close_matches(key, self.city_keys, n=3, cutoff=0.75)
+            for city in matched:
+                ids |= cities[city]
+        return matched, ids
+
+    def _filters(self, afford: str, language: str, remote: str) -> list:
+        return [
+            self.index[field].get(normalize(value), set())
+            for field, value in (("afford", afford), ("lang", language), ("remote", remote))
+            if value != "Any"
+        ]
+
+    def nearest(self, lat: float, lon: float, radius_km: Optional[float] = None, afford: str = "Any",
+                language: str = "Any", remote: str = "Any", limit: int = MAX_NEAREST) -> list:
+        """``(distance_km, row id)`` for the closest providers passing the filters, nearest first."""
+        target = to_xyz(lat, lon)
+        max_dist = km_to_chord(radius_km) if radius_km else 2.0
+        wanted = [normalize(v) if v != "Any" else None for v in (afford, language, remote)]
+        if wanted == [None, None, None]:
+            hits = self.tree.nearest(target, limit, max_dist)
+        else:
+            merged = []
+            for key, tree in self.trees.items():
+                if all(w is None or w == k for w, k in zip(wanted, key)):
+                    merged.extend(tree.nearest(target, limit, max_dist))
+            # A provider with several languages sits in several trees
+            seen, hits = set(), []
+            for d, rid in sorted(merged):
+                if rid not in seen:
+                    seen.add(rid)
+                    hits.append((d, rid))
+            hits = hits[:limit]
+        return [(haversine_km(lat, lon, *self.coords[rid]), rid) for _d, rid in hits]
+
+    def search(self, city: str = "", afford: str = "Any", language: str = "Any", remote: str = "Any",
+               page: int = 0, page_size: int = 10, radius_km: Optional[float] = None) -> SearchResult:
+        place = self.gazetteer.lookup(city) if self.gazetteer is not None and normalize(city) else None
+        if place is not None and len(self.tree):
+            label, lat, lon = place
+            hits = self.nearest(lat, lon, radius_km, afford, language, remote)
+            # National/telehealth providers come after the local ones
+            anywhere = self.index["city"].get(ANY_CITY, set()).intersection(*self._filters(afford, language, remote))
+            ranked = hits + [(None, rid) for rid in sorted(anywhere)]
+            window = ranked[page * page_size:(page + 1) * page_size]
+            rows = [{**self.rows[rid], "distance_km": km} for km, rid in window]
+            return SearchResult(len(ranked), page, page_size, rows, (normalize(label),), (label, lat, lon))
+        postings, matched = [], ()
+        if normalize(city):
+            matched, ids = self.match_place(city)
+            postings.append(ids | self.index["city"].get(ANY_CITY, set()))
+        postings.extend(self._filters(afford, language, remote))
+        if postings:
+            # Intersect smallest-first so the work is bounded by the rarest filter
+            postings.sort(key=len)
+            ids = postings[0]
+            for other in postings[1:]:
+                ids = ids & other
+            ordered = sorted(ids)
+            total = len(ordered)
+            window = ordered[page * page_size:(page + 1) * page_size]
+        else:
+            total = len(self.rows)
+            window = range(page * page_size, min(total, (page + 1) * page_size))
+        return SearchResult(total, page, page_size, [self.rows[i] for i in window], tuple(matched))
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from crisis_lexicon import normalize_text, tokenize
+from lazy_imports import LazyModule
+
+# Loaded when the classifier is first trained, not when the app starts
+np = LazyModule("numpy")
+
+DEFAULT_SEED_PATH = os.environ.get(
+    "SEHATSATHI_TRIAGE_SEED",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "triage_seed.jsonl"),
+)
+
+RISK_LABELS = ("crisis", "self_harm", "depression", "anxiety", "sleep", "stress")
+URGENT_LABELS = ("crisis", "self_harm")
+
+# Score at which a label is reported as a triage flag. Calibrated on data/triage_holdout.jsonl
+# (bench/bench_risk_calibration.py): no benign held-out row is flagged at 0.45 or above; 0.5 keeps a margin
+RISK_THRESHOLD = 0.5
+# Below this on every label a request counts as low-signal
+LOW_SIGNAL_THRESHOLD = 0.3
+
+# Model used for low-signal plans when light routing is on
+LIGHT_MODEL = os.environ.get("SEHATSATHI_LIGHT_MODEL", "gpt-4.1-nano")
+
+
+# Dropped as unigrams only; bigrams such as "to die" still carry them
+STOPWORDS = frozenset(
+    "i me my myself a an the to and or of in on at for with is am are was be been it this that "
+    "so but just have has do dont want feel about all some".split()
+)
+
+
+def features(text: str) -> list:
+    """Stemmed word unigrams (minus stopwords) and bigrams, clause breaks respected."""
+    words = [t for t, _s, _e in tokenize(normalize_text(text or ""))]
+    grams = [w for w in words if w != "\x00" and w not in STOPWORDS]
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:]) if a != "\x00" and b != "\x00"]
+    return grams
+
+
+@dataclass
+class RiskAssessment:
+    scores: dict
+    seconds: float = 0.0
+    flagged: list = field(default_factory=list)
+
+    @property
+    def urgent(self) -> bool:
+        return any(self.scores.get(label, 0.0) >= RISK_THRESHOLD for label in URGENT_LABELS)
+
+    @property
+    def low_signal(self) -> bool:
+        return max(self.scores.values(), default=0.0) < LOW_SIGNAL_THRESHOLD
+
+    def top(self, n: int = 3) -> list:
+        return sorted(self.scores.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+class RiskClassifier:
+    """TF-IDF features with one-vs-rest logistic regression, trained in NumPy.
+
+    Small enough to train on load from the seed corpus (tens of milliseconds)
+    and to score a message in about a millisecond on CPU.
+    """
+
+    def __init__(self, labels: Iterable[str] = RISK_LABELS, l2: float = 1e-3, epochs: int = 400, lr: float = 2.0):
+        self.labels = tuple(labels)
+        self.l2 = l2
+        self.epochs = epochs
+        self.lr = lr
+        self.vocab: dict = {}
+        self.idf: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self.bias: Optional[np.ndarray] = None
+
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(len(self.vocab))
+        for gram, n in Counter(features(text)).items():
+            i = self.vocab.get(gram)
+            if i is not None:
+                vec[i] = (1 + math.log(n)) * self.idf[i]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def fit(self, texts: list, labels: list) -> "RiskClassifier":
+        docs = [set(features(t)) for t in texts]
+        df = Counter(g for d in docs for g in d)
+        self.vocab = {g: i for i, g in enumerate(sorted(df))}
+        self.idf = np.array([math.log((1 + len(docs)) / (1 + df[g])) + 1 for g in sorted(df)])
+        x = np.vstack([self._vector(t) for t in texts])
+        y = np.array([[label in ls for label in self.labels] for ls in labels], dtype=float)
+        w = np.zeros((x.shape[1], len(self.labels)))
+        b = np.zeros(len(self.labels))
+        # Each label is rare next to "everything else"; weight positives up (half-way to balanced)
+        pos = y.sum(axis=0).clip(min=1)
+        balance = np.where(y > 0, np.sqrt((len(y) - pos) / pos), 1.0)
+        # Full-batch gradient descent; the corpus is a few hundred rows
+        for _ in range(self.epochs):
+            p = 1 / (1 + np.exp(-(x @ w + b)))
+            grad = (p - y) * balance
+            w -= self.lr * (x.T @ grad / len(x) + self.l2 * w)
+            b -= self.lr * grad.mean(axis=0)
+        self.weights, self.bias = w, b
+        return self
+
+    @classmethod
+    def from_seed(cls, path: str = DEFAULT_SEED_PATH) -> "RiskClassifier":
+        texts, labels = [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    texts.append(row["text"])
+                    labels.append(row.get("labels") or [])
+        return cls().fit(texts, labels)
+
+    def scores(self, text: str) -> dict:
+        vec = self._vector(text)
+        if not vec.any():
+            # No known words: no evidence either way
+            return dict.fromkeys(self.labels, 0.0)
+        z = vec @ self.weights + self.bias
+        return {label: float(p) for label, p in zip(self.labels, 1 / (1 + np.exp(-z)))}
+
+    def assess(self, *texts: str) -> RiskAssessment:
+        started = time.perf_counter()
+        scores = self.scores("\n".join(t for t in texts if t))
+        flagged = [label for label, p in scores.items() if p >= RISK_THRESHOLD]
+        return RiskAssessment(scores, time.perf_counter() - started, flagged)
+
+
+@lru_cache(maxsize=1)
+def default_classifier() -> RiskClassifier:
+    return RiskClassifier.from_seed()
+
+
+def assess_text(*texts: str) -> RiskAssessment:
+    """Score with the default classifier; blank input is scored without training it."""
+    if not any(t and t.strip() for t in texts):
+        return RiskAssessment(dict.fromkeys(RISK_LABELS, 0.0))
+    return default_classifier().assess(*texts)
+
+
+def severity(lexicon_crisis: bool, assessment: RiskAssessment, rules_flagged: bool = False) -> str:
+    """Triage level: "high", "moderate" or "info".
+
+    Only the crisis lexicon makes it "high"; an urgent classifier score (crisis
+    or self-harm) raises it to at least "moderate", like the screening rules.
+    """
+    if lexicon_crisis:
+        return "high"
+    if rules_flagged or assessment.urgent:
+        return "moderate"
+    return "info"
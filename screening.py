@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterable, Mapping, Optional
+
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+
+FREQUENCY = ("Not at all", "Several days", "More than half the days", "Nearly every day")
+PSS_SCALE = ("Never", "Almost never", "Sometimes", "Fairly often", "Very often")
+ISI_SEVERITY = ("None", "Mild", "Moderate", "Severe", "Very severe")
+WHO5_SCALE = ("At no time", "Some of the time", "Less than half of the time", "More than half of the time",
+              "Most of the time", "All of the time")
+
+
+@dataclass(frozen=True)
+class Instrument:
+    """A questionnaire scored as the sum of integer-coded answers.
+
+    Answer code ``i`` means the ``i``-th option of the item. ``bands`` maps
+    the raw total to a label by upper bound: ``((4, "Minimal"), (9, "Mild"), ...)``.
+    """
+
+    key: str
+    name: str
+    title: str
+    items: tuple
+    options: tuple
+    bands: tuple
+    # Raw total at or above which the result counts as high / needing attention
+    flag_at: Optional[int] = None
+    # Items (0-based) scored as ``max code - code``
+    reverse: frozenset = frozenset()
+    # Per-item option labels where an item uses different anchors
+    item_options: Mapping = field(default_factory=dict)
+    # Reported total = raw total x scale (WHO-5 is reported as a percentage)
+    scale: int = 1
+    # Higher totals are better (flags fire at or below ``flag_at``)
+    higher_is_better: bool = False
+    # Code preselected in the form; None leaves items unanswered until chosen
+    default: Optional[int] = None
+    # Session-state keys of the item widgets: ``<key>_<item>``
+    keys: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "keys", tuple(f"{self.key}_{i}" for i in range(len(self.items))))
+
+    @property
+    def max_code(self) -> int:
+        return len(self.options) - 1
+
+    @property
+    def max_total(self) -> int:
+        return self.max_code * len(self.items)
+
+    def labels(self, item: int) -> tuple:
+        return self.item_options.get(item, self.options)
+
+    def option_label(self, item: int, code: int) -> str:
+        return f"{code} - {self.labels(item)[code]}"
+
+
+def _band_table(instrument: Instrument) -> tuple:
+    """Band label per possible raw total, so banding is one index lookup."""
+    table, bound = [], 0
+    for upper, label in instrument.bands:
+        table.extend([label] * (upper - bound + 1))
+        bound = upper + 1
+    return tuple(table[: instrument.max_total + 1])
+
+
+PHQ9 = Instrument(
+    "phq", "PHQ-9", "PHQ-9 Depression Screener",
+    (
+        "Little interest or pleasure in doing things",
+        "Feeling down, depressed, or hopeless",
+        "Trouble falling or staying asleep, or sleeping too much",
+        "Feeling tired or having little energy",
+        "Poor appetite or overeating",
+        "Feeling bad about yourself — or that you are a failure or have let yourself or your family down",
+        "Trouble concentrating on things, such as reading or watching television",
+        "Moving or speaking so slowly that other people could have noticed. Or the opposite — being so fidgety or restless that you have been moving around a lot more than usual",
+        "Thoughts that you would be better off dead, or of hurting yourself in some way",
+    ),
+    FREQUENCY,
+    ((4, "Minimal (0–4)"), (9, "Mild (5–9)"), (14, "Moderate (10–14)"), (19, "Moderately severe (15–19)"),
+     (27, "Severe (20–27)")),
+    flag_at=15, default=0,
+)
+
+GAD7 = Instrument(
+    "gad", "GAD-7", "GAD-7 Anxiety Screener",
+    (
+        "Feeling nervous, anxious, or on edge",
+        "Not being able to stop or control worrying",
+        "Worrying too much about different things",
+        "Trouble relaxing",
+        "Being so restless that it is hard to sit still",
+        "Becoming easily annoyed or irritable",
+        "Feeling afraid, as if something awful might happen",
+    ),
+    FREQUENCY,
+    ((4, "Minimal (0–4)"), (9, "Mild (5–9)"), (14, "Moderate (10–14)"), (21, "Severe (15–21)")),
+    flag_at=15, default=0,
+)
+
+PSS10 = Instrument(
+    "pss", "PSS-10", "PSS-10 Perceived Stress Scale (last month)",
+    (
+        "Been upset because of something that happened unexpectedly",
+        "Felt that you were unable to control the important things in your life",
+        "Felt nervous and stressed",
+        "Felt confident about your ability to handle your personal problems",
+        "Felt that things were going your way",
+        "Found that you could not cope with all the things that you had to do",
+        "Been able to control irritations in your life",
+        "Felt that you were on top of things",
+        "Been angered because of things that happened that were outside of your control",
+        "Felt difficulties were piling up so high that you could not overcome them",
+    ),
+    PSS_SCALE,
+    ((13, "Low stress (0–13)"), (26, "Moderate stress (14–26)"), (40, "High perceived stress (27–40)")),
+    flag_at=27, reverse=frozenset({3, 4, 6, 7}),
+)
+
+ISI = Instrument(
+    "isi", "ISI", "Insomnia Severity Index (last 2 weeks)",
+    (
+        "Difficulty falling asleep",
+        "Difficulty staying asleep",
+        "Problems waking up too early",
+        "How satisfied/dissatisfied are you with your current sleep pattern?",
+        "How noticeable to others is your sleep problem in terms of impairing your quality of life?",
+        "How worried/distressed are you about your current sleep problem?",
+        "How much does your sleep problem interfere with your daily functioning?",
+    ),
+    ISI_SEVERITY,
+    ((7, "No clinically significant insomnia (0–7)"), (14, "Subthreshold insomnia (8–14)"),
+     (21, "Moderate clinical insomnia (15–21)"), (28, "Severe clinical insomnia (22–28)")),
+    flag_at=15,
+    item_options={
+        3: ("Very satisfied", "Satisfied", "Moderately satisfied", "Dissatisfied", "Very dissatisfied"),
+        4: ("Not at all", "A little", "Somewhat", "Much", "Very much"),
+        5: ("Not at all", "A little", "Somewhat", "Much", "Very much"),
+        6: ("Not at all", "A little", "Somewhat", "Much", "Very much"),
+    },
+)
+
+WHO5 = Instrument(
+    "who5", "WHO-5", "WHO-5 Well-Being Index (last 2 weeks)",
+    (
+        "I have felt cheerful and in good spirits",
+        "I have felt calm and relaxed",
+        "I have felt active and vigorous",
+        "I woke up feeling fresh and rested",
+        "My daily life has been filled with things that interest me",
+    ),
+    WHO5_SCALE,
+    ((7, "Likely depression — consider screening (≤28%)"), (12, "Low wellbeing (32–48%)"),
+     (25, "Adequate wellbeing (52–100%)")),
+    flag_at=12, scale=4, higher_is_better=True,
+)
+
+INSTRUMENTS = {i.key: i for i in (PHQ9, GAD7, PSS10, ISI, WHO5)}
+_BANDS = {key: _band_table(i) for key, i in INSTRUMENTS.items()}
+
+
+@dataclass(frozen=True)
+class Score:
+    instrument: str
+    total: int
+    band: str
+    answered: int
+    items: int
+    flagged: bool
+
+    @property
+    def complete(self) -> bool:
+        return self.answered == self.items
+
+
+def answer_code(value) -> Optional[int]:
+    """Integer answer code from a stored widget value (an int, or a legacy ``"2 - ..."`` label)."""
+    if value is None or type(value) is int:
+        return value
+    head = str(value).split(" ", 1)[0]
+    return int(head) if head.isdigit() else None
+
+
+def answers(instrument: Instrument, state: Mapping) -> tuple:
+    """The instrument's answer vector from ``state`` keys ``<key>_<item>``; None for unanswered items."""
+    default = instrument.default
+    return tuple(answer_code(state.get(key, default)) for key in instrument.keys)
+
+
+@lru_cache(maxsize=1024)
+def score(key: str, codes: tuple) -> Score:
+    """Score one answer vector; memoised, so repeated reads in a rerun cost a dict lookup."""
+    instrument = INSTRUMENTS[key]
+    given = [(i, c) for i, c in enumerate(codes) if c is not None]
+    raw = sum(instrument.max_code - c if i in instrument.reverse else c for i, c in given)
+    complete = len(given) == len(instrument.items)
+    flagged = False
+    if complete and instrument.flag_at is not None:
+        flagged = raw <= instrument.flag_at if instrument.higher_is_better else raw >= instrument.flag_at
+    return Score(instrument.name, raw * instrument.scale, _BANDS[key][raw] if complete else "Incomplete",
+                 len(given), len(instrument.items), flagged)
+
+
+def score_state(state: Mapping, keys: Iterable[str] = ("phq", "gad")) -> dict:
+    return {key: score(key, answers(INSTRUMENTS[key], state)) for key in keys}
+
+
+def score_batch(key: str, codes) -> tuple:
+    """Totals and band indexes for an ``(n responses, n items)`` array of answer codes.
+
+    Rows must be complete. Returns ``(totals, band_index)`` as NumPy arrays; band
+    labels are ``INSTRUMENTS[key].bands[i][1]``.
+    """
+    instrument = INSTRUMENTS[key]
+    codes = np.asarray(codes, dtype=np.int16)
+    if codes.ndim != 2 or codes.shape[1] != len(instrument.items):
+        raise ValueError(f"{instrument.name} expects {len(instrument.items)} answers per row, got shape {codes.shape}")
+    if instrument.reverse:
+        mask = np.zeros(codes.shape[1], dtype=bool)
+        mask[list(instrument.reverse)] = True
+        codes = np.where(mask, instrument.max_code - codes, codes)
+    raw = codes.sum(axis=1)
+    uppers = np.array([upper for upper, _label in instrument.bands])
+    return raw * instrument.scale, np.searchsorted(uppers, raw)
+
+
+def cohort_report(key: str, codes) -> dict:
+    """Summary of many responses to one instrument: count, mean/median total, count per band, flagged share."""
+    instrument = INSTRUMENTS[key]
+    totals, bands = score_batch(key, codes)
+    counts = np.bincount(bands, minlength=len(instrument.bands))
+    report = {
+        "instrument": instrument.name,
+        "responses": int(len(totals)),
+        "mean_total": float(totals.mean()) if len(totals) else 0.0,
+        "median_total": float(np.median(totals)) if len(totals) else 0.0,
+        "bands": {label: int(n) for (_upper, label), n in zip(instrument.bands, counts)},
+    }
+    if instrument.flag_at is not None and len(totals):
+        raw = totals // instrument.scale
+        flagged = raw <= instrument.flag_at if instrument.higher_is_better else raw >= instrument.flag_at
+        report["flagged_share"] = float(flagged.mean())
+    return report
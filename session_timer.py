@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class TimerStatus:
+    index: int
+    count: int
+    group: str
+    label: str
+    remaining: float
+    progress: float
+    paused: bool
+    done: bool
+
+
+@dataclass
+class SessionTimer:
+    """Countdown over ``(group, label, seconds)`` phases, derived from the clock.
+
+    Nothing sleeps: the current phase and time left are computed from
+    ``time.monotonic()`` whenever the UI refreshes, so pause, resume and skip
+    are plain state changes that take effect on the next render.
+    """
+
+    phases: list
+    started_at: Optional[float] = None
+    paused_at: Optional[float] = None
+    paused_total: float = 0.0
+    skipped: float = 0.0
+    boundaries: list = field(default_factory=list, repr=False)
+
+    def __post_init__(self):
+        total = 0.0
+        self.boundaries = []
+        for _group, _label, seconds in self.phases:
+            total += seconds
+            self.boundaries.append(total)
+
+    @property
+    def total(self) -> float:
+        return self.boundaries[-1] if self.boundaries else 0.0
+
+    def start(self, now: Optional[float] = None) -> None:
+        self.started_at = time.monotonic() if now is None else now
+        self.paused_at = None
+        self.paused_total = 0.0
+        self.skipped = 0.0
+
+    def pause(self, now: Optional[float] = None) -> None:
+        if self.started_at is not None and self.paused_at is None:
+            self.paused_at = time.monotonic() if now is None else now
+
+    def resume(self, now: Optional[float] = None) -> None:
+        if self.paused_at is not None:
+            now = time.monotonic() if now is None else now
+            self.paused_total += now - self.paused_at
+            self.paused_at = None
+
+    def skip(self, now: Optional[float] = None) -> None:
+        """Jump to the start of the next phase (or the end)."""
+        elapsed = self.elapsed(now)
+        for boundary in self.boundaries:
+            if boundary > elapsed:
+                self.skipped += boundary - elapsed
+                return
+
+    def elapsed(self, now: Optional[float] = None) -> float:
+        if self.started_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        if self.paused_at is not None:
+            now = self.paused_at
+        return min(self.total, max(0.0, now - self.started_at - self.paused_total + self.skipped))
+
+    def status(self, now: Optional[float] = None) -> TimerStatus:
+        elapsed = self.elapsed(now)
+        done = self.started_at is not None and elapsed >= self.total
+        index = len(self.phases) - 1
+        for i, boundary in enumerate(self.boundaries):
+            if elapsed < boundary:
+                index = i
+                break
+        group, label, _seconds = self.phases[index] if self.phases else ("", "", 0)
+        remaining = 0.0 if done or not self.phases else self.boundaries[index] - elapsed
+        return TimerStatus(
+            index=index,
+            count=len(self.phases),
+            group=group,
+            label=label,
+            remaining=math.ceil(remaining),
+            progress=elapsed / self.total if self.total else 1.0,
+            paused=self.paused_at is not None,
+            done=done,
+        )
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+
+import pytest
+
+import batch_plans
+from batch_plans import BatchPlanner, Intake, completed_ids, main, read_intakes
+from llm_clients import ClientRegistry
+from llm_scheduler import RequestScheduler
+from model_routing import ModelRoute
+
+pytest.importorskip("openai")
+
+ROUTE = ModelRoute.uniform("gpt-4.1-nano")
+
+
+def intake(intake_id: str, mental_state: str) -> Intake:
+    return Intake.from_record({"id": intake_id, "mental_state": mental_state}, intake_id)
+
+
+def records(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(max_workers=2, requests_per_minute=1e6)
+    yield scheduler
+    scheduler.shutdown()
+
+
+@pytest.fixture
+def planner(scheduler):
+    return BatchPlanner("sk-test", ROUTE, clients=ClientRegistry(backend="stub"), scheduler=scheduler, cache=None,
+                        retry_delay=0.01)
+
+
+def test_completed_ids_last_record_wins(tmp_path):
+    path = tmp_path / "plans.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": "a", "status": "ok"}),
+        json.dumps({"id": "b", "status": "failed"}),
+        json.dumps({"id": "c", "status": "failed"}),
+        json.dumps({"id": "c", "status": "ok"}),
+        json.dumps({"id": "d", "status": "ok"}),
+        json.dumps({"id": "d", "status": "failed"}),
+        '{"id": "e", "sta',
+    ]), encoding="utf-8")
+    assert completed_ids(str(path)) == {"a", "c"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_read_intakes_csv_and_jsonl(tmp_path):
+    csv_path = tmp_path / "intakes.csv"
+    csv_path.write_text("id,mental_state,support_system,stress_level\n"
+                        "x,low,Friends;Family,8\n,tired,,high\n", encoding="utf-8")
+    rows = list(read_intakes(str(csv_path)))
+    assert [(r.intake_id, r.support_system, r.stress_level) for r in rows] == [
+        ("x", ("Friends", "Family"), 8), ("row-2", (), 5)]
+    jsonl_path = tmp_path / "intakes.jsonl"
+    jsonl_path.write_text('{"mental_state": "ok", "current_symptoms": ["Anxiety"]}\n\n', encoding="utf-8")
+    assert [(r.intake_id, r.current_symptoms) for r in read_intakes(str(jsonl_path))] == [("line-1", ("Anxiety",))]
+
+
+def test_every_intake_gets_a_plan(planner, tmp_path):
+    out = tmp_path / "plans.jsonl"
+    report = planner.run([intake("a", "low"), intake("b", "anxious")], str(out))
+    assert (report.ok, report.failed, report.total) == (2, 0, 2)
+    rows = records(out)
+    assert sorted(r["id"] for r in rows) == ["a", "b"]
+    assert all(r["status"] == "ok" and all(r["output"].values()) for r in rows)
+
+
+def test_resume_skips_completed_and_retries_failed(planner, tmp_path):
+    out = tmp_path / "plans.jsonl"
+    out.write_text(json.dumps({"id": "a", "status": "ok"}) + "\n"
+                   + json.dumps({"id": "b", "status": "failed"}) + "\n", encoding="utf-8")
+    report = planner.run([intake("a", "low"), intake("b", "anxious"), intake("c", "tired")], str(out))
+    assert (report.skipped, report.ok) == (1, 2)
+    assert sorted(r["id"] for r in records(out)[2:]) == ["b", "c"]
+    assert completed_ids(str(out)) == {"a", "b", "c"}
+    # Without resume the file starts over
+    report = planner.run([intake("a", "low")], str(out), resume=False)
+    assert report.skipped == 0 and [r["id"] for r in records(out)] == ["a"]
+
+
+def test_duplicate_intakes_each_get_a_row(planner, tmp_path, monkeypatch):
+    calls = []
+    generate = batch_plans.generate_plan
+
+    def counting(*args, **kwargs):
+        calls.append(1)
+        time.sleep(0.05)
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(batch_plans, "generate_plan", counting)
+    out = tmp_path / "plans.jsonl"
+    report = planner.run([intake("a", "same"), intake("b", "same"), intake("c", "other")], str(out))
+    rows = {r["id"]: r for r in records(out)}
+    assert sorted(rows) == ["a", "b", "c"] and report.ok == 3
+    assert rows["a"]["output"] == rows["b"]["output"]
+    assert report.shared == 1 and len(calls) == 2
+
+
+def test_failures_are_retried_with_backoff(planner, tmp_path, monkeypatch):
+    generate = batch_plans.generate_plan
+    failures = {"n": 2}
+
+    def flaky(*args, **kwargs):
+        if failures["n"]:
+            failures["n"] -= 1
+            raise RuntimeError("boom")
+        return generate(*args, **kwargs)
+
+    monkeypatch.setattr(batch_plans, "generate_plan", flaky)
+    report = planner.run([intake("a", "low")], str(tmp_path / "plans.jsonl"))
+    assert (report.ok, report.retries) == (1, 2)
+    assert records(tmp_path / "plans.jsonl")[0]["attempts"] == 3
+
+
+def test_failure_after_retries_is_recorded(planner, tmp_path, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(batch_plans, "generate_plan", broken)
+    report = planner.run([intake("a", "low")], str(tmp_path / "plans.jsonl"))
+    [row] = records(tmp_path / "plans.jsonl")
+    assert (report.failed, row["status"], row["attempts"], row["error"]) == (1, "failed", 3, "RuntimeError: boom")
+
+
+def test_workers_bound_concurrency(tmp_path, monkeypatch):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow(*args, **kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {"assessment": "A", "action": "B", "followup": "C"}
+
+    monkeypatch.setattr(batch_plans, "generate_plan", slow)
+    created = []
+
+    class RecordingScheduler(RequestScheduler):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(batch_plans, "RequestScheduler", RecordingScheduler)
+    monkeypatch.setenv("SEHATSATHI_LLM_BACKEND", "stub")
+    intakes = tmp_path / "intakes.jsonl"
+    intakes.write_text("".join(json.dumps({"id": str(i), "mental_state": f"state {i}"}) + "\n" for i in range(8)),
+                       encoding="utf-8")
+    out = tmp_path / "plans.jsonl"
+    code = main([str(intakes), "-o", str(out), "--api-key", "sk-test", "--workers", "3", "--rpm", "1000000",
+                 "--no-cache", "--quiet"])
+    assert code == 0 and len(records(out)) == 8
+    assert created[0].max_workers == 3
+    assert peak[0] == 3
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from checkin_stats import EWMA, PAIRS, CheckinStats, RollingStats, RunningStats
+
+np = pytest.importorskip("numpy")
+
+DAY = 86400.0
+
+
+def _rows(n: int, seed: int = 7, start: float = 1_000_000.0, step: float = DAY / 2) -> list:
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        mood = rng.randint(1, 10)
+        rows.append({
+            "ts": start + i * step,
+            "mood": float(mood),
+            "sleep": float(min(10, max(1, mood + rng.randint(-2, 2)))),
+            "stress": float(rng.randint(1, 10)),
+        })
+    return rows
+
+
+def _corrcoef(rows: list, a: str, b: str) -> float:
+    return float(np.corrcoef([r[a] for r in rows], [r[b] for r in rows])[0, 1])
+
+
+def test_running_correlations_match_numpy():
+    rows = _rows(50)
+    stats = RunningStats()
+    for row in rows:
+        stats.add(row)
+    for a, b in PAIRS:
+        assert stats.corr(a, b) == pytest.approx(_corrcoef(rows, a, b), abs=1e-9)
+        assert stats.corr(b, a) == stats.corr(a, b)
+    assert stats.mean("mood") == pytest.approx(np.mean([r["mood"] for r in rows]))
+
+
+def test_remove_undoes_add():
+    rows = _rows(30)
+    stats = RunningStats()
+    for row in rows:
+        stats.add(row)
+    for row in rows[:10]:
+        stats.remove(row)
+    assert stats.n == 20
+    assert stats.corr("mood", "sleep") == pytest.approx(_corrcoef(rows[10:], "mood", "sleep"), abs=1e-9)
+
+
+def test_correlation_undefined_for_few_points_or_constant_metric():
+    stats = RunningStats()
+    assert stats.corr("mood", "sleep") is None and stats.mean("mood") is None
+    stats.add({"mood": 3.0, "sleep": 5.0, "stress": 4.0})
+    assert stats.corr("mood", "sleep") is None
+    stats.add({"mood": 6.0, "sleep": 5.0, "stress": 2.0})
+    assert stats.corr("mood", "sleep") is None  # sleep never varies
+    assert stats.corr("mood", "stress") == pytest.approx(-1.0)
+    assert set(stats.correlations()) == {"mood~sleep", "mood~stress", "sleep~stress"}
+
+
+def test_rolling_window_matches_numpy_over_the_window():
+    rows = _rows(60)
+    rolling = RollingStats(7 * DAY)
+    for row in rows:
+        rolling.add(row)
+    cutoff = rows[-1]["ts"] - 7 * DAY
+    window = [r for r in rows if r["ts"] >= cutoff]
+    assert rolling.n == len(window) == len(rolling.rows)
+    for a, b in PAIRS:
+        assert rolling.corr(a, b) == pytest.approx(_corrcoef(window, a, b), abs=1e-9)
+    rolling.advance(rows[-1]["ts"] + 8 * DAY)
+    assert rolling.n == 0 and rolling.corr("mood", "sleep") is None
+
+
+def test_ewma():
+    ewma = EWMA(span=3)
+    assert ewma.alpha == 0.5 and ewma.value is None
+    assert ewma.update(4.0) == 4.0
+    assert ewma.update(8.0) == 6.0
+    assert ewma.update(2.0) == 4.0
+
+
+def test_ewma_matches_closed_form_weights():
+    values = np.arange(1.0, 21.0)
+    ewma = EWMA(span=14)
+    for v in values:
+        ewma.update(float(v))
+    # First value seeds the average, later ones get weight alpha * (1 - alpha) ** age
+    n = len(values) - 1
+    weights = ewma.alpha * (1 - ewma.alpha) ** np.arange(n - 1, -1, -1)
+    expected = (1 - ewma.alpha) ** n * values[0] + float(np.dot(weights, values[1:]))
+    assert ewma.value == pytest.approx(expected)
+
+
+def test_checkin_stats_windows_and_trend():
+    rows = _rows(200, step=DAY)
+    stats = CheckinStats.from_checkins(rows)
+    now = rows[-1]["ts"]
+    assert stats.count == 200
+    assert stats.window(7, now=now).n == 8
+    assert stats.window(30, now=now).n == 31
+    assert stats.window(None) is stats.total
+    assert stats.last["mood"] == rows[-1]["mood"]
+    for m in ("mood", "sleep", "stress"):
+        assert stats.trend(m) == pytest.approx(stats.fast[m].value - stats.slow[m].value)
+    assert CheckinStats().trend("mood") == 0.0
+
+
+def test_rising_metric_has_positive_trend():
+    stats = CheckinStats()
+    for i in range(20):
+        stats.add({"ts": 1_000.0 + i, "mood": 1 + i // 2, "sleep": 5, "stress": 5})
+    assert stats.trend("mood") > 0
+    assert stats.trend("sleep") == pytest.approx(0.0)
@@ -0,0 +1,58 @@
+import pytest
+
+from crisis_lexicon import CrisisLexicon, default_lexicon, detect_crisis
+
+
+@pytest.mark.parametrize("text", [
+    "I want to kill myself",
+    "I keep thinking about killing myself",
+    "I just want to end it all.",
+    "Some days I want to end my life",
+    "I took an overdose last year and I want to overdose again",
+    "I burned myself on purpose yesterday",
+    "I cut myself when it gets bad",
+    "I feel so hopeless",
+    "I feel trapped and there is no way out",
+    "मैं मरना चाहता हूँ",
+    "main marna chahta hoon",
+])
+def test_detects_crisis_phrases(text):
+    assert detect_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I feel fine today, just a normal week",
+    "I'm burning myself out at work",
+    "I need to end it with my landlord and find a new flat",
+    "Stuck, trapped in traffic for two hours",
+    "The nurse explained how a paracetamol overdose is treated",
+    "Work is killing me but I'm coping",
+    "",
+])
+def test_ignores_benign_text(text):
+    assert not detect_crisis(text)
+
+
+@pytest.mark.parametrize("text", [
+    "I don't want to kill myself",
+    "I would never hurt myself",
+    "I'm not suicidal, just tired",
+    "main marna chahta nahi hoon",
+])
+def test_negated_phrases_do_not_fire(text):
+    assert not detect_crisis(text)
+    assert all(m.negated for m in default_lexicon().matches(text))
+
+
+def test_negation_does_not_cross_a_clause_break():
+    assert detect_crisis("I'm not okay. I want to kill myself")
+
+
+def test_matches_report_phrase_and_category():
+    [match] = default_lexicon().matches("Lately I have been cutting myself")
+    assert (match.phrase, match.category, match.language, match.negated) == ("cut myself", "self_harm", "en", False)
+
+
+def test_overlapping_phrases_all_match():
+    lexicon = CrisisLexicon([("end my life", "suicidal", "en"), ("my life", "other", "en")])
+    assert [m.phrase for m in lexicon.matches("I want to end my life")] == ["end my life", "my life"]
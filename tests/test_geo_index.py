@@ -0,0 +1,91 @@
+import math
+import random
+
+import pytest
+
+from geo_index import Gazetteer, KDTree, haversine_km, km_to_chord, to_xyz
+from provider_directory import ProviderDirectory
+
+GAZETTEER = Gazetteer([
+    {"name": "Delhi", "aliases": "New Delhi;Dilli", "zip_prefixes": "110", "country": "IN",
+     "lat": "28.6139", "lon": "77.2090"},
+    {"name": "Noida", "aliases": "", "zip_prefixes": "2013", "country": "IN", "lat": "28.5355", "lon": "77.3910"},
+    {"name": "Mumbai", "aliases": "Bombay", "zip_prefixes": "400", "country": "IN",
+     "lat": "19.0760", "lon": "72.8777"},
+])
+
+
+def _points(n: int, seed: int = 3) -> list:
+    rng = random.Random(seed)
+    return [(rng.uniform(-60, 70), rng.uniform(-180, 180)) for _ in range(n)]
+
+
+def test_haversine_known_distances():
+    assert haversine_km(0, 0, 0, 0) == 0
+    # Delhi - Mumbai is about 1150 km
+    assert haversine_km(28.6139, 77.2090, 19.0760, 72.8777) == pytest.approx(1150, abs=15)
+    assert haversine_km(0, 0, 0, 180) == pytest.approx(math.pi * 6371.0088)
+
+
+def test_chord_order_matches_great_circle_order():
+    km = haversine_km(10, 20, 11, 21)
+    a, b = to_xyz(10, 20), to_xyz(11, 21)
+    assert math.dist(a, b) == pytest.approx(km_to_chord(km))
+
+
+@pytest.mark.parametrize("radius_km", [50, 500, 3000])
+def test_radius_query_matches_brute_force(radius_km):
+    points = _points(800)
+    tree = KDTree([to_xyz(*p) for p in points], list(range(len(points))))
+    for lat, lon in _points(20, seed=11):
+        hits = tree.nearest(to_xyz(lat, lon), k=len(points), max_dist=km_to_chord(radius_km))
+        expected = sorted(
+            (haversine_km(lat, lon, *p), i) for i, p in enumerate(points) if haversine_km(lat, lon, *p) <= radius_km
+        )
+        assert [i for _d, i in hits] == [i for _km, i in expected]
+
+
+def test_k_nearest_and_filter_match_brute_force():
+    points = _points(500)
+    tree = KDTree([to_xyz(*p) for p in points], [f"p{i}" for i in range(len(points))])
+    lat, lon = 20.0, 75.0
+    by_distance = sorted(range(len(points)), key=lambda i: haversine_km(lat, lon, *points[i]))
+    assert [rid for _d, rid in tree.nearest(to_xyz(lat, lon), 10)] == [f"p{i}" for i in by_distance[:10]]
+    even = [rid for _d, rid in tree.nearest(to_xyz(lat, lon), 5, accept=lambda rid: int(rid[1:]) % 2 == 0)]
+    assert even == [f"p{i}" for i in by_distance if i % 2 == 0][:5]
+
+
+def test_empty_tree():
+    assert KDTree([], []).nearest(to_xyz(0, 0), 5) == []
+
+
+def test_gazetteer_lookup():
+    assert GAZETTEER.lookup("dilli")[0] == "Delhi"
+    assert GAZETTEER.lookup("  Bombay ")[0] == "Mumbai"
+    assert GAZETTEER.lookup("Mum")[0] == "Mumbai"
+    assert GAZETTEER.lookup("Mumbay")[0] == "Mumbai"
+    assert GAZETTEER.lookup("Mumbay", fuzzy=False) is None
+    # Longest known postal prefix wins
+    assert GAZETTEER.lookup("201301")[0] == "Noida"
+    assert GAZETTEER.lookup("110 011")[0] == "Delhi"
+    assert GAZETTEER.lookup("999999") is None and GAZETTEER.lookup("") is None
+
+
+def test_directory_search_ranks_by_distance():
+    rows = [
+        {"name": "Noida Clinic", "city": "Noida", "afford": "Low", "lang": "Hindi", "remote": "No"},
+        {"name": "Delhi Clinic", "city": "Delhi", "afford": "High", "lang": "English", "remote": "No"},
+        {"name": "Mumbai Clinic", "city": "Mumbai", "afford": "Low", "lang": "Hindi;English", "remote": "No"},
+        {"name": "Pinned", "city": "Nowhere", "lat": "28.70", "lon": "77.10", "afford": "Low", "lang": "English",
+         "remote": "No"},
+        {"name": "TeleTalk", "city": "Any", "afford": "Low", "lang": "English", "remote": "Yes"},
+    ]
+    directory = ProviderDirectory(rows, GAZETTEER)
+    result = directory.search("New Delhi")
+    assert result.origin[0] == "Delhi"
+    assert [r["name"] for r in result.rows] == ["Delhi Clinic", "Pinned", "Noida Clinic", "Mumbai Clinic", "TeleTalk"]
+    assert result.rows[0]["distance_km"] == pytest.approx(0, abs=1e-6)
+    assert result.rows[-1]["distance_km"] is None
+    near = directory.search("Delhi", radius_km=100, language="English")
+    assert [r["name"] for r in near.rows] == ["Delhi Clinic", "Pinned", "TeleTalk"]
+    assert near.total == 3
@@ -0,0 +1,54 @@
+import pytest
+
+from llm_clients import ClientRegistry, key_fingerprint
+
+pytest.importorskip("openai")
+
+
+class Wrapper:
+    def __init__(self, **llm_config):
+        self.llm_config = llm_config
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_fingerprint_hides_the_key():
+    assert key_fingerprint("sk-secret") != "sk-secret"
+    assert key_fingerprint("sk-secret") == key_fingerprint("sk-secret")
+
+
+def test_openai_clients_are_reused_and_lru_bounded(monkeypatch):
+    monkeypatch.setenv("SEHATSATHI_LLM_BACKEND", "stub")
+    registry = ClientRegistry(max_clients=2)
+    first = registry.openai("k1", "m")
+    registry.openai("k2", "m")
+    assert registry.openai("k1", "m") is first
+    registry.openai("k3", "m")
+    assert len(registry._clients) == 2 and registry.stats["evicted"] == 1
+    # k2 was least recently used; k1 survived and the shared pool still works
+    assert registry.openai("k1", "m") is first
+    reply = first.chat.completions.create(model="m", messages=[{"role": "user", "content": "hi"}])
+    assert reply.choices[0].message.content
+    registry.close()
+
+
+def test_evicted_wrappers_are_closed():
+    registry = ClientRegistry(backend="openai", max_wrappers=2)
+    wrappers = [registry.wrapper(Wrapper, {"config_list": [{"model": "m", "api_key": f"k{i}"}]}) for i in range(3)]
+    assert [w.closed for w in wrappers] == [True, False, False]
+    assert registry.wrapper(Wrapper, {"config_list": [{"model": "m", "api_key": "k2"}]}) is wrappers[2]
+    registry.close()
+
+
+def test_shared_http_client_is_created_on_first_client(monkeypatch):
+    monkeypatch.setenv("SEHATSATHI_LLM_BACKEND", "stub")
+    registry = ClientRegistry()
+    assert registry._http is None
+    registry.openai("k1", "m")
+    shared = registry._http
+    assert shared is not None
+    registry.openai("k2", "m")
+    assert registry._http is shared
+    registry.close()
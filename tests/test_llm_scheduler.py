@@ -0,0 +1,165 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_scheduler import RequestScheduler, TokenBucket, allm_call, llm_call, retry_after
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.response = type("Response", (), {"headers": headers or {}, "status_code": 429})()
+
+
+class Flaky:
+    """A request that answers 429 ``failures`` times before succeeding."""
+
+    def __init__(self, failures: int, headers=None, error=RateLimited):
+        self.failures = failures
+        self.headers = headers
+        self.error = error
+        self.calls = []
+
+    def __call__(self):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise self.error(self.headers) if self.error is RateLimited else self.error("boom")
+        return "ok"
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(max_workers=2, requests_per_minute=60_000, base_delay=0.01, max_delay=0.05)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_token_bucket_reserves_ahead():
+    bucket = TokenBucket(rate_per_second=2, capacity=2)
+    bucket.updated = 0.0
+    assert bucket.reserve(now=0.0) == 0.0
+    assert bucket.reserve(now=0.0) == 0.0
+    assert bucket.reserve(now=0.0) == pytest.approx(0.5)
+    assert bucket.reserve(now=0.0) == pytest.approx(1.0)
+    assert bucket.reserve(now=10.0) == 0.0
+
+
+def test_retry_after_headers():
+    assert retry_after(RateLimited({"retry-after": "2"})) == 2.0
+    assert retry_after(RateLimited({"retry-after-ms": "250"})) == 0.25
+    assert retry_after(RateLimited({"retry-after": "soon"})) is None
+    assert retry_after(ValueError()) is None
+
+
+def test_identical_keys_share_one_run(scheduler):
+    gate = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        gate.wait(5)
+        return "plan"
+
+    first, shared_first = scheduler.schedule("sk", work, key="intake")
+    second, shared_second = scheduler.schedule("sk", work, key="intake")
+    assert (shared_first, shared_second) == (False, True) and first is second
+    gate.set()
+    assert first.result(5) == "plan" and runs == [1]
+    # Finished keys are forgotten: the next request runs again
+    assert scheduler.run("sk", work, key="intake") == "plan" and len(runs) == 2
+    assert scheduler.snapshot()["deduplicated"] == 1
+
+
+def test_429_retries_honour_retry_after(scheduler):
+    request = Flaky(2, headers={"retry-after-ms": "100"})
+    assert scheduler.run("sk", request) == "ok"
+    assert len(request.calls) == 3
+    assert request.calls[1] - request.calls[0] >= 0.09 and request.calls[2] - request.calls[1] >= 0.09
+    assert scheduler.snapshot()["rate_limited"] == 2
+
+
+def test_429_gives_up_after_max_retries():
+    scheduler = RequestScheduler(max_workers=1, requests_per_minute=60_000, max_retries=2, base_delay=0.01)
+    request = Flaky(10)
+    with pytest.raises(RateLimited):
+        scheduler.run("sk", request)
+    assert len(request.calls) == 3
+    scheduler.shutdown()
+
+
+def test_other_errors_are_not_retried(scheduler):
+    request = Flaky(1, error=ValueError)
+    with pytest.raises(ValueError):
+        scheduler.run("sk", request)
+    assert len(request.calls) == 1
+    assert scheduler.snapshot()["failed"] == 1 and scheduler.snapshot()["rate_limited"] == 0
+
+
+def test_429_inside_a_job_retries_only_that_call(scheduler):
+    first, second = Flaky(0), Flaky(2)
+
+    def plan():
+        return llm_call(first), llm_call(second)
+
+    assert scheduler.run("sk", plan, cost=2) == ("ok", "ok")
+    assert (len(first.calls), len(second.calls)) == (1, 3)
+
+
+def test_async_calls_retry_without_blocking_the_loop(scheduler):
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited({"retry-after-ms": "50"})
+        return "ok"
+
+    async def plan():
+        ticks = []
+
+        async def ticker():
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        result, _ = await asyncio.gather(allm_call(request), ticker())
+        return result, len(ticks)
+
+    assert scheduler.run("sk", lambda: asyncio.run(plan())) == ("ok", 3)
+    assert len(attempts) == 2
+
+
+def test_llm_call_outside_a_job_just_runs():
+    assert llm_call(lambda: "direct") == "direct"
+    request = Flaky(1)
+    with pytest.raises(RateLimited):
+        llm_call(request)
+
+
+def test_bucket_throttles_calls_per_minute():
+    # 600 rpm with a burst of 2: after two calls, one every 0.1 s
+    scheduler = RequestScheduler(max_workers=4, requests_per_minute=600, burst=2)
+    started = time.monotonic()
+    futures = [scheduler.schedule("sk", time.monotonic)[0] for _ in range(6)]
+    finished = sorted(f.result(5) - started for f in futures)
+    assert finished[1] < 0.05
+    assert finished[-1] == pytest.approx(0.4, abs=0.08)
+    assert scheduler.snapshot()["waited_seconds"] > 0
+    scheduler.shutdown()
+
+
+def test_throttled_jobs_do_not_hold_workers():
+    # One worker and 0.5 s between calls per key: another key's job runs while the first key waits
+    scheduler = RequestScheduler(max_workers=1, requests_per_minute=120, burst=1)
+    scheduler.run("slow-key", lambda: None)
+    waiting = scheduler.schedule("slow-key", time.monotonic)[0]
+    assert scheduler.queue_depth == 1
+    ran_at = scheduler.run("fast-key", time.monotonic)
+    assert not waiting.done()
+    assert ran_at < waiting.result(5)
+    scheduler.shutdown()
+    assert scheduler.snapshot()["queued"] == 0
@@ -0,0 +1,148 @@
+import json
+import os
+
+import pytest
+
+from batch_plans import Intake
+from llm_backend import get_stub
+from llm_clients import ClientRegistry
+from model_routing import ModelRoute
+from openai_batch import OpenAIBatchPlanner, batch_line, chunk_lines
+from plan_cache import cache_key
+
+pytest.importorskip("openai")
+
+ROUTE = ModelRoute.uniform("gpt-4.1-nano")
+
+
+def intake(intake_id: str, mental_state: str) -> Intake:
+    return Intake.from_record({"id": intake_id, "mental_state": mental_state}, intake_id)
+
+
+def records(path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.fixture
+def stub():
+    stub = get_stub()
+    yield stub
+    stub.drop_sections.clear()
+    stub.batches.fail_ids.clear()
+
+
+@pytest.fixture
+def client(stub):
+    registry = ClientRegistry(backend="stub")
+    yield registry.openai("sk-test", ROUTE.fallback)
+    registry.close()
+
+
+def planner(client, **kwargs) -> OpenAIBatchPlanner:
+    return OpenAIBatchPlanner(client, ROUTE, poll_seconds=0, sleep=lambda s: None, **kwargs)
+
+
+def submitted(stub) -> int:
+    return len(stub.batches._batches)
+
+
+def test_chunk_lines_respects_request_and_byte_limits():
+    lines = [batch_line(f"id{i}", "m", f"task {i}") for i in range(5)]
+    assert [f.count(b"\n") for f in chunk_lines(lines, max_requests=2)] == [2, 2, 1]
+    size = len(chunk_lines(lines[:1])[0])
+    files = chunk_lines(lines, max_bytes=2 * size + 1)
+    assert [f.count(b"\n") for f in files] == [2, 2, 1]
+    assert all(len(f) <= 2 * size + 1 for f in files)
+    # A single line larger than the limit still gets a file of its own
+    assert len(chunk_lines(lines[:2], max_bytes=1)) == 2
+    assert chunk_lines([]) == []
+
+
+def test_run_writes_plans_and_shares_identical_intakes(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    before = submitted(stub)
+    report = planner(client).run([intake("a", "low"), intake("b", "low"), intake("c", "anxious")], out)
+    assert (report.ok, report.failed, report.shared) == (3, 0, 1)
+    assert submitted(stub) == before + 1
+    rows = {r["id"]: r for r in records(out)}
+    assert rows["a"]["output"] == rows["b"]["output"] != rows["c"]["output"]
+    assert all(rows[i]["mode"] == "openai-batch" and all(rows[i]["output"].values()) for i in rows)
+    assert not os.path.exists(out + ".batches.json")
+
+
+def test_failed_requests_are_written_as_failed(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    task, model, _note = planner(client)._prepare(intake("a", "low"))
+    stub.batches.fail_ids.add(cache_key(task, model)[:40])
+    report = planner(client).run([intake("a", "low"), intake("b", "fine")], out)
+    assert (report.ok, report.failed) == (1, 1)
+    rows = {r["id"]: r for r in records(out)}
+    assert rows["a"]["status"] == "failed" and rows["a"]["error"] == "Injected failure"
+
+
+def test_rerun_attaches_to_submitted_batches(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    intakes = [intake("a", "low"), intake("b", "anxious")]
+    before = submitted(stub)
+    with pytest.raises(TimeoutError):
+        planner(client, max_wait=0).run(intakes, out)
+    state = json.loads((tmp_path / "plans.jsonl.batches.json").read_text(encoding="utf-8"))
+    assert len(state["batches"]) == 1 and submitted(stub) == before + 1
+    assert records(out) == []
+
+    # The rerun polls the recorded batch instead of submitting the intakes again; a new
+    # intake with the same task joins the in-flight request
+    report = planner(client).run(intakes + [intake("c", "low")], out)
+    assert submitted(stub) == before + 1
+    assert (report.ok, report.shared) == (3, 1)
+    rows = {r["id"]: r for r in records(out)}
+    assert sorted(rows) == ["a", "b", "c"]
+    assert rows["a"]["output"] == rows["c"]["output"]
+    assert {r["metrics"]["batch_id"] for r in rows.values()} == set(state["batches"])
+    assert not os.path.exists(out + ".batches.json")
+
+
+def test_dropped_section_is_repaired_in_one_follow_up_batch(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    stub.drop_sections.add("Action")
+    before = submitted(stub)
+    report = planner(client).run([intake("a", "low"), intake("b", "anxious")], out)
+    assert (report.ok, report.failed) == (2, 0)
+    assert submitted(stub) == before + 2
+    for row in records(out):
+        assert row["output"]["action"].startswith("## Action Design")
+
+
+def test_dropped_section_fails_without_repair(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    stub.drop_sections.add("Action")
+    before = submitted(stub)
+    report = planner(client, repair=False).run([intake("a", "low")], out)
+    assert (report.ok, report.failed) == (0, 1)
+    assert submitted(stub) == before + 1
+    assert records(out)[0]["error"] == "missing sections: action"
+
+
+def test_same_custom_id_in_two_batches_keeps_both(tmp_path, client, stub):
+    out = str(tmp_path / "plans.jsonl")
+    batch_planner = planner(client)
+    task, model, _note = batch_planner._prepare(intake("a", "low"))
+    custom_id = cache_key(task, model)[:40]
+    # Two interrupted runs each left a batch carrying the same request
+    state = {"batches": {}}
+    for intake_id in ("a", "b"):
+        batch_id = batch_planner.submit(chunk_lines([batch_line(custom_id, model, task)])[0])
+        state["batches"][batch_id] = {"submitted": 0.0, "models": {custom_id: model}, "tasks": {custom_id: task},
+                                      "requests": {custom_id: [(intake_id, "")]}}
+    with open(out + ".batches.json", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+    stub.drop_sections.add("Followup")
+    report = batch_planner.run([], out)
+    assert (report.ok, report.failed) == (2, 0)
+    rows = {r["id"]: r for r in records(out)}
+    assert sorted(r["metrics"]["batch_id"] for r in rows.values()) == sorted(state["batches"])
+    # Each batch's reply got its own repair
+    assert all(r["output"]["followup"] for r in rows.values())
+    assert not os.path.exists(out + ".batches.json")
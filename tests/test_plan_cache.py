@@ -0,0 +1,112 @@
+import json
+
+import pytest
+
+from plan_cache import PlanCache, cache_key
+
+PLAN = {"assessment": "## Assessment Design", "action": "## Action Design", "followup": "## Followup Design"}
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def make_cache(tmp_path, clock, **kwargs):
+    return PlanCache(str(tmp_path / "plans.sqlite"), clock=clock, **kwargs)
+
+
+def test_key_ignores_task_whitespace_but_not_model():
+    assert cache_key("  feeling\n\tlow ", "m") == cache_key("feeling low", "m")
+    assert cache_key("feeling low", "m") != cache_key("feeling low", "other")
+
+
+def test_put_get_and_miss(tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    assert cache.get("task", "m") is None
+    cache.put("task", "m", PLAN)
+    assert cache.get("task", "m") == PLAN
+    assert cache.get("task", "other-model") is None
+    assert (cache.stats["memory_hits"], cache.stats["misses"]) == (1, 2)
+
+
+def test_returned_plan_is_a_copy(tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    cache.put("task", "m", PLAN)
+    cache.get("task", "m")["action"] = "changed"
+    assert cache.get("task", "m") == PLAN
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, ttl_seconds=60)
+    cache.put("task", "m", PLAN)
+    clock.now += 60
+    assert cache.get("task", "m") == PLAN
+    clock.now += 1
+    assert cache.get("task", "m") is None
+    # Expired on disk too: a fresh process does not serve it
+    assert make_cache(tmp_path, clock, ttl_seconds=60).get("task", "m") is None
+    assert cache.snapshot()["disk_entries"] == 0
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path, clock):
+    make_cache(tmp_path, clock).put("task", "m", PLAN)
+    cache = make_cache(tmp_path, clock)
+    assert cache.snapshot()["memory_entries"] == 0
+    assert cache.get("task", "m") == PLAN
+    assert cache.get("task", "m") == PLAN
+    assert (cache.stats["disk_hits"], cache.stats["memory_hits"]) == (1, 1)
+    assert cache.snapshot()["memory_entries"] == 1
+
+
+def test_memory_tier_is_lru_bounded(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, max_memory_entries=2)
+    for task in ("a", "b"):
+        cache.put(task, "m", PLAN)
+    cache.get("a", "m")
+    cache.put("c", "m", PLAN)
+    assert cache.snapshot()["memory_entries"] == 2
+    # "b" was least recently used: it now comes from disk
+    cache.get("b", "m")
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_disk_entry_limit_evicts_least_recently_accessed(tmp_path, clock):
+    cache = make_cache(tmp_path, clock, max_memory_entries=0, max_disk_entries=2)
+    cache.put("a", "m", PLAN)
+    clock.now += 1
+    cache.put("b", "m", PLAN)
+    clock.now += 1
+    cache.get("a", "m")
+    clock.now += 1
+    cache.put("c", "m", PLAN)
+    assert cache.get("b", "m") is None
+    assert cache.get("a", "m") == PLAN and cache.get("c", "m") == PLAN
+    assert cache.stats["evictions"] == 1
+
+
+def test_disk_byte_limit(tmp_path, clock):
+    size = len(json.dumps(PLAN, ensure_ascii=False).encode("utf-8"))
+    cache = make_cache(tmp_path, clock, max_memory_entries=0, max_disk_bytes=2 * size)
+    for task in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(task, "m", PLAN)
+    snapshot = cache.snapshot()
+    assert snapshot["disk_entries"] == 2 and snapshot["disk_bytes"] <= 2 * size
+    assert cache.get("a", "m") is None
+
+
+def test_clear(tmp_path, clock):
+    cache = make_cache(tmp_path, clock)
+    cache.put("task", "m", PLAN)
+    cache.clear()
+    assert cache.get("task", "m") is None
+    assert cache.snapshot()["disk_entries"] == 0
@@ -0,0 +1,128 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from plan_engine import SECTION_KEYS, PlanMetrics, _json_string_prefix, parse_plan_json, run_fallback_plan
+
+FULL = {
+    "assessment": "## Assessment Design\n\nYou have felt low.",
+    "action": "## Action Design\n\nWalk daily.",
+    "followup": "## Followup Design\n\nCheck in weekly.",
+}
+
+
+def test_json_string_prefix_complete_and_truncated():
+    assert _json_string_prefix('Hello \\"there\\"", "action": "x"}') == 'Hello "there"'
+    assert _json_string_prefix("Half a senten") == "Half a senten"
+    assert _json_string_prefix("") == ""
+
+
+def test_json_string_prefix_drops_a_cut_off_escape():
+    assert _json_string_prefix("line one\\") == "line one"
+    assert _json_string_prefix("line one\\n") == "line one\n"
+    for partial in ("caf\\u", "caf\\u00", "caf\\u00e"):
+        assert _json_string_prefix(partial) == "caf"
+    assert _json_string_prefix("caf\\u00e9") == "café"
+
+
+def test_parse_plan_json_full_object():
+    assert parse_plan_json(json.dumps(FULL)) == FULL
+
+
+def test_parse_plan_json_adds_missing_headings_and_blanks_bad_fields():
+    sections = parse_plan_json(json.dumps({"assessment": "You have felt low.", "action": "   ", "followup": 3}))
+    assert sections == {"assessment": "## Assessment Design\n\nYou have felt low.", "action": "", "followup": ""}
+    assert parse_plan_json("[1, 2]") == {key: "" for key in SECTION_KEYS}
+
+
+def test_parse_plan_json_truncated_reply_keeps_what_arrived():
+    text = json.dumps(FULL)
+    cut = text[:text.index("Walk daily") + len("Walk da")]
+    sections = parse_plan_json(cut)
+    assert sections["assessment"] == FULL["assessment"]
+    assert sections["action"] == "## Action Design\n\nWalk da"
+    assert sections["followup"] == ""
+
+
+def test_parse_plan_json_truncated_mid_escape():
+    text = json.dumps({"assessment": "## Assessment Design\n\nFirst line\nsecond"})
+    cut = text[:text.index("\\nsecond") + 1]
+    assert parse_plan_json(cut)["assessment"] == "## Assessment Design\n\nFirst line"
+    text = json.dumps({"assessment": "## Assessment Design\n\ncafé"}, ensure_ascii=True)
+    cut = text[:text.index("\\u00e9") + 4]
+    assert parse_plan_json(cut)["assessment"] == "## Assessment Design\n\ncaf"
+
+
+def test_parse_plan_json_heading_still_streaming_is_not_doubled():
+    assert parse_plan_json('{"assessment": "## Assess')["assessment"] == "## Assess"
+
+
+def test_parse_plan_json_only_requested_keys():
+    assert parse_plan_json(json.dumps(FULL), ("action",)) == {"action": FULL["action"]}
+
+
+class ScriptedClient:
+    """Chat client answering non-streamed calls with the queued replies, recording each request."""
+
+    def __init__(self, *replies: str):
+        self.replies = list(replies)
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **request):
+        self.requests.append(request)
+        message = SimpleNamespace(content=self.replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_blank_section_is_repaired_with_one_call():
+    reply = json.dumps(dict(FULL, followup="  "))
+    client = ScriptedClient(reply, json.dumps({"followup": FULL["followup"]}))
+    metrics = PlanMetrics(mode="fallback")
+    output = run_fallback_plan(client, "m", "task", stream=False, structured=True, metrics=metrics)
+    assert output == FULL
+    assert len(client.requests) == 2
+    assert client.requests[1]["response_format"]["json_schema"]["schema"]["required"] == ["followup"]
+    assert [turn["stage"] for turn in metrics.turns] == ["plan", "repair"]
+
+
+def test_repair_stops_after_repair_rounds():
+    client = ScriptedClient(json.dumps(dict(FULL, action="")), json.dumps({"action": ""}))
+    output = run_fallback_plan(client, "m", "task", stream=False, structured=True)
+    assert output["action"] == "" and len(client.requests) == 2
+    client = ScriptedClient(json.dumps(dict(FULL, action="")))
+    run_fallback_plan(client, "m", "task", stream=False, structured=True, repair_rounds=0)
+    assert len(client.requests) == 1
+
+
+@pytest.fixture
+def stub_client():
+    pytest.importorskip("openai")
+    from llm_backend import get_stub
+    from llm_clients import ClientRegistry
+
+    stub = get_stub()
+    registry = ClientRegistry(backend="stub")
+    yield stub, registry.openai("sk-test", "m")
+    stub.drop_sections.clear()
+    registry.close()
+
+
+@pytest.mark.parametrize("structured", [True, False])
+@pytest.mark.parametrize("stream", [True, False])
+def test_dropped_section_triggers_exactly_one_repair_call(stub_client, structured, stream):
+    stub, client = stub_client
+    stub.drop_sections.add("Action")
+    before = stub.stats["requests"]
+    output = run_fallback_plan(client, "m", "feeling low", stream=stream, structured=structured)
+    assert stub.stats["requests"] - before == 2
+    assert all(output[key] for key in SECTION_KEYS)
+    assert output["action"].startswith("## Action Design")
+
+
+def test_complete_reply_needs_no_repair(stub_client):
+    stub, client = stub_client
+    before = stub.stats["requests"]
+    run_fallback_plan(client, "m", "feeling low", structured=True)
+    assert stub.stats["requests"] - before == 1
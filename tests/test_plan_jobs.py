@@ -0,0 +1,177 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from plan_jobs import INTERRUPTED_ERROR, JobStore, PlanJob, PlanJobRunner
+
+PLAN = {"assessment": "A", "action": "B", "followup": "C"}
+
+
+class ManualScheduler:
+    """Runs scheduled work only when the test calls :meth:`run_all`."""
+
+    def __init__(self):
+        self.pending = []
+
+    def schedule(self, api_key, fn, key=None, cost=1.0):
+        future = Future()
+        self.pending.append((fn, future))
+        return future, False
+
+    def run_all(self):
+        pending, self.pending = self.pending, []
+        for fn, future in pending:
+            try:
+                future.set_result(fn())
+            except Exception as exc:
+                future.set_exception(exc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobStore(str(tmp_path / "plan_jobs.sqlite"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def scheduler():
+    return ManualScheduler()
+
+
+def test_delete_user_drops_live_jobs(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+    calls, cached = [], []
+    job = runner.submit("u1", "sk", lambda s, c: calls.append(1) or PLAN, key="k", task="t", model="m",
+                        on_done=cached.append)
+    other = runner.submit("u2", "sk", lambda s, c: PLAN, task="t2", model="m")
+    deleted = runner.delete_user("u1")
+    assert [(j.job_id, j.task, j.model) for j in deleted] == [(job.job_id, "t", "m")]
+    scheduler.run_all()
+    # The dropped job made no LLM calls, was not cached and was not written back
+    assert calls == [] and cached == []
+    assert store.load(job.job_id) is None and runner.get(job.job_id) is None
+    assert store.load(other.job_id).status == "done"
+    # Its dedup key is free again
+    assert runner.submit("u1", "sk", lambda s, c: PLAN, key="k").job_id != job.job_id
+
+
+def test_delete_user_after_work_started_discards_the_result(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+    cached = []
+
+    def work(on_summary, on_section):
+        on_section("assessment", "A")
+        runner.delete_user("u1")
+        return PLAN
+
+    job = runner.submit("u1", "sk", work, task="t", on_done=cached.append)
+    scheduler.run_all()
+    assert cached == [] and store.load(job.job_id) is None
+    assert runner.snapshot()["live"] == 0 and not runner._dropped
+
+
+def test_delete_user_returns_stored_jobs(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+    done = runner.complete("u1", PLAN, task="t", model="m")
+    assert [j.job_id for j in runner.delete_user("u1")] == [done.job_id]
+    assert runner.delete_user("u1") == []
+
+
+def test_identical_key_attaches_to_the_live_job(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+    runs = []
+    first = runner.submit("u1", "sk", lambda s, c: runs.append(1) or PLAN, key=("fp", "task", "fallback"))
+    second = runner.submit("u2", "sk", lambda s, c: runs.append(2) or PLAN, key=("fp", "task", "fallback"))
+    other_key = runner.submit("u1", "sk", lambda s, c: PLAN, key=("other-fp", "task", "fallback"))
+    assert second is first and other_key is not first
+    scheduler.run_all()
+    assert runs == [1] and runner.stats["shared"] == 1
+    # Once finished the key is free: a new request starts a new job
+    assert runner.submit("u1", "sk", lambda s, c: PLAN, key=("fp", "task", "fallback")) is not first
+
+
+def test_progress_and_finished_plan_are_persisted(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+
+    def work(on_summary, on_section):
+        on_summary("assessment", "summary")
+        on_section("assessment", "A")
+        assert store.load(job.job_id).status == "running"
+        return PLAN
+
+    job = runner.submit("u1", "sk", work, task="t", mode="fallback", model="m")
+    assert store.load(job.job_id).status == "queued"
+    scheduler.run_all()
+    stored = store.load(job.job_id)
+    assert (stored.status, stored.output, stored.summaries, stored.task) == ("done", PLAN, {"assessment": "summary"}, "t")
+
+
+def test_finish_saves_before_leaving_memory(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+    live_at_save = []
+    save = store.save
+
+    def recording_save(job):
+        live_at_save.append((job.status, job.job_id in runner._live))
+        save(job)
+
+    store.save = recording_save
+    job = runner.submit("u1", "sk", lambda s, c: PLAN)
+    scheduler.run_all()
+    # Still live when the finished row is written, so a poll in between never finds nothing
+    assert live_at_save[-1] == ("done", True)
+    assert runner.get(job.job_id).status == "done" and runner.snapshot()["live"] == 0
+
+
+def test_failed_work_records_the_error(store, scheduler):
+    runner = PlanJobRunner(scheduler, store)
+
+    def work(on_summary, on_section):
+        raise ValueError("no sections")
+
+    job = runner.submit("u1", "sk", work)
+    scheduler.run_all()
+    stored = runner.get(job.job_id)
+    assert (stored.status, stored.error) == ("failed", "no sections")
+    assert runner.stats["failed"] == 1
+
+
+def test_unfinished_jobs_are_interrupted_on_reopen(tmp_path, scheduler):
+    path = str(tmp_path / "plan_jobs.sqlite")
+    runner = PlanJobRunner(scheduler, JobStore(path))
+    job = runner.submit("u1", "sk", lambda s, c: PLAN)
+    done = runner.complete("u1", PLAN)
+    runner.store.close()
+    reopened = JobStore(path)
+    stored = reopened.load(job.job_id)
+    assert (stored.status, stored.error) == ("failed", INTERRUPTED_ERROR)
+    assert stored.updated == job.updated
+    assert reopened.load(done.job_id).status == "done"
+    reopened.close()
+
+
+def test_get_marks_a_stored_unfinished_job_interrupted(store, scheduler):
+    orphan = PlanJob("orphan", "u1", status="running")
+    store.save(orphan)
+    job = PlanJobRunner(scheduler, store).get("orphan")
+    assert (job.status, job.error) == ("failed", INTERRUPTED_ERROR)
+
+
+def test_ttl_prunes_only_finished_rows(tmp_path):
+    path = str(tmp_path / "plan_jobs.sqlite")
+    store = JobStore(path)
+    old = time.time() - 3600
+    for job_id, status in (("done", "done"), ("failed", "failed"), ("stale-queued", "queued")):
+        store.save(PlanJob(job_id, "u1", status=status, updated=old))
+    store.save(PlanJob("fresh", "u1", status="done"))
+    store.save(PlanJob("fresh-running", "u1", status="running"))
+    store.close()
+    store = JobStore(path, ttl_seconds=60)
+    assert store.load("done") is None and store.load("failed") is None
+    assert store.load("fresh").status == "done"
+    # Unfinished rows are interrupted first; the TTL then counts from their last progress
+    assert store.load("stale-queued") is None
+    assert (store.load("fresh-running").status, store.load("fresh-running").error) == ("failed", INTERRUPTED_ERROR)
+    store.close()
@@ -0,0 +1,113 @@
+import pytest
+
+from provider_directory import ProviderDirectory, normalize
+
+ROWS = [
+    {"name": "Delhi Mind Clinic", "type": "Therapist", "city": "Delhi", "zip": "110001", "afford": "Low",
+     "lang": "Hindi;English", "remote": "No"},
+    {"name": "New Delhi Counselling", "type": "Counsellor", "city": "New Delhi", "zip": "110011", "afford": "High",
+     "lang": "English", "remote": "Yes"},
+    {"name": "Mumbai Care", "type": "Psychiatrist", "city": "Mumbai", "zip": "400001", "afford": "Low",
+     "lang": "Marathi;Hindi", "remote": "No"},
+    {"name": "Pune Group", "type": "Group", "city": "Pune", "zip": "411001", "afford": "Medium",
+     "lang": "Marathi", "remote": "No"},
+    {"name": "Hyderabad Help", "type": "Therapist", "city": "Hyderabad", "zip": "500001", "afford": "Low",
+     "lang": "Telugu;English", "remote": "Yes"},
+    {"name": "TeleTalk", "type": "Telehealth", "city": "Any", "zip": "", "afford": "Low",
+     "lang": "English;Hindi", "remote": "Yes"},
+    {"name": "", "city": "Delhi"},
+]
+
+
+@pytest.fixture
+def directory():
+    return ProviderDirectory(ROWS)
+
+
+def _names(result):
+    return [row["name"] for row in result.rows]
+
+
+def test_rows_without_a_name_are_skipped(directory):
+    assert len(directory) == 6
+
+
+def test_normalize():
+    assert normalize("  New   Delhi ") == "new delhi"
+    assert normalize(None) == ""
+
+
+def test_exact_city_includes_nationwide_providers(directory):
+    result = directory.search("delhi")
+    assert _names(result) == ["Delhi Mind Clinic", "TeleTalk"]
+    assert result.matched_places == ("delhi",)
+
+
+def test_city_prefix(directory):
+    result = directory.search("Hyd")
+    assert _names(result) == ["Hyderabad Help", "TeleTalk"]
+    assert directory.search("new d").matched_places == ("new delhi",)
+
+
+def test_misspelt_city_falls_back_to_fuzzy(directory):
+    result = directory.search("Mumbay")
+    assert result.matched_places == ("mumbai",)
+    assert "Mumbai Care" in _names(result)
+
+
+def test_zip_exact_and_prefix(directory):
+    assert _names(directory.search("400001")) == ["Mumbai Care", "TeleTalk"]
+    result = directory.search("1100")
+    assert set(result.matched_places) == {"110001", "110011"}
+    assert _names(result) == ["Delhi Mind Clinic", "New Delhi Counselling", "TeleTalk"]
+
+
+def test_unknown_place_matches_only_nationwide(directory):
+    result = directory.search("Atlantis")
+    assert result.matched_places == ()
+    assert _names(result) == ["TeleTalk"]
+
+
+def test_filters_intersect(directory):
+    assert _names(directory.search(afford="Low", language="Hindi")) == ["Delhi Mind Clinic", "Mumbai Care", "TeleTalk"]
+    assert _names(directory.search("Delhi", remote="Yes")) == ["TeleTalk"]
+    assert _names(directory.search(language="english", remote="yes")) == [
+        "New Delhi Counselling", "Hyderabad Help", "TeleTalk"]
+    assert directory.search(language="Klingon").total == 0
+
+
+def test_pagination(directory):
+    first = directory.search(page_size=4)
+    second = directory.search(page=1, page_size=4)
+    assert (first.total, first.pages) == (6, 2)
+    assert len(first.rows) == 4 and len(second.rows) == 2
+    assert _names(first) + _names(second) == [row["name"] for row in directory.rows]
+    filtered = directory.search(afford="Low", page=1, page_size=2)
+    assert (filtered.total, filtered.pages, _names(filtered)) == (4, 2, ["Hyderabad Help", "TeleTalk"])
+    assert directory.search(page=5, page_size=4).rows == []
+    assert directory.search(language="Klingon").pages == 1
+
+
+def test_load_csv_and_sqlite(tmp_path):
+    import csv
+    import sqlite3
+
+    fields = ("name", "type", "city", "zip", "afford", "lang", "remote")
+    path = tmp_path / "providers.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(row for row in ROWS if row["name"])
+    assert len(ProviderDirectory.load(str(path))) == 6
+
+    db = tmp_path / "providers.sqlite"
+    conn = sqlite3.connect(db)
+    conn.execute(f"CREATE TABLE providers ({', '.join(fields)})")
+    conn.executemany(f"INSERT INTO providers VALUES ({', '.join('?' * len(fields))})",
+                     [tuple(row[f] for f in fields) for row in ROWS if row["name"]])
+    conn.commit()
+    conn.close()
+    assert _names(ProviderDirectory.load(str(db)).search("Pune")) == ["Pune Group", "TeleTalk"]
+
+    with pytest.raises(ValueError):
+        ProviderDirectory.load(str(tmp_path / "providers.xlsx"))
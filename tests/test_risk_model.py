@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+from risk_model import RISK_LABELS, RISK_THRESHOLD, RiskAssessment, assess_text, default_classifier, severity
+
+HOLDOUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "triage_holdout.jsonl")
+
+
+def _holdout():
+    with open(HOLDOUT, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("text", [
+    "I feel fine",
+    "I feel fine today, just a normal week",
+    "I feel okay",
+    "I feel good",
+])
+def test_benign_text_is_not_flagged(text):
+    assert assess_text(text).flagged == []
+
+
+def test_no_benign_holdout_row_is_flagged():
+    flagged = [row["text"] for row in _holdout() if not row["labels"] and assess_text(row["text"]).flagged]
+    assert flagged == []
+
+
+def test_holdout_recall():
+    rows = [row for row in _holdout() if row["labels"]]
+    scores = [default_classifier().scores(row["text"]) for row in rows]
+    recalled = sum(s[label] >= RISK_THRESHOLD for s, row in zip(scores, rows) for label in row["labels"])
+    assert recalled >= 0.8 * sum(len(row["labels"]) for row in rows)
+
+
+def test_blank_input_scores_zero_without_training():
+    assessment = assess_text("", "  ")
+    assert assessment.flagged == [] and assessment.low_signal
+
+
+def _assessment(**scores):
+    return RiskAssessment(dict(dict.fromkeys(RISK_LABELS, 0.0), **scores))
+
+
+@pytest.mark.parametrize("lexicon, scores, rules, level", [
+    (False, {}, False, "info"),
+    (False, {"depression": 0.9, "anxiety": 0.9}, False, "info"),
+    (False, {"crisis": RISK_THRESHOLD - 0.01}, False, "info"),
+    (False, {"crisis": RISK_THRESHOLD}, False, "moderate"),
+    (False, {"self_harm": 0.9}, False, "moderate"),
+    (False, {}, True, "moderate"),
+    (True, {}, False, "high"),
+    (True, {"crisis": 0.1}, True, "high"),
+])
+def test_severity(lexicon, scores, rules, level):
+    assert severity(lexicon, _assessment(**scores), rules) == level
+
+
+def test_model_flag_alone_never_reaches_high():
+    assert severity(False, _assessment(crisis=1.0, self_harm=1.0), True) == "moderate"
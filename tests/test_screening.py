@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from screening import GAD7, INSTRUMENTS, ISI, PHQ9, PSS10, WHO5, answer_code, answers, cohort_report, score, score_batch
+
+np = pytest.importorskip("numpy")
+
+
+def codes_for(instrument, raw: int) -> tuple:
+    """An answer vector whose raw total (after reverse scoring) is ``raw``."""
+    codes = []
+    for i in range(len(instrument.items)):
+        points = min(instrument.max_code, raw)
+        raw -= points
+        codes.append(instrument.max_code - points if i in instrument.reverse else points)
+    assert raw == 0
+    return tuple(codes)
+
+
+@pytest.mark.parametrize("instrument, raw, band, flagged", [
+    (PHQ9, 0, "Minimal (0–4)", False),
+    (PHQ9, 4, "Minimal (0–4)", False),
+    (PHQ9, 5, "Mild (5–9)", False),
+    (PHQ9, 14, "Moderate (10–14)", False),
+    (PHQ9, 15, "Moderately severe (15–19)", True),
+    (PHQ9, 20, "Severe (20–27)", True),
+    (PHQ9, 27, "Severe (20–27)", True),
+    (GAD7, 9, "Mild (5–9)", False),
+    (GAD7, 10, "Moderate (10–14)", False),
+    (GAD7, 15, "Severe (15–21)", True),
+    (GAD7, 21, "Severe (15–21)", True),
+    (PSS10, 13, "Low stress (0–13)", False),
+    (PSS10, 14, "Moderate stress (14–26)", False),
+    (PSS10, 26, "Moderate stress (14–26)", False),
+    (PSS10, 27, "High perceived stress (27–40)", True),
+    (PSS10, 40, "High perceived stress (27–40)", True),
+    (ISI, 7, "No clinically significant insomnia (0–7)", False),
+    (ISI, 8, "Subthreshold insomnia (8–14)", False),
+    (ISI, 15, "Moderate clinical insomnia (15–21)", True),
+    (ISI, 22, "Severe clinical insomnia (22–28)", True),
+])
+def test_band_boundaries(instrument, raw, band, flagged):
+    result = score(instrument.key, codes_for(instrument, raw))
+    assert (result.total, result.band, result.flagged, result.complete) == (raw, band, flagged, True)
+
+
+@pytest.mark.parametrize("raw, percent, band, flagged", [
+    (0, 0, "Likely depression — consider screening (≤28%)", True),
+    (7, 28, "Likely depression — consider screening (≤28%)", True),
+    (8, 32, "Low wellbeing (32–48%)", True),
+    (12, 48, "Low wellbeing (32–48%)", True),
+    (13, 52, "Adequate wellbeing (52–100%)", False),
+    (25, 100, "Adequate wellbeing (52–100%)", False),
+])
+def test_who5_is_a_percentage_and_higher_is_better(raw, percent, band, flagged):
+    result = score("who5", codes_for(WHO5, raw))
+    assert (result.total, result.band, result.flagged) == (percent, band, flagged)
+
+
+def test_pss10_reverse_items():
+    assert PSS10.reverse == frozenset({3, 4, 6, 7})
+    # Answering "Very often" everywhere: positive items score 0, the other six score 4 each
+    assert score("pss", (4,) * 10).total == 24
+    assert score("pss", (0,) * 10).total == 16
+    assert score("pss", (4, 4, 4, 0, 0, 4, 0, 0, 4, 4)).total == 40
+
+
+def test_incomplete_answers_are_not_banded_or_flagged():
+    result = score("phq", (3, 3, 3, 3, 3, None, None, None, None))
+    assert (result.total, result.band, result.answered, result.complete, result.flagged) == (
+        15, "Incomplete", 5, False, False)
+
+
+def test_answers_read_state_with_defaults_and_legacy_labels():
+    state = {"phq_0": 2, "phq_1": "3 - Nearly every day"}
+    assert answers(PHQ9, state) == (2, 3) + (0,) * 7
+    assert answers(ISI, {}) == (None,) * 7
+    assert answer_code("not a code") is None and answer_code(None) is None
+
+
+@pytest.mark.parametrize("key", sorted(INSTRUMENTS))
+def test_score_batch_matches_score(key):
+    instrument = INSTRUMENTS[key]
+    rng = random.Random(key)
+    rows = [tuple(rng.randint(0, instrument.max_code) for _ in instrument.items) for _ in range(300)]
+    totals, band_index = score_batch(key, rows)
+    for row, total, band in zip(rows, totals, band_index):
+        single = score(key, row)
+        assert single.total == int(total)
+        assert single.band == instrument.bands[int(band)][1]
+
+
+def test_score_batch_rejects_wrong_shape():
+    with pytest.raises(ValueError):
+        score_batch("gad", [[0] * 9])
+
+
+def test_cohort_report():
+    rows = [codes_for(GAD7, raw) for raw in (0, 4, 10, 15, 21)]
+    report = cohort_report("gad", rows)
+    assert report["instrument"] == "GAD-7" and report["responses"] == 5
+    assert report["mean_total"] == pytest.approx(10.0) and report["median_total"] == 10.0
+    assert report["bands"] == {"Minimal (0–4)": 2, "Mild (5–9)": 0, "Moderate (10–14)": 1, "Severe (15–21)": 2}
+    assert report["flagged_share"] == pytest.approx(0.4)
+
+
+def test_cohort_report_who5_flags_low_scores():
+    report = cohort_report("who5", [codes_for(WHO5, raw) for raw in (5, 12, 20, 25)])
+    assert report["flagged_share"] == pytest.approx(0.5)
+    assert report["mean_total"] == pytest.approx((5 + 12 + 20 + 25) * 4 / 4)
+
+
+def test_cohort_report_empty():
+    report = cohort_report("phq", np.zeros((0, 9), dtype=int))
+    assert report["responses"] == 0 and report["mean_total"] == 0.0 and "flagged_share" not in report
@@ -0,0 +1,108 @@
+import pytest
+
+import session_timer
+from session_timer import SessionTimer
+
+PHASES = [("Box", "Inhale", 4), ("Box", "Hold", 4), ("Box", "Exhale", 6)]
+
+
+class Clock:
+    def __init__(self, now: float = 500.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_timer.time, "monotonic", clock)
+    return clock
+
+
+def test_not_started():
+    status = SessionTimer(PHASES).status(now=10.0)
+    assert (status.index, status.label, status.remaining, status.done) == (0, "Inhale", 4, False)
+    assert status.progress == 0.0
+
+
+def test_phases_advance_with_the_clock(clock):
+    timer = SessionTimer(PHASES)
+    timer.start()
+    assert timer.total == 14
+    clock.now += 1.5
+    status = timer.status()
+    assert (status.index, status.count, status.label, status.remaining) == (0, 3, "Inhale", 3)
+    clock.now += 3
+    assert timer.status().label == "Hold"
+    clock.now += 6
+    status = timer.status()
+    assert (status.label, status.remaining) == ("Exhale", 4)
+    clock.now += 100
+    status = timer.status()
+    assert status.done and status.remaining == 0 and status.progress == 1.0
+    assert status.index == 2
+
+
+def test_pause_freezes_and_resume_excludes_the_pause(clock):
+    timer = SessionTimer(PHASES)
+    timer.start()
+    clock.now += 2
+    timer.pause()
+    clock.now += 30
+    status = timer.status()
+    assert status.paused and timer.elapsed() == 2 and status.remaining == 2
+    timer.pause()  # pausing twice keeps the first pause time
+    clock.now += 5
+    timer.resume()
+    assert timer.elapsed() == 2 and not timer.status().paused
+    clock.now += 3
+    assert timer.status().label == "Hold"
+
+
+def test_pause_before_start_is_ignored():
+    timer = SessionTimer(PHASES)
+    timer.pause(now=1.0)
+    timer.resume(now=2.0)
+    assert timer.paused_at is None and timer.paused_total == 0.0
+
+
+def test_skip_jumps_to_next_phase_then_the_end():
+    timer = SessionTimer(PHASES)
+    timer.start(now=0.0)
+    timer.skip(now=1.0)
+    status = timer.status(now=1.0)
+    assert (status.label, status.remaining) == ("Hold", 4)
+    timer.skip(now=2.0)
+    assert timer.status(now=2.0).label == "Exhale"
+    timer.skip(now=2.0)
+    assert timer.status(now=2.0).done
+    timer.skip(now=3.0)  # past the end: nothing left to skip
+    assert timer.elapsed(now=3.0) == timer.total
+
+
+def test_skip_while_paused():
+    timer = SessionTimer(PHASES)
+    timer.start(now=0.0)
+    timer.pause(now=1.0)
+    timer.skip(now=50.0)
+    status = timer.status(now=60.0)
+    assert (status.label, status.remaining, status.paused) == ("Hold", 4, True)
+
+
+def test_restart_resets_pause_and_skip():
+    timer = SessionTimer(PHASES)
+    timer.start(now=0.0)
+    timer.pause(now=1.0)
+    timer.skip(now=1.0)
+    timer.start(now=100.0)
+    status = timer.status(now=101.0)
+    assert (status.label, status.remaining, status.paused) == ("Inhale", 3, False)
+
+
+def test_empty_timer_is_done_once_started():
+    timer = SessionTimer([])
+    timer.start(now=0.0)
+    status = timer.status(now=0.0)
+    assert status.done and status.count == 0 and status.progress == 1.0
@@ -0,0 +1,95 @@
+from token_budget import MESSAGE_OVERHEAD_TOKENS, TokenBudget, approx_tokens, message_tokens
+
+
+def _history(turns: int, words: int = 40) -> list:
+    messages = [{"role": "system", "content": "You are a careful assistant. " * 5}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return messages
+
+
+def _tool_turn(i: int) -> list:
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"call_{i}", "type": "function",
+             "function": {"name": "update_assessment_overview", "arguments": '{"assessment_summary": "ok"}'}}]},
+        {"role": "tool", "tool_call_id": f"call_{i}", "content": "summary recorded " + "word " * 30},
+    ]
+
+
+def _total(budget: TokenBudget, messages: list) -> int:
+    return sum(message_tokens(m, budget.model) for m in messages)
+
+
+def test_approx_tokens():
+    assert approx_tokens("") == 0
+    assert approx_tokens("abc") == 1
+    assert approx_tokens("a" * 400) == 100
+
+
+def test_short_history_is_untouched():
+    budget = TokenBudget(max_prompt_tokens=10_000)
+    messages = _history(2)
+    assert budget.trim_messages(messages) == messages
+
+
+def test_trim_keeps_first_message_and_newest_turns_within_budget():
+    budget = TokenBudget(max_prompt_tokens=300)
+    messages = _history(20)
+    trimmed = budget.trim_messages(messages, reserved=50)
+    assert trimmed[0] is messages[0]
+    assert trimmed[-1] is messages[-1]
+    assert len(trimmed) < len(messages)
+    assert _total(budget, trimmed) + 50 <= budget.max_prompt_tokens
+    # What is kept is a contiguous run of the newest messages
+    assert trimmed[1:] == messages[len(messages) - len(trimmed) + 1:]
+
+
+def test_trim_drops_leading_orphan_tool_results():
+    budget = TokenBudget(max_prompt_tokens=10_000)
+    messages = _history(0) + _tool_turn(1) + [{"role": "user", "content": "next"}]
+    tool_call_tokens = message_tokens(messages[1], budget.model)
+    # Budget that fits the tool result and the user turn but not the assistant tool call before them
+    budget.max_prompt_tokens = _total(budget, messages) - tool_call_tokens // 2
+    trimmed = budget.trim_messages(messages)
+    assert [m["role"] for m in trimmed] == ["system", "user"]
+
+
+def test_trim_with_one_message_returns_it():
+    budget = TokenBudget(max_prompt_tokens=1)
+    messages = [{"role": "user", "content": "word " * 500}]
+    assert budget.trim_messages(messages) == messages
+
+
+def test_message_tokens_count_tool_calls():
+    [call, _result] = _tool_turn(1)
+    assert message_tokens(call) > MESSAGE_OVERHEAD_TOKENS
+
+
+def test_shorten_keeps_whole_leading_sentences():
+    budget = TokenBudget()
+    text = "First sentence is here. Second one follows. " + "Third goes on and on. " * 20
+    short = budget.shorten(text, 12)
+    assert short.startswith("First sentence is here.") and short.endswith(" …")
+    assert budget.count(short.rstrip(" …")) <= 12
+    assert budget.shorten("Short.", 12) == "Short."
+
+
+def test_fit_context_prefers_current_agent_and_holds_budget():
+    budget = TokenBudget(max_prompt_tokens=300, context_tokens=40, summary_tokens=30)
+    context = {
+        "assessment": "Assessment summary. " * 10,
+        "action": "Action summary. " * 10,
+        "followup": None,
+    }
+    fitted = budget.fit_context(context, current="action")
+    assert "action" in fitted and "followup" not in fitted
+    assert sum(budget.count(v) for v in fitted.values()) <= budget.context_tokens
+    assert list(fitted) == [k for k in context if k in fitted]
+
+
+def test_fit_context_keeps_everything_when_it_fits():
+    budget = TokenBudget(context_tokens=1_000)
+    context = {"assessment": "a.", "action": "b.", "followup": "c."}
+    assert budget.fit_context(context, current="followup") == context
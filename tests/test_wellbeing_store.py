@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from wellbeing_store import WellbeingStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WellbeingStore(str(tmp_path / "wellbeing.sqlite"), batch_size=4)
+    yield store
+    store.close()
+
+
+def test_uses_wal(store):
+    conn = sqlite3.connect(store.path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_checkins_round_trip_in_time_order(store):
+    for ts, mood in ((30.0, 3), (10.0, 1), (20.0, 2)):
+        store.append_checkin("u1", {"ts": ts, "mood": mood, "sleep": 7, "stress": 4})
+    store.append_checkin("u2", {"ts": 15.0, "mood": 9, "sleep": 7, "stress": 4})
+    store.flush()
+    assert [c["mood"] for c in store.checkins("u1")] == [1, 2, 3]
+    assert [c["mood"] for c in store.checkins("u1", since=20.0)] == [2, 3]
+    assert [c["mood"] for c in store.checkins("u1", since=10.0, until=30.0)] == [1, 2]
+    assert store.checkins("nobody") == []
+
+
+def test_entries_by_kind_with_limit(store):
+    for i in range(1, 11):
+        store.append("journal", "u1", {"ts": float(i), "text": f"note {i}"})
+    store.append("habit", "u1", {"ts": 5.0, "name": "walk"})
+    store.flush()
+    journal = store.entries("journal", "u1")
+    assert [e["text"] for e in journal] == [f"note {i}" for i in range(1, 11)]
+    assert journal[0] == {"text": "note 1", "ts": 1.0}
+    assert [e["text"] for e in store.entries("journal", "u1", limit=3)] == ["note 8", "note 9", "note 10"]
+    assert [e["name"] for e in store.entries("habit", "u1")] == ["walk"]
+
+
+def test_unknown_kind_is_rejected(store):
+    with pytest.raises(ValueError):
+        store.append("diary", "u1", {})
+
+
+def test_writes_survive_reopen(tmp_path):
+    path = str(tmp_path / "wellbeing.sqlite")
+    store = WellbeingStore(path)
+    store.append_checkin("u1", {"ts": 1.0, "mood": 5, "sleep": 6, "stress": 7})
+    store.close()
+    reopened = WellbeingStore(path)
+    assert reopened.checkins("u1") == [{"mood": 5, "sleep": 6, "stress": 7, "ts": 1.0}]
+    reopened.close()
+
+
+def test_delete_runs_behind_pending_writes(store):
+    # Queued without a flush: the delete must still remove them, and only for this user
+    for i in range(1, 11):
+        store.append_checkin("u1", {"ts": float(i), "mood": 5, "sleep": 6, "stress": 7})
+        store.append("journal", "u1", {"ts": float(i), "text": "private"})
+    store.append_checkin("u2", {"ts": 1.0, "mood": 5, "sleep": 6, "stress": 7})
+    store.delete_user("u1")
+    store.append_checkin("u1", {"ts": 99.0, "mood": 1, "sleep": 1, "stress": 1})
+    store.flush()
+    assert store.checkins("u1") == [{"mood": 1, "sleep": 1, "stress": 1, "ts": 99.0}]
+    assert store.entries("journal", "u1") == []
+    assert len(store.checkins("u2")) == 1
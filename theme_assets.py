@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from ui_theme import THEME_CSS
+
+try:
+    from ui_theme_alt import THEME_ALT_CSS
+except Exception:
+    THEME_ALT_CSS = None
+
+# CSS variables each accent picker overrides, per theme
+ACCENT_VARS = {
+    "Default": {"primary": ("--primary", "--accent"), "secondary": ("--primary-2", "--accent-2")},
+    "Neon Pulse": {"primary": ("--cyan",), "secondary": ("--magenta",)},
+}
+THEMES = {"Default": THEME_CSS, **({"Neon Pulse": THEME_ALT_CSS} if THEME_ALT_CSS else {})}
+
+# Sidebar images are served at twice the widest sidebar, so they stay sharp on high-DPI screens
+SIDEBAR_IMAGE_WIDTH = 672
+IMAGE_QUALITY = 80
+
+_COMMENTS = re.compile(r"/\*.*?\*/", re.S)
+_SPACES = re.compile(r"\s+")
+_PUNCT = re.compile(r"\s*([{};,])\s*")
+_STYLE_TAGS = re.compile(r"</?style>")
+
+
+def minify_css(css: str) -> str:
+    css = _SPACES.sub(" ", _COMMENTS.sub("", css))
+    return _PUNCT.sub(r"\1", css).replace(";}", "}").strip()
+
+
+@dataclass(frozen=True)
+class ThemeBundle:
+    theme: str
+    digest: str
+    html: str
+
+
+@lru_cache(maxsize=64)
+def build_theme(theme: str, primary: str, secondary: str) -> ThemeBundle:
+    """One minified ``<style>`` block for a theme with its accent overrides, built once per combination."""
+    if theme not in THEMES:
+        theme = "Default"
+    accents = ACCENT_VARS[theme]
+    overrides = ";".join(
+        [f"{var}:{primary}" for var in accents["primary"]] + [f"{var}:{secondary}" for var in accents["secondary"]]
+    )
+    css = minify_css(_STYLE_TAGS.sub("", THEMES[theme])) + f":root{{{overrides}}}"
+    digest = hashlib.sha1(css.encode("utf-8")).hexdigest()[:12]
+    return ThemeBundle(theme, digest, f"<style>{css}</style>")
+
+
+@dataclass(frozen=True)
+class ImageAsset:
+    data: bytes
+    mime: str
+    width: int
+    height: int
+    source_bytes: int
+
+
+def load_image(path: str, max_width: int = SIDEBAR_IMAGE_WIDTH, quality: int = IMAGE_QUALITY) -> Optional[ImageAsset]:
+    """``path`` downscaled to ``max_width`` and re-encoded as WebP; None when the file is missing.
+
+    Cached on the file's mtime and size, so the source is decoded once per process
+    and an edited image is picked up without a restart.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return _encode_image(path, stat.st_mtime_ns, stat.st_size, max_width, quality)
+
+
+@lru_cache(maxsize=16)
+def _encode_image(path: str, _mtime_ns: int, size: int, max_width: int, quality: int) -> ImageAsset:
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image.load()
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        out = io.BytesIO()
+        try:
+            image.save(out, "WEBP", quality=quality, method=6)
+            mime = "image/webp"
+        except (KeyError, OSError):
+            # Pillow built without WebP: keep a lossless PNG of the resized image
+            out = io.BytesIO()
+            image.save(out, "PNG", optimize=True)
+            mime = "image/png"
+        return ImageAsset(out.getvalue(), mime, image.width, image.height, size)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing tokens the chat format adds on top of the content
+MESSAGE_OVERHEAD_TOKENS = 4
+
+DEFAULT_PROMPT_BUDGET = int(os.environ.get("SEHATSATHI_PROMPT_BUDGET", "2000") or 2000)
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+def approx_tokens(text: str) -> int:
+    # ~4 characters per token for English prose
+    return max(1, len(text) // 4) if text else 0
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Exact count with tiktoken when installed, else the 4-chars-per-token estimate."""
+    if not text:
+        return 0
+    encoding = _encoding(model or "gpt-4o-mini")
+    if encoding is None:
+        return approx_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message, model: str = "") -> int:
+    if not isinstance(message, dict):
+        return count_tokens(str(message), model) + MESSAGE_OVERHEAD_TOKENS
+    total = count_tokens(str(message.get("content") or ""), model)
+    for call in message.get("tool_calls") or []:
+        fn = call.get("function") or {}
+        total += count_tokens(fn.get("name") or "", model) + count_tokens(fn.get("arguments") or "", model)
+    return total + MESSAGE_OVERHEAD_TOKENS
+
+
+class TokenBudget:
+    """Caps what goes into an agent turn's prompt.
+
+    ``max_prompt_tokens`` bounds the whole request (system prompt plus history).
+    Context summaries are shortened to ``summary_tokens`` each and dropped
+    (other agents' first) once they exceed ``context_tokens``; history is cut
+    from the oldest turns while keeping the original task message.
+    """
+
+    def __init__(self, max_prompt_tokens: int = DEFAULT_PROMPT_BUDGET, context_tokens: Optional[int] = None,
+                 summary_tokens: int = 120, model: str = ""):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.context_tokens = context_tokens if context_tokens is not None else max_prompt_tokens // 3
+        self.summary_tokens = summary_tokens
+        self.model = model
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def shorten(self, text: str, limit: int) -> str:
+        """Keep whole leading sentences up to ``limit`` tokens; a summary of a summary."""
+        if self.count(text) <= limit:
+            return text
+        kept, used = [], 0
+        for sentence in _SENTENCE.split(text.strip()):
+            n = self.count(sentence)
+            if used + n > limit:
+                break
+            kept.append(sentence)
+            used += n
+        if not kept:
+            words = text.split()
+            # First sentence alone is too long: fall back to a word cut
+            kept = [" ".join(words[:max(1, limit * 3 // 4)])]
+        return " ".join(kept) + " …"
+
+    def fit_context(self, context_variables: dict, current: Optional[str] = None) -> dict:
+        """Summaries that fit ``context_tokens``, in their original order.
+
+        The current agent's own summary is kept first; stale summaries from the
+        other agents are dropped when the budget runs out.
+        """
+        present = {k: self.shorten(v, self.summary_tokens) for k, v in context_variables.items() if v is not None}
+        kept, used = set(), 0
+        for key in sorted(present, key=lambda k: k != current):
+            n = self.count(present[key])
+            if used + n > self.context_tokens:
+                continue
+            kept.add(key)
+            used += n
+        return {k: v for k, v in present.items() if k in kept}
+
+    def trim_messages(self, messages: list, reserved: int = 0) -> list:
+        """Oldest-first trimming of chat history to fit after ``reserved`` tokens of system prompt."""
+        if len(messages) <= 1:
+            return messages
+        available = self.max_prompt_tokens - reserved - message_tokens(messages[0], self.model)
+        tail, used = [], 0
+        for message in reversed(messages[1:]):
+            n = message_tokens(message, self.model)
+            if used + n > available:
+                break
+            tail.append(message)
+            used += n
+        tail.reverse()
+        # A tool result without the assistant tool_call before it is rejected by the API
+        while tail and isinstance(tail[0], dict) and tail[0].get("role") == "tool":
+            tail.pop(0)
+        return [messages[0]] + tail
+
+    def prompt_tokens(self, system_prompt: str, messages: list) -> int:
+        return self.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS + sum(message_tokens(m, self.model) for m in messages)
+
+
+def log_turn(agent: str, stage: str, prompt_tokens: int, completion_tokens: int,
+             model: str = "", seconds: Optional[float] = None) -> dict:
+    record = {"agent": agent, "stage": stage, "model": model, "prompt_tokens": prompt_tokens,
+              "completion_tokens": completion_tokens, "seconds": None if seconds is None else round(seconds, 3)}
+    logger.info("turn %s/%s model=%s prompt=%d completion=%d seconds=%s",
+                agent, stage, model, prompt_tokens, completion_tokens, record["seconds"])
+    return record
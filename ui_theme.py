@@ -1,8 +1,6 @@
 import streamlit as st
 
-def inject_theme():
-    st.markdown(
-        """
+THEME_CSS = """
         <style>
         :root {
           --bg0: #0b1020;
@@ -164,9 +162,10 @@ def inject_theme():
         }
         .hero p { color: var(--muted); margin: 0.35rem 0 0; }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+def inject_theme():
+    st.markdown(THEME_CSS, unsafe_allow_html=True)
 
 def render_hero():
     st.markdown(
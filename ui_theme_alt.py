@@ -1,8 +1,6 @@
 import streamlit as st
 
-def inject_theme_alt():
-    st.markdown(
-        """
+THEME_ALT_CSS = """
         <style>
         :root {
           --bg: #0a0a0f;
@@ -116,11 +114,12 @@ def inject_theme_alt():
           color:#08111f; padding:4px 10px; border-radius:999px; font-weight:700; font-size:0.8rem;
         }
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+
+def inject_theme_alt():
+    st.markdown(THEME_ALT_CSS, unsafe_allow_html=True)
 
-    def render_hero_alt():
+def render_hero_alt():
     st.markdown(
         """
         <div class="hero-alt">
@@ -132,9 +131,9 @@ def inject_theme_alt():
         unsafe_allow_html=True,
     )
 
-    def section_title_alt(title: str, emoji: str | None = None):
-      icon = f"<span class='subheader-emoji-alt'>{emoji}</span>" if emoji else ""
-      st.markdown(f"<div class='subheader-fancy-alt'>{icon}<span>{title}</span></div>", unsafe_allow_html=True)
+def section_title_alt(title: str, emoji: str | None = None):
+  icon = f"<span class='subheader-emoji-alt'>{emoji}</span>" if emoji else ""
+  st.markdown(f"<div class='subheader-fancy-alt'>{icon}<span>{title}</span></div>", unsafe_allow_html=True)
 
-    def render_divider_alt(label: str | None = None):
-      st.markdown("<div class='divider-alt'></div>", unsafe_allow_html=True)
+def render_divider_alt(label: str | None = None):
+  st.markdown("<div class='divider-alt'></div>", unsafe_allow_html=True)
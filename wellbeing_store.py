@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+DEFAULT_DATA_DIR = os.environ.get(
+    "SEHATSATHI_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"),
+)
+
+# Record kinds kept in the generic entries table
+ENTRY_KINDS = ("habit", "playlist", "journal", "grounding")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkins (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    mood INTEGER,
+    sleep INTEGER,
+    stress INTEGER
+);
+CREATE INDEX IF NOT EXISTS checkins_user_ts ON checkins(user_id, ts);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ts REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_user_kind_ts ON entries(user_id, kind, ts);
+"""
+
+
+class WellbeingStore:
+    """Local SQLite (WAL) store for check-ins, habits, playlists, journal and grounding notes.
+
+    Writes are queued and committed in batches by a background thread, so the
+    Streamlit script never waits on disk. Reads use their own connection and
+    are indexed on (user, [kind,] timestamp) for range queries.
+    """
+
+    def __init__(self, path: Optional[str] = None, batch_size: int = 256):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "wellbeing.sqlite")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.batch_size = batch_size
+        self._read = sqlite3.connect(self.path, check_same_thread=False)
+        self._read.execute("PRAGMA journal_mode=WAL")
+        self._read.executescript(_SCHEMA)
+        self._read.commit()
+        self._read_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="wellbeing-store-writer", daemon=True)
+        self._writer.start()
+
+    # --- writes (non-blocking) ---
+
+    def append_checkin(self, user_id: str, checkin: dict) -> None:
+        self._queue.put(("checkin", user_id, checkin.get("ts") or time.time(), checkin))
+
+    def append(self, kind: str, user_id: str, record: dict) -> None:
+        if kind not in ENTRY_KINDS:
+            raise ValueError(f"Unknown record kind: {kind}")
+        self._queue.put((kind, user_id, record.get("ts") or time.time(), record))
+
+    def delete_user(self, user_id: str) -> None:
+        """Drop every check-in and entry stored for ``user_id`` (queued behind pending writes)."""
+        self._queue.put(("delete", user_id, time.time(), None))
+
+    def flush(self) -> None:
+        """Block until every queued write is committed (benchmarks, shutdown)."""
+        self._queue.join()
+
+    def close(self) -> None:
+        self.flush()
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        with self._read_lock:
+            self._read.close()
+
+    def _write_loop(self) -> None:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)
+                    self._queue.task_done()
+                    break
+                batch.append(nxt)
+            try:
+                with conn:
+                    for kind, user_id, ts, record in batch:
+                        if kind == "delete":
+                            conn.execute("DELETE FROM checkins WHERE user_id = ?", (user_id,))
+                            conn.execute("DELETE FROM entries WHERE user_id = ?", (user_id,))
+                        elif kind == "checkin":
+                            conn.execute(
+                                "INSERT INTO checkins (user_id, ts, mood, sleep, stress) VALUES (?, ?, ?, ?, ?)",
+                                (user_id, ts, record.get("mood"), record.get("sleep"), record.get("stress")),
+                            )
+                        else:
+                            payload = {k: v for k, v in record.items() if k != "ts"}
+                            conn.execute(
+                                "INSERT INTO entries (user_id, kind, ts, payload) VALUES (?, ?, ?, ?)",
+                                (user_id, kind, ts, json.dumps(payload, ensure_ascii=False)),
+                            )
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    # --- reads ---
+
+    def checkins(self, user_id: str, since: Optional[float] = None, until: Optional[float] = None) -> list:
+        sql = "SELECT ts, mood, sleep, stress FROM checkins WHERE user_id = ?"
+        params: list = [user_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(until)
+        with self._read_lock:
+            rows = self._read.execute(sql + " ORDER BY ts", params).fetchall()
+        return [{"mood": mood, "sleep": sleep, "stress": stress, "ts": ts} for ts, mood, sleep, stress in rows]
+
+    def entries(self, kind: str, user_id: str, since: Optional[float] = None, limit: Optional[int] = None) -> list:
+        """Records of ``kind`` oldest-first; with ``limit`` only the newest ``limit`` are returned."""
+        sql = "SELECT ts, payload FROM entries WHERE user_id = ? AND kind = ?"
+        params: list = [user_id, kind]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        sql += " ORDER BY ts DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._read_lock:
+            rows = self._read.execute(sql, params).fetchall()
+        return [{**json.loads(payload), "ts": ts} for ts, payload in reversed(rows)]